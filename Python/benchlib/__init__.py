@@ -0,0 +1,5 @@
+"""Support code shared by the Python benchmark implementations.
+
+Benchmarks are run as scripts from their own folder, so they put this
+folder's parent on ``sys.path`` before importing from here.
+"""
@@ -0,0 +1,127 @@
+"""``tracemalloc`` snapshots of a benchmark at its phase boundaries.
+
+When ``BENCH_TRACEMALLOC_DIR`` names a directory, the first process to
+import this module starts ``tracemalloc`` (keeping
+``BENCH_TRACEMALLOC_FRAMES`` frames per allocation, 1 by default) and takes
+a snapshot at every ``benchlib.phases.phase`` marker and when it exits.
+Each snapshot is labelled with the phase that just ended -- ``startup``
+before the first marker, as in ``harness.phases`` -- and saved as
+``<pid>-<seq>.tracemalloc``; a line of JSON in ``<pid>.jsonl`` records its
+label, the traced memory at that point, the peak since the previous
+snapshot (Python 3.9+; since the start before that) and the number of
+traced blocks.
+
+Pool workers created by ``benchlib.executor.get_executor`` run
+``worker_initializer`` first: forked workers drop the traces inherited
+from the parent, spawned ones start tracing, and each takes one snapshot,
+labelled ``worker``, when it exits or is terminated.  Pools a benchmark
+builds itself are not covered.
+
+The harness imports this module before the benchmark's own code, see
+``harness.allocations``; benchmarks need no changes.
+"""
+
+import atexit
+import json
+import os
+import signal
+import sys
+import tracemalloc
+
+ENV_VAR = 'BENCH_TRACEMALLOC_DIR'
+FRAMES_VAR = 'BENCH_TRACEMALLOC_FRAMES'
+OWNER_VAR = 'BENCH_TRACEMALLOC_OWNER'
+
+
+class Tracer(object):
+    """Takes the snapshots of one process."""
+
+    def __init__(self, directory, role='main', label='startup'):
+        self.directory = directory
+        self.role = role
+        self.label = label
+        self.sequence = 0
+        self.finished = False
+
+    def snapshot(self, label):
+        """Save a snapshot closing the phase ``label``."""
+        current, peak = tracemalloc.get_traced_memory()
+        snapshot = tracemalloc.take_snapshot()
+        pid = os.getpid()
+        name = '%d-%03d.tracemalloc' % (pid, self.sequence)
+        snapshot.dump(os.path.join(self.directory, name))
+        record = {'pid': pid, 'role': self.role, 'seq': self.sequence, 'label': label,
+                  'current': current, 'peak': peak, 'blocks': len(snapshot.traces),
+                  'snapshot': name}
+        with open(os.path.join(self.directory, '%d.jsonl' % pid), 'a') as f:
+            f.write(json.dumps(record) + '\n')
+        self.sequence += 1
+        if hasattr(tracemalloc, 'reset_peak'):
+            tracemalloc.reset_peak()
+
+    def mark(self, name):
+        """Called as the phase ``name`` starts."""
+        if not self.finished:
+            self.snapshot(self.label)
+            self.label = name
+
+    def finish(self):
+        if not self.finished:
+            self.snapshot(self.label)
+            self.finished = True
+
+
+def enabled():
+    return tracer is not None
+
+
+def snapshotting(phase):
+    """Wrap ``benchlib.phases.phase`` to snapshot the owner at every marker."""
+    owner = os.getpid()
+
+    def traced_phase(name):
+        if os.getpid() == owner:
+            tracer.mark(name)
+        phase(name)
+    return traced_phase
+
+
+def _frames():
+    return int(os.environ.get(FRAMES_VAR) or 1)
+
+
+def _start(initializer, initargs):
+    global tracer
+    if str(os.getpid()) != os.environ.get(OWNER_VAR):
+        if tracemalloc.is_tracing():
+            tracemalloc.clear_traces()
+        else:
+            tracemalloc.start(_frames())
+        tracer = Tracer(os.environ[ENV_VAR], 'worker', 'worker')
+        # Pool.terminate() ends workers with SIGTERM, and workers leave
+        # through os._exit(), so atexit never runs in them.
+        from multiprocessing.util import Finalize
+        Finalize(None, tracer.finish, exitpriority=0)
+        signal.signal(signal.SIGTERM, _terminated)
+    if initializer is not None:
+        initializer(*initargs)
+
+
+def _terminated(signum, frame):
+    tracer.finish()
+    signal.signal(signum, signal.SIG_DFL)
+    os.kill(os.getpid(), signum)
+
+
+def worker_initializer(initializer=None, initargs=()):
+    """The ``(initializer, initargs)`` to give a pool so its workers are traced."""
+    return _start, (initializer, tuple(initargs))
+
+
+tracer = None
+if os.environ.get(ENV_VAR) and OWNER_VAR not in os.environ:
+    os.environ[OWNER_VAR] = str(os.getpid())
+    if not tracemalloc.is_tracing():
+        tracemalloc.start(_frames())
+    tracer = Tracer(os.environ[ENV_VAR])
+    atexit.register(tracer.finish)
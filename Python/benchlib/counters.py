@@ -0,0 +1,60 @@
+"""Work-unit counters, so the harness can report units/s and units/J.
+
+Each benchmark counts the work it did in its own units::
+
+    from benchlib import counters
+
+    counters.add('permutations', factorial(n))
+
+Counts are added in the parent process from values the workers already
+return (checksums, row lengths, task sizes), so nothing is exchanged with
+``Pool`` workers to maintain them and no inner loop is touched.  A count
+that would need one, such as mandelbrot's iterations, is taken by a
+separate code path that the benchmark only runs when ``enabled()``.
+
+When the harness passes a pipe in ``BENCH_COUNTER_FD`` the counts are
+written to it as JSON when the process exits, and counting is enabled; an
+in-process runner calls ``enable()`` and reads them with ``counts()``.
+"""
+
+import atexit
+import json
+import os
+
+ENV_VAR = 'BENCH_COUNTER_FD'
+
+_counts = {}
+_enabled = False
+
+
+def add(unit, n=1):
+    _counts[unit] = _counts.get(unit, 0) + n
+
+
+def enabled():
+    """True when someone reads the counts, so costly ones are worth taking."""
+    return _enabled
+
+
+def enable(on=True):
+    global _enabled
+    _enabled = on
+
+
+def counts():
+    return dict(_counts)
+
+
+def reset():
+    _counts.clear()
+
+
+def _report(fd, owner):
+    if os.getpid() == owner:
+        os.write(fd, json.dumps(_counts).encode())
+
+
+_fd = os.environ.pop(ENV_VAR, None)
+if _fd:
+    _enabled = True
+    atexit.register(_report, int(_fd), os.getpid())
@@ -0,0 +1,381 @@
+"""Pluggable execution backends for the parallel Python benchmarks.
+
+Every parallel benchmark gets its workers from ``get_executor`` instead of
+building a ``multiprocessing.Pool`` itself, so the same benchmark code can be
+measured with different backends:
+
+* ``serial``     -- everything runs in the calling thread
+* ``threads``    -- ``multiprocessing.pool.ThreadPool`` (useful on
+                    free-threaded CPython builds)
+* ``processes``  -- ``multiprocessing.Pool`` with the default start method
+* ``fork``, ``spawn``, ``forkserver`` -- process pools with that start method
+* ``shm``        -- a process pool that passes large ``bytes`` arguments and
+                    results through ``multiprocessing.shared_memory`` blocks
+                    instead of pickling them through its pipes (Python 3.8+)
+
+The backend is chosen by the ``BENCH_EXECUTOR`` environment variable or a
+``--executor NAME`` command-line flag (see ``select_from_argv``); without
+either, the benchmark's own default applies.
+
+Pools are created on first use, so state a benchmark sets up before calling
+``map`` is visible to forked workers.  ``shares_parent_state`` tells whether
+workers can see such state at all, and ``uses_processes`` whether tasks and
+results are pickled between processes.  While ``benchlib.allocations`` is
+tracing, the workers are given its initializer as well.
+"""
+
+import multiprocessing
+import multiprocessing.pool
+import os
+from contextlib import contextmanager
+from itertools import starmap
+
+from benchlib import allocations
+
+try:
+    from multiprocessing import shared_memory
+except ImportError:     # Python < 3.8
+    shared_memory = None
+
+ENV_VAR = 'BENCH_EXECUTOR'
+
+
+class SerialExecutor(object):
+
+    name = 'serial'
+    shares_parent_state = True
+    uses_processes = False
+
+    def __init__(self, processes=None, initializer=None, initargs=()):
+        self.processes = processes
+        self.initializer = initializer
+        self.initargs = initargs
+        self._started = False
+
+    @property
+    def workers(self):
+        return 1
+
+    @property
+    def context(self):
+        """``multiprocessing`` context for locks and values shared with workers."""
+        return multiprocessing.get_context(getattr(self, 'start_method', None))
+
+    def _start(self):
+        if not self._started:
+            if self.initializer is not None:
+                self.initializer(*self.initargs)
+            self._started = True
+
+    def map(self, func, iterable, chunksize=None):
+        self._start()
+        return list(map(func, iterable))
+
+    def imap(self, func, iterable, chunksize=1):
+        self._start()
+        return map(func, iterable)
+
+    imap_unordered = imap
+
+    def starmap(self, func, iterable, chunksize=None):
+        self._start()
+        return list(starmap(func, iterable))
+
+    def close(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+        return False
+
+
+class PoolExecutor(SerialExecutor):
+    """Executor backed by a lazily created ``multiprocessing`` pool."""
+
+    name = 'processes'
+    start_method = None
+    uses_processes = True
+
+    def __init__(self, processes=None, initializer=None, initargs=()):
+        super(PoolExecutor, self).__init__(processes, initializer, initargs)
+        self._pool = None
+
+    @property
+    def shares_parent_state(self):
+        return self.context.get_start_method() == 'fork'
+
+    @property
+    def workers(self):
+        return self.processes or os.cpu_count() or 1
+
+    def _make_pool(self):
+        return self.context.Pool(self.processes, self.initializer, self.initargs)
+
+    def _start(self):
+        if self._pool is None:
+            self._pool = self._make_pool()
+        return self._pool
+
+    def map(self, func, iterable, chunksize=None):
+        return self._start().map(func, iterable, chunksize)
+
+    def imap(self, func, iterable, chunksize=1):
+        return self._start().imap(func, iterable, chunksize)
+
+    def imap_unordered(self, func, iterable, chunksize=1):
+        return self._start().imap_unordered(func, iterable, chunksize)
+
+    def starmap(self, func, iterable, chunksize=None):
+        return self._start().starmap(func, iterable, chunksize)
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.terminate()
+            self._pool.join()
+            self._pool = None
+
+
+class _Shared(object):
+    """A ``bytes`` value left in a shared memory block for the other side."""
+
+    def __init__(self, data):
+        block = shared_memory.SharedMemory(create=True, size=max(len(data), 1))
+        block.buf[:len(data)] = data
+        self.name = block.name
+        self.size = len(data)
+        block.close()
+
+    def load(self, unlink=False):
+        block = shared_memory.SharedMemory(self.name)
+        try:
+            return bytes(block.buf[:self.size])
+        finally:
+            block.close()
+            if unlink:
+                block.unlink()
+
+    def unlink(self):
+        block = shared_memory.SharedMemory(self.name)
+        block.close()
+        block.unlink()
+
+
+def _share(value, threshold):
+    if isinstance(value, (bytes, bytearray)) and len(value) >= threshold:
+        return _Shared(value)
+    return value
+
+
+class _SharedCall(object):
+    """Runs ``func`` in a worker on the loaded arguments and shares its result."""
+
+    def __init__(self, func, threshold, star=False):
+        self.func = func
+        self.threshold = threshold
+        self.star = star
+
+    def __call__(self, item):
+        if self.star:
+            result = self.func(*[a.load() if isinstance(a, _Shared) else a for a in item])
+        else:
+            result = self.func(item.load() if isinstance(item, _Shared) else item)
+        return _share(result, self.threshold)
+
+
+def _received(result):
+    return result.load(unlink=True) if isinstance(result, _Shared) else result
+
+
+class SharedMemoryExecutor(PoolExecutor):
+    """Process pool that moves large ``bytes`` through shared memory.
+
+    Arguments and results of at least ``THRESHOLD`` bytes are copied into a
+    ``SharedMemory`` block and only the block's name goes through the
+    pool's pipes.  Blocks holding results are released as they are
+    received; blocks holding arguments once ``map``/``starmap`` return, or
+    for the lazy ``imap`` variants when the executor is closed.
+    """
+
+    name = 'shm'
+    THRESHOLD = 1 << 16
+
+    def __init__(self, processes=None, initializer=None, initargs=()):
+        if shared_memory is None:
+            raise ValueError('the shm executor needs multiprocessing.shared_memory '
+                             '(Python 3.8+)')
+        super(SharedMemoryExecutor, self).__init__(processes, initializer, initargs)
+        self._blocks = []
+
+    def _make_pool(self):
+        # Workers must share the parent's resource tracker, or each would
+        # start its own and "clean up" the blocks the other side unlinked.
+        from multiprocessing import resource_tracker
+        resource_tracker.ensure_running()
+        return super(SharedMemoryExecutor, self)._make_pool()
+
+    def _shared(self, values):
+        shared = []
+        for value in values:
+            value = _share(value, self.THRESHOLD)
+            if isinstance(value, _Shared):
+                self._blocks.append(value)
+            shared.append(value)
+        return shared
+
+    def _arguments(self, iterable, star):
+        if star:
+            return [tuple(self._shared(args)) for args in iterable]
+        return self._shared(iterable)
+
+    def _release(self):
+        blocks, self._blocks = self._blocks, []
+        for block in blocks:
+            block.unlink()
+
+    def map(self, func, iterable, chunksize=None):
+        try:
+            results = self._start().map(_SharedCall(func, self.THRESHOLD),
+                                        self._arguments(iterable, False), chunksize)
+            return [_received(r) for r in results]
+        finally:
+            self._release()
+
+    def imap(self, func, iterable, chunksize=1):
+        results = self._start().imap(_SharedCall(func, self.THRESHOLD),
+                                     self._arguments(iterable, False), chunksize)
+        return map(_received, results)
+
+    def imap_unordered(self, func, iterable, chunksize=1):
+        results = self._start().imap_unordered(_SharedCall(func, self.THRESHOLD),
+                                               self._arguments(iterable, False), chunksize)
+        return map(_received, results)
+
+    def starmap(self, func, iterable, chunksize=None):
+        try:
+            results = self._start().map(_SharedCall(func, self.THRESHOLD, star=True),
+                                        self._arguments(iterable, True), chunksize)
+            return [_received(r) for r in results]
+        finally:
+            self._release()
+
+    def close(self):
+        super(SharedMemoryExecutor, self).close()
+        self._release()
+
+
+class ThreadExecutor(PoolExecutor):
+
+    name = 'threads'
+    shares_parent_state = True
+    uses_processes = False
+
+    def _make_pool(self):
+        return multiprocessing.pool.ThreadPool(
+            self.processes, self.initializer, self.initargs)
+
+
+class ForkExecutor(PoolExecutor):
+    name = start_method = 'fork'
+
+
+class SpawnExecutor(PoolExecutor):
+    name = start_method = 'spawn'
+
+
+class ForkserverExecutor(PoolExecutor):
+    name = start_method = 'forkserver'
+
+
+BACKENDS = dict((cls.name, cls) for cls in (
+    SerialExecutor, ThreadExecutor, PoolExecutor,
+    ForkExecutor, SpawnExecutor, ForkserverExecutor, SharedMemoryExecutor))
+
+# Executors kept alive between runs by ``kept_alive``, keyed by
+# (backend, processes); None when executors are created per call.
+_kept = None
+
+
+class _Kept(object):
+    """Proxy that keeps the underlying executor open when the caller closes it."""
+
+    def __init__(self, executor):
+        self._executor = executor
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def close(self):
+        pass
+
+    def __getattr__(self, name):
+        return getattr(self._executor, name)
+
+
+def backend_name(default='processes'):
+    name = os.environ.get(ENV_VAR) or default
+    if name not in BACKENDS:
+        raise ValueError('unknown executor %r (choose from %s)'
+                         % (name, ', '.join(sorted(BACKENDS))))
+    return name
+
+
+def get_executor(default='processes', processes=None, initializer=None, initargs=()):
+    """Return an executor for the selected backend.
+
+    ``default`` is used when neither the environment nor the command line
+    picked a backend.
+    """
+    name = backend_name(default)
+    if allocations.enabled():
+        initializer, initargs = allocations.worker_initializer(initializer, initargs)
+    if _kept is not None and initializer is None:
+        key = (name, processes)
+        if key not in _kept:
+            _kept[key] = _Kept(BACKENDS[name](processes))
+        return _kept[key]
+    return BACKENDS[name](processes, initializer, initargs)
+
+
+def get_context(default='processes'):
+    """The ``multiprocessing`` context the selected backend would use."""
+    return BACKENDS[backend_name(default)]().context
+
+
+@contextmanager
+def kept_alive():
+    """Reuse executors, and their workers, across ``get_executor`` calls.
+
+    Used by the warm runner; executors with an initializer carry per-run
+    state and are still created fresh.
+    """
+    global _kept
+    saved, _kept = _kept, {}
+    try:
+        yield
+    finally:
+        kept, _kept = _kept, saved
+        for proxy in kept.values():
+            proxy._executor.close()
+
+
+def select_from_argv(argv):
+    """Strip ``--executor NAME`` from ``argv`` and export it for the workers."""
+    for i, arg in enumerate(argv):
+        if arg == '--executor' and i + 1 < len(argv):
+            name = argv[i + 1]
+            del argv[i:i + 2]
+        elif arg.startswith('--executor='):
+            name = arg.split('=', 1)[1]
+            del argv[i]
+        else:
+            continue
+        os.environ[ENV_VAR] = name
+        backend_name()
+        return name
+    return None
@@ -0,0 +1,142 @@
+"""Garbage collector policies and statistics for the allocation benchmarks.
+
+``BENCH_GC_POLICY`` selects how the collector is run:
+
+* ``default``     -- CPython's thresholds, untouched;
+* ``freeze``      -- ``gc.freeze()`` once the long-lived data is built, so
+                     full collections stop traversing it (Python 3.7+;
+                     selecting it on an older interpreter is an error);
+* ``thresholds``  -- ``gc.set_threshold(*THRESHOLDS)``, fewer and larger
+                     collections;
+* ``no-gc-build`` -- the collector is off inside ``construction()`` blocks.
+
+A benchmark marks the points a policy acts on::
+
+    from benchlib import gcprofile
+
+    with gcprofile.construction():
+        long_lived_tree = make_tree(max_depth)
+    gcprofile.long_lived()
+
+Both do nothing under the default policy.  When the harness passes a
+pipe's write end in ``BENCH_GC_FD``, every collection is recorded through
+``gc.callbacks`` -- its generation, pause and objects collected -- and the
+totals are written to the pipe as JSON when the process exits.  With
+``BENCH_GC_EXAMINE=1`` the objects examined, the size of the generations
+being collected, are counted too; that walks the generations before every
+collection, so it is left out of timed runs.  As with
+``benchlib.counters``, only the process that imported this module first
+reports; the policy applies to the workers as well.
+"""
+
+import atexit
+import gc
+import json
+import os
+import sys
+import time
+from contextlib import contextmanager
+
+ENV_VAR = 'BENCH_GC_FD'
+POLICY_VAR = 'BENCH_GC_POLICY'
+EXAMINE_VAR = 'BENCH_GC_EXAMINE'
+
+POLICIES = ('default', 'freeze', 'thresholds', 'no-gc-build')
+THRESHOLDS = (50000, 50, 50)
+
+class Recorder(object):
+    """Collects statistics from ``gc.callbacks`` while installed."""
+
+    def __init__(self, examine=False):
+        # gc.get_objects(generation) is Python 3.8+
+        examine = examine and sys.version_info >= (3, 8)
+        self.examine = examine
+        self.collections = [0, 0, 0]
+        self.pause = [0.0, 0.0, 0.0]
+        self.longest = 0.0
+        self.collected = 0
+        self.examined = 0 if examine else None
+        self._t0 = None
+
+    def callback(self, phase, info):
+        generation = info['generation']
+        if phase == 'start':
+            if self.examine:
+                # counted before the clock starts, so pauses stay as they are
+                self.examined += sum(len(gc.get_objects(g)) for g in range(generation + 1))
+            self._t0 = time.perf_counter()
+        elif self._t0 is not None:
+            pause = time.perf_counter() - self._t0
+            self.collections[generation] += 1
+            self.pause[generation] += pause
+            self.longest = max(self.longest, pause)
+            self.collected += info['collected']
+            self._t0 = None
+
+    def install(self):
+        gc.callbacks.append(self.callback)
+        return self
+
+    def uninstall(self):
+        if self.callback in gc.callbacks:
+            gc.callbacks.remove(self.callback)
+
+    def report(self):
+        return {
+            'policy': policy, 'collections': self.collections, 'pause': self.pause,
+            'longest_pause': self.longest, 'collected': self.collected,
+            'examined': self.examined,
+        }
+
+
+def _policy():
+    name = os.environ.get(POLICY_VAR) or 'default'
+    if name not in POLICIES:
+        raise ValueError('unknown GC policy %r (choose from %s)'
+                         % (name, ', '.join(POLICIES)))
+    if name == 'freeze' and not hasattr(gc, 'freeze'):
+        # running as the default policy would report it as "freeze"
+        raise ValueError('GC policy %r needs gc.freeze (Python 3.7+)' % name)
+    return name
+
+
+@contextmanager
+def _no_gc():
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        yield
+    finally:
+        if enabled:
+            gc.enable()
+
+
+@contextmanager
+def _as_is():
+    yield
+
+
+def construction():
+    """Context manager around code that builds data structures."""
+    return _no_gc() if policy == 'no-gc-build' else _as_is()
+
+
+def long_lived():
+    """Call once the data that lives until the end of the run is built."""
+    if policy == 'freeze':
+        gc.freeze()
+
+
+def _report(fd, owner, recorder):
+    if os.getpid() == owner:
+        os.write(fd, json.dumps(recorder.report()).encode())
+
+
+policy = _policy()
+if policy == 'thresholds':
+    gc.set_threshold(*THRESHOLDS)
+
+_fd = os.environ.pop(ENV_VAR, None)
+if _fd:
+    atexit.register(_report, int(_fd), os.getpid(),
+                    Recorder(os.environ.get(EXAMINE_VAR) == '1').install())
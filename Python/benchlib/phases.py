@@ -0,0 +1,54 @@
+"""Phase markers that let the harness attribute energy to program stages.
+
+A benchmark calls ``phase(name)`` when it enters a stage::
+
+    from benchlib.phases import phase
+
+    phase('parse')
+    sequence = read_sequence(stdin.buffer, b'THREE', translation)
+    phase('count')
+    ...
+
+A phase lasts until the next marker or the end of the run.  When the
+harness measures phases it passes a pipe's write end in ``BENCH_PHASE_FD``
+and timestamps every marker against its energy counters.  Otherwise
+``phase`` is a function that does nothing.
+
+Only the process that imported this module first emits markers; worker
+processes forked from it stay silent, and the variable is removed from the
+environment so spawned workers never see it.  Under
+``benchlib.allocations`` every marker also takes a ``tracemalloc``
+snapshot.
+"""
+
+import os
+
+from benchlib import allocations
+
+ENV_VAR = 'BENCH_PHASE_FD'
+
+
+def _disabled(name):
+    pass
+
+
+def _enabled(fd):
+    owner = os.getpid()
+    write = os.write
+    getpid = os.getpid
+
+    def phase(name):
+        if getpid() == owner:
+            # one short write is atomic on a pipe
+            write(fd, name.encode() + b'\n')
+    return phase
+
+
+def enabled():
+    return phase is not _disabled
+
+
+_fd = os.environ.pop(ENV_VAR, None)
+phase = _enabled(int(_fd)) if _fd else _disabled
+if allocations.enabled():
+    phase = allocations.snapshotting(phase)
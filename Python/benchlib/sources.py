@@ -0,0 +1,96 @@
+"""Import the benchmark programs as modules.
+
+The programs keep their Benchmarks Game file names
+(``knucleotide.python3-3.py``, ``spectralnorm.python3-5.py``), which are not
+valid module names, and their tests import them as ``k_nucleotide``,
+``spectral_norm`` and so on.  ``install()`` puts a finder on
+``sys.meta_path`` that maps the names in ``MODULES`` and ``ALIASES`` to
+those files, so from anywhere::
+
+    from benchlib import sources
+    sources.install()
+    import k_nucleotide                         # knucleotide.python3-3.py
+    nbody = sources.load('nbody')
+
+An alias and the name it stands for are the same module object.
+``Python/conftest.py`` installs the finder for the benchmark tests.
+"""
+
+import importlib
+import importlib.abc
+import importlib.util
+import os
+import sys
+
+PYTHON_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# module name -> (benchmark folder, source file)
+MODULES = {
+    'binarytrees': ('binary-trees', 'binarytrees.py'),
+    'fannkuchredux': ('fannkuch-redux', 'fannkuchredux.py'),
+    'fasta': ('fasta', 'fasta.python3-3.py'),
+    'knucleotide': ('k-nucleotide', 'knucleotide.python3-3.py'),
+    'mandelbrot': ('mandelbrot', 'mandelbrot.python3-7.py'),
+    'nbody': ('n-body', 'nbody.py'),
+    'pidigits': ('pidigits', 'pidigits.python3-2.py'),
+    'regexredux': ('regex-redux', 'regexredux.py'),
+    'revcomp': ('reverse-complement', 'revcomp.python3-6.py'),
+    'spectralnorm': ('spectral-norm', 'spectralnorm.python3-5.py'),
+}
+
+# names the tests use -> module name
+ALIASES = {
+    'k_nucleotide': 'knucleotide',
+    'pi_digits': 'pidigits',
+    'regex_dna': 'regexredux',
+    'reverse_complement': 'revcomp',
+    'spectral_norm': 'spectralnorm',
+}
+
+
+def path(name):
+    """The source file of module ``name`` (or of the module it aliases)."""
+    directory, source = MODULES[ALIASES.get(name, name)]
+    return os.path.join(PYTHON_DIR, directory, source)
+
+
+class _AliasLoader(importlib.abc.Loader):
+    """Binds an alias to the module it names instead of loading a copy."""
+
+    def __init__(self, target):
+        self.target = target
+
+    def create_module(self, spec):
+        return importlib.import_module(self.target)
+
+    def exec_module(self, module):
+        pass
+
+
+class SourceFinder(importlib.abc.MetaPathFinder):
+
+    def find_spec(self, fullname, path_=None, target=None):
+        if fullname in ALIASES:
+            return importlib.util.spec_from_loader(fullname,
+                                                   _AliasLoader(ALIASES[fullname]))
+        if fullname in MODULES:
+            return importlib.util.spec_from_file_location(fullname, path(fullname))
+        return None
+
+
+_finder = SourceFinder()
+
+
+def install():
+    """Put the finder ahead of the path-based one; idempotent.
+
+    It goes first because ``Python/fasta`` and ``Python/mandelbrot`` would
+    otherwise be imported as namespace packages.
+    """
+    if _finder not in sys.meta_path:
+        sys.meta_path.insert(0, _finder)
+
+
+def load(name):
+    install()
+    return importlib.import_module(name)
@@ -0,0 +1,55 @@
+import json
+import os
+import subprocess
+import sys
+
+from benchlib import allocations
+
+LIBDIR = os.path.dirname(os.path.dirname(os.path.abspath(allocations.__file__)))
+
+
+def _records(directory):
+    records = []
+    for name in sorted(os.listdir(str(directory))):
+        if name.endswith('.jsonl'):
+            with open(os.path.join(str(directory), name)) as f:
+                records.extend(json.loads(line) for line in f)
+    return records
+
+
+def _trace(directory, code):
+    env = dict(os.environ, BENCH_TRACEMALLOC_DIR=str(directory), PYTHONPATH=LIBDIR)
+    env.pop('BENCH_TRACEMALLOC_OWNER', None)
+    subprocess.check_call([sys.executable, '-c', code], env=env)
+    return _records(directory)
+
+
+def test_disabled_by_default():
+    if 'BENCH_TRACEMALLOC_DIR' not in os.environ:
+        assert not allocations.enabled()
+
+
+def test_snapshots_at_every_phase_and_at_exit(tmpdir):
+    code = ('from benchlib.phases import phase\n'
+            'phase("build")\n'
+            'kept = [bytearray(1000) for _ in range(1000)]\n'
+            'phase("drop")\n'
+            'del kept\n')
+    records = _trace(tmpdir, code)
+    assert [r['label'] for r in records] == ['startup', 'build', 'drop']
+    startup, build, drop = records
+    assert build['current'] - startup['current'] > 1000 * 1000
+    assert build['blocks'] - startup['blocks'] >= 1000
+    assert drop['peak'] >= build['current'] > drop['current']
+    for r in records:
+        assert os.path.exists(os.path.join(str(tmpdir), r['snapshot']))
+
+
+def test_pool_workers_snapshot_when_they_exit(tmpdir):
+    code = ('from benchlib.executor import get_executor\n'
+            'with get_executor("fork", processes=2) as executor:\n'
+            '    print(executor.map(abs, range(-10, 0)))\n')
+    records = _trace(tmpdir, code)
+    workers = [r for r in records if r['role'] == 'worker']
+    assert len(workers) == 2 and all(r['label'] == 'worker' for r in workers)
+    assert [r['label'] for r in records if r['role'] == 'main'] == ['startup']
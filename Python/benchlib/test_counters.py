@@ -0,0 +1,30 @@
+import json
+import os
+import subprocess
+import sys
+
+from benchlib import counters
+
+LIBDIR = os.path.dirname(os.path.dirname(os.path.abspath(counters.__file__)))
+
+
+def test_add_and_reset():
+    counters.reset()
+    counters.add('bytes', 10)
+    counters.add('bytes', 5)
+    counters.add('digits')
+    assert counters.counts() == {'bytes': 15, 'digits': 1}
+    counters.reset()
+    assert counters.counts() == {}
+
+
+def test_counts_reported_at_exit_by_the_parent_only():
+    r, w = os.pipe()
+    env = dict(os.environ, BENCH_COUNTER_FD=str(w), PYTHONPATH=LIBDIR)
+    code = ('import os; from benchlib import counters; counters.add("nodes", 7)\n'
+            'if os.fork() == 0:\n    counters.add("nodes", 1); raise SystemExit\n'
+            'os.wait()')
+    subprocess.check_call([sys.executable, '-c', code], env=env, pass_fds=(w,))
+    os.close(w)
+    with os.fdopen(r, 'rb') as f:
+        assert json.loads(f.read().decode()) == {'nodes': 7}
@@ -0,0 +1,80 @@
+import os
+from operator import mul
+
+import pytest
+
+from benchlib import executor as E
+
+
+def square(x):
+    return x * x
+
+
+@pytest.mark.parametrize('name', sorted(E.BACKENDS))
+def test_backends_agree(monkeypatch, name):
+    monkeypatch.setenv(E.ENV_VAR, name)
+    with E.get_executor(processes=2) as ex:
+        assert ex.name == name
+        assert ex.map(square, range(10)) == [x * x for x in range(10)]
+        assert list(ex.imap(square, range(5))) == [0, 1, 4, 9, 16]
+        assert sorted(ex.imap_unordered(square, range(5))) == [0, 1, 4, 9, 16]
+        assert ex.starmap(mul, [(2, 3), (4, 5)]) == [6, 20]
+
+
+def reverse(data):
+    return data[::-1]
+
+
+def test_shared_memory_backend_moves_large_bytes(monkeypatch):
+    monkeypatch.setattr(E.SharedMemoryExecutor, 'THRESHOLD', 1000)
+    big = bytes(range(256)) * 40
+    with E.SharedMemoryExecutor(processes=2) as ex:
+        assert ex.map(reverse, [big, b'small']) == [big[::-1], b'llams']
+        assert ex.starmap(mul, [(big, 2), (3, 4)]) == [big * 2, 12]
+        assert list(ex.imap(reverse, [big] * 3)) == [big[::-1]] * 3
+        assert ex._blocks
+    assert not ex._blocks
+
+
+def test_state_sharing_flags():
+    assert E.SerialExecutor().shares_parent_state
+    assert not E.SerialExecutor().uses_processes
+    assert E.ThreadExecutor().shares_parent_state
+    assert E.ForkExecutor().shares_parent_state
+    assert not E.SpawnExecutor().shares_parent_state
+    assert E.SpawnExecutor().uses_processes
+
+
+def test_environment_overrides_default(monkeypatch):
+    monkeypatch.delenv(E.ENV_VAR, raising=False)
+    assert E.get_executor('serial').name == 'serial'
+    monkeypatch.setenv(E.ENV_VAR, 'threads')
+    assert E.get_executor('serial').name == 'threads'
+    monkeypatch.setenv(E.ENV_VAR, 'bogus')
+    with pytest.raises(ValueError):
+        E.get_executor()
+
+
+def test_select_from_argv_strips_flag(monkeypatch):
+    monkeypatch.delenv(E.ENV_VAR, raising=False)
+    argv = ['binarytrees.py', '--executor', 'threads', '21']
+    assert E.select_from_argv(argv) == 'threads'
+    assert argv == ['binarytrees.py', '21']
+    assert os.environ[E.ENV_VAR] == 'threads'
+
+    argv = ['spectralnorm.py', '5500', '--executor=serial']
+    assert E.select_from_argv(argv) == 'serial'
+    assert argv == ['spectralnorm.py', '5500']
+    assert E.select_from_argv(argv) is None
+
+
+def test_kept_alive_reuses_executors(monkeypatch):
+    monkeypatch.setenv(E.ENV_VAR, 'threads')
+    with E.kept_alive():
+        with E.get_executor(processes=2) as first:
+            first.map(square, range(4))
+        with E.get_executor(processes=2) as second:
+            assert second._executor is first._executor
+            assert second._executor._pool is not None
+    assert first._executor._pool is None
+    assert E.get_executor(processes=2) is not first
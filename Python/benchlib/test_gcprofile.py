@@ -0,0 +1,66 @@
+import gc
+import json
+import os
+import subprocess
+import sys
+
+from benchlib import gcprofile
+
+LIBDIR = os.path.dirname(os.path.dirname(os.path.abspath(gcprofile.__file__)))
+
+
+def test_recorder_counts_collections():
+    recorder = gcprofile.Recorder(examine=True).install()
+    try:
+        gc.collect(0)
+        gc.collect()
+    finally:
+        recorder.uninstall()
+    assert recorder.collections[0] >= 1 and recorder.collections[2] >= 1
+    assert recorder.longest > 0 and sum(recorder.pause) >= recorder.longest
+    assert recorder.examined > 0
+    assert recorder.callback not in gc.callbacks
+
+
+def test_construction_disables_the_collector_only_under_its_policy(monkeypatch):
+    assert gc.isenabled()
+    with gcprofile.construction():
+        assert gc.isenabled()
+    monkeypatch.setattr(gcprofile, 'policy', 'no-gc-build')
+    with gcprofile.construction():
+        assert not gc.isenabled()
+    assert gc.isenabled()
+
+
+def _report(policy, code):
+    r, w = os.pipe()
+    env = dict(os.environ, BENCH_GC_FD=str(w), BENCH_GC_POLICY=policy, PYTHONPATH=LIBDIR)
+    subprocess.check_call([sys.executable, '-c', code], env=env, pass_fds=(w,))
+    os.close(w)
+    with os.fdopen(r, 'rb') as f:
+        return json.loads(f.read().decode())
+
+
+def test_policies_apply_and_report_at_exit():
+    code = ('import gc; from benchlib import gcprofile\n'
+            'print(gc.get_threshold())\n'
+            'junk = [[i] for i in range(100000)]\n'
+            'gcprofile.long_lived()\n'
+            'assert (gc.get_freeze_count() > 0) == (gcprofile.policy == "freeze")\n')
+    default = _report('default', code)
+    relaxed = _report('thresholds', code)
+    frozen = _report('freeze', code)
+    assert default['policy'] == 'default' and frozen['policy'] == 'freeze'
+    assert relaxed['collections'][0] < default['collections'][0]
+    assert default['examined'] is None
+
+
+def test_freeze_without_gc_freeze_is_an_error(monkeypatch):
+    monkeypatch.setenv(gcprofile.POLICY_VAR, 'freeze')
+    monkeypatch.delattr(gc, 'freeze')
+    try:
+        gcprofile._policy()
+    except ValueError as e:
+        assert 'gc.freeze' in str(e)
+    else:
+        raise AssertionError('the freeze policy ran without gc.freeze')
@@ -0,0 +1,22 @@
+import os
+import subprocess
+import sys
+
+from benchlib import phases
+
+LIBDIR = os.path.dirname(os.path.dirname(os.path.abspath(phases.__file__)))
+
+
+def test_disabled_by_default():
+    if not phases.enabled():
+        assert phases.phase('parse') is None
+
+
+def test_markers_written_to_inherited_fd():
+    r, w = os.pipe()
+    env = dict(os.environ, BENCH_PHASE_FD=str(w), PYTHONPATH=LIBDIR)
+    code = 'from benchlib.phases import phase; phase("parse"); phase("count")'
+    subprocess.check_call([sys.executable, '-c', code], env=env, pass_fds=(w,))
+    os.close(w)
+    with os.fdopen(r, 'rb') as f:
+        assert f.read() == b'parse\ncount\n'
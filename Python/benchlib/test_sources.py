@@ -0,0 +1,24 @@
+import os
+
+from benchlib import sources
+
+
+def test_every_module_has_a_source():
+    for name in list(sources.MODULES) + list(sources.ALIASES):
+        assert os.path.isfile(sources.path(name)), name
+
+
+def test_aliases_are_the_same_module():
+    sources.install()
+    import k_nucleotide
+    import knucleotide
+    assert k_nucleotide is knucleotide
+    assert sources.load('spectral_norm') is sources.load('spectralnorm')
+    assert hasattr(k_nucleotide, 'count_frequencies')
+
+
+def test_finder_wins_over_namespace_packages():
+    # Python/fasta is a folder, so on sys.path it would import as a namespace package
+    fasta = sources.load('fasta')
+    assert fasta.__file__ == sources.path('fasta')
+    assert callable(fasta.random_fasta)
@@ -0,0 +1,54 @@
+# Binary Trees with the nodes in an arena instead of nested tuples.
+#
+# A tree of depth d is one array('i') with a slot per internal node, in
+# heap order.  A slot holds the index of the node's first child, the second
+# child being the next index (siblings are allocated together); indices at
+# or past the end of the array are leaves, which need no storage.  That is
+# 4 bytes per internal node instead of a 56-byte tuple, and one object
+# with no references for the cyclic garbage collector to look at.
+# check_tree follows the stored indices, so it visits the same nodes as the
+# tuple version and the checks, hence the output, are the same.
+#
+# Run it like binarytrees.py: python3 arena.py 21
+
+import os
+import sys
+from array import array
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import binarytrees
+
+
+def make_tree(d):
+
+    internal = (1 << d) - 1
+    return array('i', range(1, 2 * internal, 2))
+
+
+def _walk(i, children, leaves):
+
+    if i >= leaves:
+        return 1
+    l = children[i]
+    return 1 + _walk(l, children, leaves) + _walk(l + 1, children, leaves)
+
+
+def check_tree(tree, root=0):
+
+    return _walk(root, tree, len(tree))
+
+
+def make_check(itde, make=make_tree, check=check_tree):
+
+    i, d = itde
+    return check(make(d))
+
+
+def main(n, min_depth=4):
+
+    binarytrees.main(n, min_depth, engine=sys.modules[__name__])
+
+
+if __name__ == '__main__':
+    binarytrees.select_from_argv(sys.argv)
+    main(int(sys.argv[1]))
@@ -5,8 +5,14 @@
 # modified by Dominique Wahli and Daniel Nanz
 # modified by Joerg Baumann
 
+import os
 import sys
 import multiprocessing as mp
+from functools import partial
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+from benchlib import counters, gcprofile, phases
+from benchlib.executor import get_executor, select_from_argv
 
 
 def make_tree(d):
@@ -45,32 +51,114 @@ def get_argchunks(i, d, chunksize=5000):
         yield chunk
 
 
-def main(n, min_depth=4):
+def get_ranges(i, d, workers):
 
-    max_depth = max(min_depth + 2, n)
-    stretch_depth = max_depth + 1
-    if mp.cpu_count() > 1:
-        pool = mp.Pool()
-        chunkmap = pool.map
-    else:
-        chunkmap = map
+    # (depth, count) descriptors, one per worker: the worker builds and
+    # checks its count of trees and sends back one partial checksum
+    workers = max(1, min(workers, i))
+    share, extra = divmod(i, workers)
+    return [(d, share + 1 if w < extra else share) for w in range(workers)]
+
+
+def check_range(dc, make_check=make_check):
+
+    d, count = dc
+    cs = 0
+    with gcprofile.construction():
+        for k in range(1, count + 1):
+            cs += make_check((k, d))
+    return cs
+
+
+def check_task(task, make_check=make_check, counts=None):
+
+    # counts, if given, returns the engine's own counts in this process;
+    # what the range added to them goes back with its checksum, since a
+    # worker's counters never reach the parent
+    index, dc = task
+    if counts is None:
+        return index, check_range(dc, make_check), {}
+    before = counts()
+    cs = check_range(dc, make_check)
+    return index, cs, dict((unit, n - before.get(unit, 0)) for unit, n in counts().items())
 
-    print('stretch tree of depth {0}\t check: {1}'.format(
-          stretch_depth, make_check((0, stretch_depth))))
 
-    long_lived_tree = make_tree(max_depth)
+def get_tasks(max_depth, min_depth, workers):
 
+    # the stretch tree, then the ranges of every depth; the index of a task
+    # is its place in this list, which is also the order of the output
+    mmd = max_depth + min_depth
+    tasks = [(max_depth + 1, 1)]
+    for d in range(min_depth, max_depth + 1, 2):
+        tasks.extend(get_ranges(2 ** (mmd - d), d, workers))
+    return tasks
+
+
+def longest_first(tasks):
+
+    def nodes(index):
+        d, count = tasks[index]
+        return count * ((1 << (d + 1)) - 1)
+    order = sorted(range(len(tasks)), key=nodes, reverse=True)
+    return [(index, tasks[index]) for index in order]
+
+
+def main(n, min_depth=4, engine=None):
+
+    # an engine is a module with its own make_tree, check_tree and make_check
+    # (arena.py), and optionally counts (nodepool.py); the output is the
+    # same whichever one builds the trees
+    engine = engine or sys.modules[__name__]
+    max_depth = max(min_depth + 2, n)
+    stretch_depth = max_depth + 1
+    with get_executor('processes' if mp.cpu_count() > 1 else 'serial') as executor:
+        task = partial(check_task, make_check=engine.make_check,
+                       counts=getattr(engine, 'counts', None))
+        workers = executor.workers
+        if phases.enabled():
+            # empty ranges: the first round starts the pool, the second one
+            # costs what handing out a round of descriptors costs
+            phases.phase('pool startup')
+            executor.map(task, [(0, (min_depth, 0))] * workers)
+            phases.phase('dispatch')
+            executor.map(task, [(0, (min_depth, 0))] * workers)
+
+        # every tree but the long-lived one goes to the pool at once, biggest
+        # first, and the parent builds the long-lived tree meanwhile; the
+        # checks are put back in the original order for printing
+        phases.phase('trees')
+        tasks = get_tasks(max_depth, min_depth, workers)
+        results = executor.imap_unordered(task, longest_first(tasks))
+        with gcprofile.construction():
+            long_lived_tree = engine.make_tree(max_depth)
+        gcprofile.long_lived()
+        checks = [0] * len(tasks)
+        engine_counts = {}
+        for index, cs, added in results:
+            checks[index] = cs
+            for unit, count in added.items():
+                engine_counts[unit] = engine_counts.get(unit, 0) + count
+
+    # a tree's check is its node count, so the checksums count the nodes
+    nodes = checks[0]
+    print('stretch tree of depth {0}\t check: {1}'.format(stretch_depth, checks[0]))
     mmd = max_depth + min_depth
     for d in range(min_depth, stretch_depth, 2):
-        i = 2 ** (mmd - d)
-        cs = 0
-        for argchunk in get_argchunks(i,d):
-            cs += sum(chunkmap(make_check, argchunk))
-        print('{0}\t trees of depth {1}\t check: {2}'.format(i, d, cs))
+        cs = sum(checks[index] for index in range(1, len(tasks)) if tasks[index][0] == d)
+        print('{0}\t trees of depth {1}\t check: {2}'.format(2 ** (mmd - d), d, cs))
+        nodes += cs
 
-    print('long lived tree of depth {0}\t check: {1}'.format(
-          max_depth, check_tree(long_lived_tree)))
+    phases.phase('long-lived check')
+    check = engine.check_tree(long_lived_tree)
+    nodes += check
+    print('long lived tree of depth {0}\t check: {1}'.format(max_depth, check))
+    counters.add('nodes allocated', nodes)
+    counters.add('nodes checked', nodes)
+    counters.add('tasks dispatched', len(tasks))
+    for unit, count in engine_counts.items():
+        counters.add(unit, count)
 
 
 if __name__ == '__main__':
+    select_from_argv(sys.argv)
     main(int(sys.argv[1]))
\ No newline at end of file
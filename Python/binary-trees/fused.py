@@ -0,0 +1,49 @@
+# Binary Trees with each short-lived tree counted as it is built.
+#
+# make_check in binarytrees.py builds a whole tree and then walks it, so a
+# tree of depth d has all of its 2 ** d - 1 internal tuples alive at once
+# (8M at the stretch depth of the production run).  Here every internal
+# node is still allocated as a (left, right) tuple, but it holds the node
+# counts of its two subtrees, which are dropped as soon as they have been
+# counted: at most d nodes are alive, one per level of the recursion.  The
+# allocations are the same as the classic mode's, without the retention
+# and the separate walk; comparing the two variants (harness.variants) or
+# the make_check and make_check_fused kernels (harness.micro) tells the
+# cost of allocation apart from that of traversal.
+#
+# The long-lived tree has to stay, so it is built and checked the classic
+# way.
+#
+# Run it like binarytrees.py: python3 fused.py 21
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import binarytrees
+from binarytrees import make_tree, check_tree
+
+
+def build_count(d):
+
+    if d > 0:
+        d -= 1
+        node = (build_count(d), build_count(d))
+        return 1 + node[0] + node[1]
+    return 1
+
+
+def make_check(itde):
+
+    i, d = itde
+    return build_count(d)
+
+
+def main(n, min_depth=4):
+
+    binarytrees.main(n, min_depth, engine=sys.modules[__name__])
+
+
+if __name__ == '__main__':
+    binarytrees.select_from_argv(sys.argv)
+    main(int(sys.argv[1]))
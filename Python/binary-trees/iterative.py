@@ -0,0 +1,53 @@
+# Binary Trees without recursion.
+#
+# The trees are the same nested (left, right) tuples as in binarytrees.py,
+# with the same shared (None, None) leaf, but no Python frame is pushed per
+# node.  make_tree stacks d pairing zip() iterators over the leaves, so the
+# tuples are built in C, children first; check_tree counts the nodes level
+# by level, with chain() and filter() dropping the leaves' None children.
+# Neither depends on the recursion limit, which matters for trees that are
+# deep rather than large (see test_iterative.py).
+#
+# Run it like binarytrees.py: python3 iterative.py 21
+
+import os
+import sys
+from itertools import chain, repeat
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import binarytrees
+
+
+def make_tree(d):
+
+    level = repeat((None, None), 1 << d)
+    for _ in range(d):
+        # consecutive pairs of the level below: ((l0, r0), (l1, r1), ...)
+        level = zip(level, level)
+    return next(level)
+
+
+def check_tree(node):
+
+    count = 0
+    level = [node]
+    while level:
+        count += len(level)
+        level = list(filter(None, chain.from_iterable(level)))
+    return count
+
+
+def make_check(itde, make=make_tree, check=check_tree):
+
+    i, d = itde
+    return check(make(d))
+
+
+def main(n, min_depth=4):
+
+    binarytrees.main(n, min_depth, engine=sys.modules[__name__])
+
+
+if __name__ == '__main__':
+    binarytrees.select_from_argv(sys.argv)
+    main(int(sys.argv[1]))
@@ -0,0 +1,77 @@
+# Binary Trees with the short-lived trees built into reused storage.
+#
+# The trees of arena.py are arrays of child indices; here every process
+# keeps one such array per depth in its NodePool and builds each tree of
+# that depth over it, overwriting the previous one, instead of allocating
+# and freeing 2 ** (d + 1) - 1 nodes a tree.  A worker thus allocates
+# storage for one tree of each depth it is given, less than twice the
+# largest one, however many trees it builds.  The long-lived tree outlives
+# the loop, so it gets an array of its own from arena.make_tree.
+#
+# Each process has its own pool; every range of trees sends back what it
+# added to the pool's counts (see counts below), and the main process adds
+# them up into benchlib.counters, whichever executor runs the ranges.
+#
+# Run it like binarytrees.py: python3 nodepool.py 21
+
+import os
+import sys
+from array import array
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import binarytrees
+from arena import make_tree, check_tree
+
+
+class NodePool(object):
+    """The node storage of one process: an array per depth, reused by every
+    tree of that depth."""
+
+    def __init__(self):
+        self.buffers = {}
+        self.allocated = 0
+        self.allocated_bytes = 0
+        self.reused = 0
+
+    def build(self, d):
+        internal = (1 << d) - 1
+        tree = self.buffers.get(d)
+        if tree is None:
+            tree = self.buffers[d] = array('i', bytes(4 * internal))
+            self.allocated += 1
+            self.allocated_bytes += tree.itemsize * internal
+        else:
+            self.reused += 1
+        # bump allocation, breadth first: node i's children are the next
+        # two free slots, which puts the tree in heap order as in arena.py
+        free = 1
+        for i in range(internal):
+            tree[i] = free
+            free += 2
+        return tree
+
+
+pool = NodePool()
+
+
+def make_check(itde, make=pool.build, check=check_tree):
+
+    i, d = itde
+    return check(make(d))
+
+
+def counts():
+
+    return {'node buffers allocated': pool.allocated,
+            'node buffer bytes allocated': pool.allocated_bytes,
+            'trees built in reused buffers': pool.reused}
+
+
+def main(n, min_depth=4):
+
+    binarytrees.main(n, min_depth, engine=sys.modules[__name__])
+
+
+if __name__ == '__main__':
+    binarytrees.select_from_argv(sys.argv)
+    main(int(sys.argv[1]))
@@ -0,0 +1,102 @@
+# Binary Trees with hash-consed nodes.
+#
+# All subtrees of one depth in a perfect binary tree are equal, so here a
+# node is only created once for every distinct pair of children: cons()
+# looks the pair up in a table of the nodes made so far.  make_tree(d) is
+# then d lookups and a tree of depth d has d + 1 physical nodes for its
+# 2 ** (d + 1) - 1 logical ones; check_tree remembers the count of every
+# node it has seen, so checking a shared subtree again is one lookup.
+# This is the lower bound for the allocation-heavy engines, and works at
+# depths no other engine can build (make_tree(1000) is fine).
+#
+# Each process has its own table; the main process reports its physical
+# node count through benchlib.counters.
+#
+# Run it like binarytrees.py: python3 shared.py 21
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import binarytrees
+from benchlib import counters
+
+LEAF = (None, None)
+
+# (id(left), id(right)) -> node, and id(node) -> (node, check); the nodes
+# are kept alive by the tables, so their ids cannot be reused
+_nodes = {}
+_checks = {id(LEAF): (LEAF, 1)}
+
+
+def cons(left, right):
+
+    key = (id(left), id(right))
+    node = _nodes.get(key)
+    if node is None:
+        node = _nodes[key] = (left, right)
+    return node
+
+
+def make_tree(d):
+
+    node = LEAF
+    for _ in range(d):
+        node = cons(node, node)
+    return node
+
+
+def check_tree(node):
+
+    # post-order over the nodes not checked yet, without recursion
+    stack = [node]
+    while stack:
+        top = stack[-1]
+        if id(top) in _checks:
+            stack.pop()
+            continue
+        l, r = top
+        if l is None:
+            _checks[id(top)] = (top, 1)
+            stack.pop()
+            continue
+        pending = [child for child in (l, r) if id(child) not in _checks]
+        if pending:
+            stack.extend(pending)
+            continue
+        _checks[id(top)] = (top, 1 + _checks[id(l)][1] + _checks[id(r)][1])
+        stack.pop()
+    return _checks[id(node)][1]
+
+
+def node_counts(node):
+    """(logical, physical) nodes of a tree: its check, and the distinct
+    node objects in it."""
+
+    seen = set()
+    stack = [node]
+    while stack:
+        top = stack.pop()
+        if id(top) not in seen:
+            seen.add(id(top))
+            if top[0] is not None:
+                stack.extend(top)
+    return check_tree(node), len(seen)
+
+
+def make_check(itde, make=make_tree, check=check_tree):
+
+    i, d = itde
+    return check(make(d))
+
+
+def main(n, min_depth=4):
+
+    before = len(_nodes)
+    binarytrees.main(n, min_depth, engine=sys.modules[__name__])
+    counters.add('physical nodes allocated', len(_nodes) - before)
+
+
+if __name__ == '__main__':
+    binarytrees.select_from_argv(sys.argv)
+    main(int(sys.argv[1]))
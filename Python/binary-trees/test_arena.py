@@ -0,0 +1,21 @@
+import gc
+import sys
+
+import arena
+import binarytrees
+
+
+def test_checks_match_the_tuple_trees():
+    for d in range(0, 13):
+        assert arena.check_tree(arena.make_tree(d)) == binarytrees.check_tree(
+            binarytrees.make_tree(d)) == (1 << (d + 1)) - 1
+    assert arena.make_check((1, 7)) == binarytrees.make_check((1, 7))
+
+
+def test_arena_is_compact_and_untracked():
+    tree = arena.make_tree(16)
+    assert len(gc.get_referents(tree)) <= 1     # at most its type
+    # a tuple per internal node, the leaves being one shared (None, None)
+    tuples = ((1 << 16) - 1) * sys.getsizeof((None, None))
+    assert sys.getsizeof(tree) * 10 < tuples
+
@@ -0,0 +1,20 @@
+import pytest
+
+import arena
+import binarytrees
+import fused
+import iterative
+import nodepool
+import shared
+
+
+@pytest.mark.parametrize('executor', ['serial', 'processes'])
+@pytest.mark.parametrize('engine', [arena, iterative, fused, shared, nodepool],
+                         ids=lambda engine: engine.__name__)
+def test_main_prints_the_same(engine, executor, capsys, monkeypatch):
+    # under processes the trees are built and checked in the pool's workers
+    monkeypatch.setenv('BENCH_EXECUTOR', executor)
+    binarytrees.main(8)
+    expected = capsys.readouterr().out
+    engine.main(8)
+    assert capsys.readouterr().out == expected
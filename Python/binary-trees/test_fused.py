@@ -0,0 +1,26 @@
+import tracemalloc
+
+import binarytrees
+import fused
+
+
+def test_counts_match_the_classic_mode():
+    for d in range(0, 13):
+        assert fused.make_check((1, d)) == binarytrees.make_check((1, d)) == (1 << (d + 1)) - 1
+
+
+def _peak(func, *args):
+    tracemalloc.start()
+    try:
+        func(*args)
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def test_peak_memory_is_bounded_by_depth():
+    classic = _peak(binarytrees.make_check, (1, 14))
+    streaming = _peak(fused.make_check, (1, 14))
+    assert streaming * 100 < classic
+    assert _peak(fused.make_check, (1, 16)) < 2 * streaming + 1024
+
@@ -0,0 +1,28 @@
+import sys
+
+import pytest
+
+import binarytrees
+import iterative
+
+
+def test_same_tuples_as_the_recursive_version():
+    for d in range(0, 11):
+        tree = iterative.make_tree(d)
+        assert tree == binarytrees.make_tree(d)
+        assert iterative.check_tree(tree) == binarytrees.check_tree(tree) == (1 << (d + 1)) - 1
+    # one leaf object for the whole tree, as with the recursive version
+    tree = iterative.make_tree(3)
+    assert tree[0][0][0] is tree[1][1][1]
+
+
+def test_deep_trees_need_no_recursion_limit():
+    depth = 4 * sys.getrecursionlimit()
+    leaf = (None, None)
+    spine = leaf
+    for _ in range(depth):
+        spine = (spine, leaf)
+    assert iterative.check_tree(spine) == 2 * depth + 1
+    with pytest.raises(RecursionError):
+        binarytrees.check_tree(spine)
+
@@ -0,0 +1,46 @@
+import binarytrees
+import nodepool
+from benchlib import counters
+
+
+def test_trees_of_a_depth_share_one_buffer():
+    pool = nodepool.NodePool()
+    first = pool.build(6)
+    assert nodepool.check_tree(first) == binarytrees.check_tree(binarytrees.make_tree(6))
+    for _ in range(10):
+        assert pool.build(6) is first
+    pool.build(4)
+    assert pool.allocated == 2 and pool.reused == 10
+    assert pool.allocated_bytes == 4 * ((1 << 6) - 1 + (1 << 4) - 1)
+
+
+def test_make_check_matches_the_tuple_trees():
+    for d in range(0, 12):
+        assert nodepool.make_check((1, d)) == binarytrees.make_check((1, d))
+
+
+def test_main_prints_the_same_and_counts_buffers(capsys, monkeypatch):
+    monkeypatch.setenv('BENCH_EXECUTOR', 'serial')
+    monkeypatch.setattr(nodepool.pool, 'buffers', {})
+    binarytrees.main(8)
+    expected = capsys.readouterr().out
+    counters.reset()
+    nodepool.main(8)
+    assert capsys.readouterr().out == expected
+    counts = counters.counts()
+    # stretch tree and one buffer per loop depth (4, 6, 8)
+    assert counts['node buffers allocated'] == 4
+    assert counts['trees built in reused buffers'] == 2 ** 8 + 2 ** 6 + 2 ** 4 - 3
+
+
+def test_main_adds_up_the_workers_buffers(capsys, monkeypatch):
+    monkeypatch.setenv('BENCH_EXECUTOR', 'processes')
+    monkeypatch.setattr(nodepool.pool, 'buffers', {})
+    counters.reset()
+    nodepool.main(8)
+    capsys.readouterr()
+    counts = counters.counts()
+    # every tree but the long-lived one is built in a worker's pool
+    assert counts['node buffers allocated'] >= 4
+    assert (counts['node buffers allocated'] + counts['trees built in reused buffers']
+            == 1 + 2 ** 8 + 2 ** 6 + 2 ** 4)
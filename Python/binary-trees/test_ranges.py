@@ -0,0 +1,61 @@
+import binarytrees
+from benchlib import counters
+
+
+def test_ranges_split_the_trees_evenly():
+    ranges = binarytrees.get_ranges(10, 6, 4)
+    assert ranges == [(6, 3), (6, 3), (6, 2), (6, 2)]
+    assert binarytrees.get_ranges(3, 6, 8) == [(6, 1)] * 3
+    assert binarytrees.get_ranges(5, 6, 1) == [(6, 5)]
+
+
+def test_one_partial_checksum_per_range():
+    expected = sum(binarytrees.make_check((k, 6)) for k in range(1, 11))
+    assert sum(map(binarytrees.check_range, binarytrees.get_ranges(10, 6, 4))) == expected
+    assert binarytrees.check_range((6, 0)) == 0
+
+
+def test_one_task_graph_longest_first():
+    tasks = binarytrees.get_tasks(8, 4, 2)
+    assert tasks == [(9, 1), (4, 128), (4, 128), (6, 32), (6, 32), (8, 8), (8, 8)]
+    order = binarytrees.longest_first(tasks)
+    assert sorted(order) == list(enumerate(tasks))
+    sizes = [count * (2 ** (d + 1) - 1) for _, (d, count) in order]
+    assert sizes == sorted(sizes, reverse=True) and order[0] == (5, (8, 8))
+    assert binarytrees.check_task((3, (6, 2))) == (3, 2 * 127, {})
+
+
+def test_output_keeps_the_original_order(capsys, monkeypatch):
+    monkeypatch.setenv('BENCH_EXECUTOR', 'serial')
+    counters.reset()
+    binarytrees.main(8)
+    # the stretch tree and one range per depth (4, 6 and 8)
+    assert counters.counts()['tasks dispatched'] == 4
+    assert capsys.readouterr().out.splitlines() == [
+        'stretch tree of depth 9\t check: 1023',
+        '256\t trees of depth 4\t check: 7936',
+        '64\t trees of depth 6\t check: 8128',
+        '16\t trees of depth 8\t check: 8176',
+        'long lived tree of depth 8\t check: 511',
+    ]
+
+
+class BrokenEngine(object):
+    make_check = staticmethod(binarytrees.make_check)
+    check_tree = staticmethod(binarytrees.check_tree)
+
+    @staticmethod
+    def make_tree(d):
+        raise MemoryError('long-lived tree')
+
+
+def test_pool_is_closed_when_main_fails(monkeypatch):
+    import multiprocessing
+    monkeypatch.setenv('BENCH_EXECUTOR', 'processes')
+    try:
+        binarytrees.main(8, engine=BrokenEngine)
+    except MemoryError:
+        pass
+    else:
+        raise AssertionError('main did not fail')
+    assert multiprocessing.active_children() == []
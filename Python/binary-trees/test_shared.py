@@ -0,0 +1,32 @@
+import binarytrees
+import shared
+from benchlib import counters
+
+
+def test_checks_match_the_tuple_trees():
+    for d in range(0, 12):
+        tree = shared.make_tree(d)
+        assert tree == binarytrees.make_tree(d)
+        assert shared.check_tree(tree) == binarytrees.check_tree(tree) == (1 << (d + 1)) - 1
+
+
+def test_equal_subtrees_are_one_node():
+    tree = shared.make_tree(10)
+    assert tree[0] is tree[1] and shared.make_tree(10) is tree
+    assert shared.cons(shared.LEAF, shared.LEAF) is shared.make_tree(1)
+    assert shared.node_counts(tree) == (2 ** 11 - 1, 11)
+
+
+def test_very_deep_trees():
+    d = 3000
+    logical, physical = shared.node_counts(shared.make_tree(d))
+    assert logical == 2 ** (d + 1) - 1 and physical == d + 1
+
+
+def test_main_counts_the_physical_nodes(capsys, monkeypatch):
+    # the parent's nodes; under a process pool the workers' are not counted
+    monkeypatch.setenv('BENCH_EXECUTOR', 'serial')
+    counters.reset()
+    shared.main(8)
+    capsys.readouterr()
+    assert counters.counts()['physical nodes allocated'] <= 9
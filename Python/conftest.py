@@ -0,0 +1,9 @@
+# The benchmark tests import the programs by module name (``k_nucleotide``,
+# ``spectral_norm``, ...); benchlib.sources maps those names to the files.
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from benchlib import sources
+
+sources.install()
@@ -4,10 +4,16 @@
 # contributed by Joerg Baumann
 # many thanks to Oleg Mazurov for his helpful description
 
+import os
+import sys
 from sys import argv
 from math import factorial
-from multiprocessing import cpu_count, Pool
-from itertools import islice, starmap
+from multiprocessing import cpu_count
+from itertools import islice
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+from benchlib import counters
+from benchlib.executor import get_executor, select_from_argv
 
 def permutations(n, start, size):
     p = bytearray(range(n))
@@ -93,14 +99,13 @@ def fannkuch(n):
 
         task_args = [(n, i * task_size, task_size) for i in range(task_count)]
 
-        if task_count > 1:
-            with Pool() as pool:
-                checksums, maximums = zip(*pool.starmap(task, task_args))
-        else:
-            checksums, maximums = zip(*starmap(task, task_args))
+        with get_executor('processes' if task_count > 1 else 'serial') as executor:
+            checksums, maximums = zip(*executor.starmap(task, task_args))
 
         checksum, maximum = sum(checksums), max(maximums)
+        counters.add('permutations', total)
         print("{0}\nPfannkuchen({1}) = {2}".format(checksum, n, maximum))
 
 if __name__ == "__main__":
+    select_from_argv(argv)
     fannkuch(int(argv[1]))
@@ -6,9 +6,14 @@
 # modified by Justin Peel
 # Modified by Christopher Sean Forgeron
 
+import os
 import sys
 import bisect
 
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+from benchlib import counters
+from benchlib.phases import phase
+
 alu = (
    'GGCCGGGCGCGGTGGCTCACGCCTGTAATCCCAGCACTTTGG'
    'GAGGCCGAGGCGGGCGGATCACCTGAGGTCAGGAGTTCGAGA'
@@ -120,17 +125,28 @@ def random_fasta(table, n, seed):
 
     return seed
 
+def fasta_bytes(header, n, width=60):
+    """Bytes written for a sequence of ``n`` symbols under ``header``."""
+    return len(header) + n + (n + width - 1) // width
+
+
 def main():
     n = int(sys.argv[1])
+    counters.add('bytes', fasta_bytes(b'>ONE Homo sapiens alu\n', n * 2)
+                 + fasta_bytes(b'>TWO IUB ambiguity codes\n', n * 3)
+                 + fasta_bytes(b'>THREE Homo sapiens frequency\n', n * 5))
     nprint = sys.stdout.buffer.write
+    phase('repeat')
     nprint(b'>ONE Homo sapiens alu\n')
     repeat_fasta(alu, n * 2)
 
     # We need to keep track of the state of 'seed' so we pass it in, and return
     # it back so our output can pass the diff test
+    phase('iub')
     nprint(b'>TWO IUB ambiguity codes\n')
     seed=random_fasta(iub, n * 3, seed=42.0)
 
+    phase('homosapiens')
     nprint(b'>THREE Homo sapiens frequency\n')
     random_fasta(homosapiens, n * 5, seed)
 
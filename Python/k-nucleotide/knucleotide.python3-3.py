@@ -4,10 +4,16 @@
 # submitted by Joerg Baumann
 
 from os import cpu_count
-from sys import stdin
+from sys import argv, stdin
 from collections import defaultdict
 from itertools import starmap, chain
-from multiprocessing import Pool
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+from benchlib import counters
+from benchlib.executor import get_executor, select_from_argv
+from benchlib.phases import phase
 
 lean_buffer = {}
 
@@ -149,8 +155,10 @@ def main():
     def display_list(k_nucleotides):
         return [(n, len(n), str_to_bits(n)) for n in k_nucleotides]
 
+    phase('parse')
     sequence = read_sequence(stdin.buffer, b'THREE', translation)
 
+    phase('count')
     mono_nucleotides = ('G', 'A', 'T', 'C')
     di_nucleotides = tuple(n + m
         for n in mono_nucleotides for m in mono_nucleotides)
@@ -169,18 +177,24 @@ def main():
         (sequence, reading_frames, partitions[i], partitions[i + 1])
             for i in range(len(partitions) - 1)]
 
-    if n == 1:
-        results = list(chain(*starmap(count_frequencies, count_jobs)))
-    else:
-        lean_jobs = list(starmap(lean_args, count_jobs))
-        with Pool() as pool:
-            async_results = pool.starmap_async(
-                lean_call(count_frequencies), lean_jobs)
-            results = list(chain(*async_results.get()))
+    with get_executor('serial' if n == 1 else 'processes') as executor:
+        if executor.uses_processes and executor.shares_parent_state:
+            # forked workers see the parent's lean_buffer, so only keys are sent
+            lean_jobs = list(starmap(lean_args, count_jobs))
+            results = list(chain(*executor.starmap(
+                lean_call(count_frequencies), lean_jobs)))
+        else:
+            results = list(chain(*executor.starmap(
+                count_frequencies, count_jobs)))
+
+    counters.add('k-mers', sum(
+        len(sequence) - frame + 1 for frame, _ in reading_frames))
 
+    phase('output')
     display(results, display_list(mono_nucleotides), relative=True, sort=True)
     display(results, display_list(di_nucleotides), relative=True, sort=True)
     display(results, display_list(k_nucleotides), end='')
 
 if __name__=='__main__' :
+    select_from_argv(argv)
     main()
\ No newline at end of file
@@ -7,6 +7,12 @@ from contextlib import closing
 from itertools import islice
 from os import cpu_count
 from sys import argv, stdout
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+from benchlib import counters
+from benchlib.executor import get_executor, select_from_argv
 
 def pixels(y, n, abs):
     range7 = bytearray(range(7))
@@ -29,6 +35,32 @@ def pixels(y, n, abs):
         yield pixel
         x += 8
 
+def counted_pixels(y, n, abs, tally):
+    # pixels(), also counting in tally[0] the 7-step blocks run past each
+    # pixel's first one; only used when counters are enabled
+    blocks = 0
+    range7 = bytearray(range(7))
+    pixel_bits = bytearray(128 >> pos for pos in range(8))
+    c1 = 2. / float(n)
+    c0 = -1.5 + 1j * y * c1 - 1j
+    x = 0
+    while True:
+        pixel = 0
+        c = x * c1 + c0
+        for pixel_bit in pixel_bits:
+            z = c
+            for block in range7:
+                for _ in range7:
+                    z = z * z + c
+                if abs(z) >= 2.: break
+            else:
+                pixel += pixel_bit
+            blocks += block
+            c += c1
+        tally[0] = blocks
+        yield pixel
+        x += 8
+
 def compute_row(p):
     y, n = p
 
@@ -36,6 +68,14 @@ def compute_row(p):
     result[-1] &= 0xff << (8 - n % 8)
     return y, result
 
+def compute_counted_row(p):
+    y, n = p
+
+    tally = [0]
+    result = bytearray(islice(counted_pixels(y, n, abs, tally), (n + 7) // 8))
+    result[-1] &= 0xff << (8 - n % 8)
+    return y, result, 7 * (tally[0] + 8 * len(result))
+
 def ordered_rows(rows, n):
     order = [None] * n
     i = 0
@@ -54,21 +94,25 @@ def ordered_rows(rows, n):
 def compute_rows(n, f):
     row_jobs = ((y, n) for y in range(n))
 
-    if cpu_count() < 2:
-        yield from map(f, row_jobs)
-    else:
-        from multiprocessing import Pool
-        with Pool() as pool:
-            unordered_rows = pool.imap_unordered(f, row_jobs)
-            yield from ordered_rows(unordered_rows, n)
+    with get_executor('serial' if cpu_count() < 2 else 'processes') as executor:
+        unordered_rows = executor.imap_unordered(f, row_jobs)
+        yield from ordered_rows(unordered_rows, n)
 
 def mandelbrot(n):
     write = stdout.buffer.write
 
-    with closing(compute_rows(n, compute_row)) as rows:
+    counted = counters.enabled()
+    iterations = 0
+    with closing(compute_rows(n, compute_counted_row if counted else compute_row)) as rows:
         write("P4\n{0} {0}\n".format(n).encode())
         for row in rows:
             write(row[1])
+            if counted:
+                iterations += row[2]
+    counters.add('pixels', n * n)
+    if counted:
+        counters.add('iterations', iterations)
 
 if __name__ == '__main__':
+    select_from_argv(argv)
     mandelbrot(int(argv[1]))
\ No newline at end of file
@@ -6,7 +6,11 @@
 # modified by Maciej Fijalkowski
 # 2to3
 
-import sys 
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+from benchlib import counters
 
 def combinations(l):
     result = []
@@ -93,7 +97,7 @@ def report_energy(bodies=SYSTEM, pairs=PAIRS, e=0.0):
         e -= (m1 * m2) / ((dx * dx + dy * dy + dz * dz) ** 0.5)
     for (r, [vx, vy, vz], m) in bodies:
         e += m * (vx * vx + vy * vy + vz * vz) / 2.
-    print("%.9f" % e)
+    return e
 
 def offset_momentum(ref, bodies=SYSTEM, px=0.0, py=0.0, pz=0.0):
 
@@ -110,6 +114,7 @@ def main(n, ref='sun'):
     offset_momentum(BODIES[ref])
     print("%.9f" % report_energy())
     advance(0.01, n)
+    counters.add('pair interactions', n * len(PAIRS))
     print("%.9f" % report_energy())
 
 if __name__ == '__main__':
@@ -4,6 +4,12 @@
 # contributed by Rene Bakker
 # fixed by Isaac Gouy
 
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+from benchlib import counters
+
 def compute_pi_digits(N):
     from io import StringIO
     from gmpy2 import xmpz, div, mul, add
@@ -51,6 +57,7 @@ def compute_pi_digits(N):
 
     if i % 10 != 0:
         f.write("%s\t:%d\n" % (' ' * (10 - (i % 10)), N))
+    counters.add('digits', N)
     return f.getvalue()
 
 if __name__ == '__main__':
@@ -7,9 +7,15 @@
 # modified by Justin Peel
 # converted from regex-dna program
 
-from sys import stdin
+from sys import argv, stdin
 from re import sub, findall
-from multiprocessing import Pool
+import multiprocessing as mp
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+from benchlib import counters
+from benchlib.executor import get_executor, select_from_argv
 
 def init(arg):
     global seq
@@ -18,39 +24,6 @@ def init(arg):
 def var_find(f):
     return len(findall(f, seq))
 
-def main():
-    seq = stdin.read()
-    ilen = len(seq)
-
-    seq = sub('>.*\n|\n', '', seq)
-    clen = len(seq)
-
-    pool = Pool(initializer = init, initargs = (seq,))
-
-    variants = (
-          'agggtaaa|tttaccct',
-          '[cgt]gggtaaa|tttaccc[acg]',
-          'a[act]ggtaaa|tttacc[agt]t',
-          'ag[act]gtaaa|tttac[agt]ct',
-          'agg[act]taaa|ttta[agt]cct',
-          'aggg[acg]aaa|ttt[cgt]ccct',
-          'agggt[cgt]aa|tt[acg]accct',
-          'agggta[cgt]a|t[acg]taccct',
-          'agggtaa[cgt]|[acg]ttaccct')
-    for f in zip(variants, pool.imap(var_find, variants)):
-        print(f[0], f[1])
-
-    subst = {
-          'tHa[Nt]' : '<4>', 'aND|caN|Ha[DS]|WaS' : '<3>', 'a[NSt]|BY' : '<2>',
-          '<[^>]*>' : '|', '\\|[^|][^|]*\\|' : '-'}
-    for f, r in list(subst.items()):
-        seq = sub(f, r, seq)
-
-    print()
-    print(ilen)
-    print(clen)
-    print(len(seq))
-
 variants = (
     'agggtaaa|tttaccct',
     '[cgt]gggtaaa|tttaccc[acg]',
@@ -68,15 +41,20 @@ subst = {
     '<[^>]*>' : '|', '\\|[^|][^|]*\\|' : '-'
 }
 
-def run_regex_dna(seq):
+def run_regex_dna(seq, default='serial'):
     original_length = len(seq)
     cleaned = sub('>.*\n|\n', '', seq)
     cleaned_length = len(cleaned)
 
-    variant_counts = [(v, len(findall(v, cleaned))) for v in variants]
-
-    for f, r in subst.items():
-        cleaned = sub(f, r, cleaned)
+    # the workers count the variants while this process substitutes
+    with get_executor(default, initializer=init, initargs=(cleaned,)) as executor:
+        found = executor.imap(var_find, variants)
+        scanned = original_length + cleaned_length * len(variants)
+        for f, r in subst.items():
+            scanned += len(cleaned)
+            cleaned = sub(f, r, cleaned)
+        variant_counts = list(zip(variants, found))
+    counters.add('bytes', scanned)
 
     final_length = len(cleaned)
     return {
@@ -88,7 +66,7 @@ def run_regex_dna(seq):
 
 def main():
     seq = stdin.read()
-    results = run_regex_dna(seq)
+    results = run_regex_dna(seq, 'processes' if mp.cpu_count() > 1 else 'serial')
     for v, count in results["variant_counts"]:
         print(v, count)
     print()
@@ -98,4 +76,5 @@ def main():
 
 
 if __name__=="__main__":
+    select_from_argv(argv)
     main()
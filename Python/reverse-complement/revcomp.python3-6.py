@@ -3,8 +3,15 @@
 #
 # contributed by Joerg Baumann
 
-from sys import stdin, stdout
+from sys import argv, stdin, stdout
 from os import cpu_count
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+from benchlib import counters
+from benchlib.executor import get_context, get_executor, select_from_argv
+from benchlib.phases import phase
 
 reverse_translation = bytes.maketrans(
    b'ABCDGHKMNRSTUVWYabcdghkmnrstuvwy',
@@ -26,49 +33,62 @@ def read_sequences(file):
          sequence = bytearray()
          for line in file:
             if line[0] == ord('>'):
+               counters.add('bytes', len(header) + len(sequence))
                yield header, sequence
                header = line
                sequence = bytearray()
             else:
                sequence += line
+         counters.add('bytes', len(header) + len(sequence))
          yield header, sequence
          break
 
-def reverse_and_print_task(q, c, v):
-   while True:
-      i = q.get()
-      if i == None: break
-      h, r = reverse_complement(*data[i])
-      with c:
-         while i != v.value:
-            c.wait()
-      write(h); write(r); flush()
-      with c:
-         v.value = i + 1
-         c.notify_all()
+def init_task(c, v):
+   global cond, turn, write, flush
+   cond, turn = c, v
+   write = stdout.buffer.write
+   flush = stdout.buffer.flush
+
+def reverse_and_print_task(i, header=None, sequence=None):
+   if header is None: header, sequence = data[i]
+   h, r = reverse_complement(header, sequence)
+   with cond:
+      while i != turn.value:
+         cond.wait()
+   write(h); write(r); flush()
+   with cond:
+      turn.value = i + 1
+      cond.notify_all()
 
-if __name__=='__main__' :
+def main():
+   global data, write, flush
    write = stdout.buffer.write
    flush = stdout.buffer.flush
 
+   phase('read')
    s = read_sequences(stdin.buffer)
    data = next(s)
    if cpu_count() == 1 or len(data[1]) < 1000000:
       from itertools import starmap
       def merge(v, g):
          yield v; yield from g
+      phase('reverse-and-write')
       for h, r in starmap(reverse_complement, merge(data, s)):
          write(h); write(r)
    else:
-      from multiprocessing import Process, Queue, Value, Condition
       from ctypes import c_int
 
       data = [data] + list(s)
-      q, c, v = (Queue(), Condition(), Value(c_int, 0))
-      processes = [Process(target=reverse_and_print_task, args=(q, c, v))
-         for _ in range(min(len(data), cpu_count()))]
+      phase('reverse-and-write')
+      ctx = get_context()
+      with get_executor(processes=min(len(data), cpu_count()), initializer=init_task,
+            initargs=(ctx.Condition(), ctx.Value(c_int, 0))) as executor:
+         if executor.shares_parent_state:
+            tasks = ((i,) for i in range(len(data)))
+         else:
+            tasks = ((i, h, r) for i, (h, r) in enumerate(data))
+         executor.starmap(reverse_and_print_task, tasks, 1)
 
-      for p in processes: p.start()
-      for i in range(len(data)): q.put(i)
-      for p in processes: q.put(None)
-      for p in processes: p.join()
\ No newline at end of file
+if __name__=='__main__' :
+   select_from_argv(argv)
+   main()
@@ -8,9 +8,14 @@
 # Concurrency by Jason Stitt
 # 2to3
 
-from multiprocessing import Pool
 from math import sqrt
 from sys import argv
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+from benchlib import counters
+from benchlib.executor import get_executor, select_from_argv
 
 def eval_A(i, j):
     return 1.0 / ((i + j) * (i + j + 1) / 2 + i + 1)
@@ -38,15 +43,18 @@ def main():
     n = int(argv[1])
     u = [1.0] * n
 
-    with Pool(processes=4) as pool:
+    with get_executor(processes=4) as pool:
         for _ in range(10):
             v = eval_AtA_times_u(u, pool)
             u = eval_AtA_times_u(v, pool)
 
         vBv = sum(ue * ve for ue, ve in zip(u, v))
         vv  = sum(ve * ve for ve in v)
+    # each eval_AtA_times_u is two n-by-n products
+    counters.add('mat-vec products', 10 * 2 * 2)
 
     print("%.9f" % sqrt(vBv / vv))
 
 if __name__ == '__main__':
+    select_from_argv(argv)
     main()
@@ -0,0 +1,7 @@
+"""Python-side measurement harness for the Energy-Languages benchmarks.
+
+``compile_all.py`` and ``RAPL/main`` drive every language through its
+Makefile.  The modules in this package complement them with tools that need
+to look inside a run: in-process repetition, interpreter configuration
+matrices and richer result reporting.
+"""
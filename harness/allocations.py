@@ -0,0 +1,194 @@
+"""Allocation sites, peak traced memory and block counts per benchmark phase.
+
+``/usr/bin/time -v`` only gives a run's peak RSS.  This tool runs a
+benchmark once with ``tracemalloc`` on (``benchlib.allocations``, imported
+ahead of the program): the main process is snapshot at every phase marker
+and at exit, and each ``benchlib.executor`` pool worker when it exits.  For
+every phase it prints the peak and final traced memory, the traced blocks,
+and the ``--top`` source lines whose allocations grew the most during the
+phase -- ``count_frequencies``' dicts in k-nucleotide, say, or the
+buffers of ``reverse_complement``.  Snapshots hold the allocations still
+alive, so short-lived ones, such as fannkuch-redux's copies of the
+permutation, only show in the peak.  Tracing slows the program down several
+times, so the runs are not timed; use a small ``--arg``, or for the
+benchmarks that read stdin a small ``--stdin`` file (``fasta``'s output).
+
+With ``--frames N`` the sites are tracebacks of ``N`` frames instead of
+single lines, and ``--keep DIR`` leaves the snapshots in ``DIR`` for
+``tracemalloc.Snapshot.load``.
+
+    python3 -m harness.allocations k-nucleotide --stdin fasta-25000.txt --top 5
+"""
+
+import argparse
+import json
+import os
+import shutil
+import sys
+import tempfile
+import tracemalloc
+from collections import namedtuple
+
+from harness import benchmarks
+from harness.energy import get_meter
+from harness.runner import measure
+
+# benchlib.allocations' settings; the harness does not import benchlib
+ENV_VAR = 'BENCH_TRACEMALLOC_DIR'
+FRAMES_VAR = 'BENCH_TRACEMALLOC_FRAMES'
+
+# Imports benchlib.allocations from the folder given as the first argument,
+# so tracing starts before the benchmark's own imports, then runs the script.
+BOOTSTRAP = ("import runpy, sys; "
+             "sys.path.insert(0, sys.argv[1]); "
+             "import benchlib.allocations; "
+             "del sys.argv[:2]; "
+             "runpy.run_path(sys.argv[0], run_name='__main__')")
+
+# Allocations of the tracing itself and of the import machinery.
+IGNORED = ('<frozen importlib._bootstrap>', '<frozen importlib._bootstrap_external>',
+           '<unknown>', tracemalloc.__file__, '*/benchlib/allocations.py')
+
+Boundary = namedtuple('Boundary', 'pid role seq label current peak blocks snapshot')
+Site = namedtuple('Site', 'where size count')
+Phase = namedtuple('Phase', 'pid role label current peak blocks sites')
+
+
+class Tracer(object):
+    """Gives the child a directory for its snapshots; see ``runner.measure``."""
+
+    def __init__(self, directory=None, frames=1):
+        self.directory = directory or tempfile.mkdtemp(prefix='allocations-')
+        self.frames = frames
+
+    def environ(self, env=None):
+        env = dict(os.environ if env is None else env)
+        env[ENV_VAR] = self.directory
+        env[FRAMES_VAR] = str(self.frames)
+        return env
+
+    def start(self, seconds, reading):
+        pass
+
+    def stop(self, seconds, reading):
+        pass
+
+    def boundaries(self):
+        """Every ``Boundary`` recorded, by process and then in order."""
+        found = []
+        for name in sorted(os.listdir(self.directory)):
+            if name.endswith('.jsonl'):
+                with open(os.path.join(self.directory, name)) as f:
+                    found.extend(Boundary(**json.loads(line)) for line in f if line.strip())
+        # the main process first, then the workers
+        found.sort(key=lambda b: (b.role != 'main', b.pid, b.seq))
+        return found
+
+    def load(self, boundary):
+        snapshot = tracemalloc.Snapshot.load(os.path.join(self.directory, boundary.snapshot))
+        return snapshot.filter_traces([tracemalloc.Filter(False, pattern)
+                                       for pattern in IGNORED])
+
+
+def command(bench, interpreter=None, arg=None):
+    argv = benchmarks.command(bench, interpreter or benchmarks.interpreter(), arg=arg)
+    libdir = os.path.dirname(os.path.abspath(benchmarks.directory(bench)))
+    return argv[:-2] + ['-c', BOOTSTRAP, libdir] + argv[-2:]
+
+
+def top_sites(snapshot, previous=None, limit=10, frames=1):
+    """The ``limit`` sites that grew the most since ``previous``, if given."""
+    key = 'traceback' if frames > 1 else 'lineno'
+    if previous is None:
+        stats = [Site(s.traceback, s.size, s.count) for s in snapshot.statistics(key)]
+    else:
+        stats = [Site(s.traceback, s.size_diff, s.count_diff)
+                 for s in snapshot.compare_to(previous, key)]
+    stats.sort(key=lambda s: s.size, reverse=True)
+    return [s for s in stats[:limit] if s.size > 0]
+
+
+def phases(tracer, limit=10):
+    """One ``Phase`` per snapshot, with its sites relative to the one before."""
+    result = []
+    previous = None
+    for boundary in tracer.boundaries():
+        snapshot = tracer.load(boundary)
+        if previous is not None and previous[0] != boundary.pid:
+            previous = None
+        sites = top_sites(snapshot, previous and previous[1], limit, tracer.frames)
+        result.append(Phase(boundary.pid, boundary.role, boundary.label, boundary.current,
+                            boundary.peak, boundary.blocks, sites))
+        previous = (boundary.pid, snapshot)
+    return result
+
+
+def run(bench, interpreter=None, arg=None, executor=None, frames=1, limit=10, keep=None,
+        stdin=None):
+    """Run ``bench`` once under ``tracemalloc``; returns its ``Result`` and phases."""
+    env = dict(os.environ)
+    if executor:
+        env['BENCH_EXECUTOR'] = executor
+    if keep and not os.path.isdir(keep):
+        os.makedirs(keep)
+    tracer = Tracer(keep and os.path.abspath(keep), frames)
+    try:
+        result = measure(command(bench, interpreter, arg), cwd=benchmarks.directory(bench),
+                         env=env, stdin=stdin or benchmarks.stdin_path(bench),
+                         meter=get_meter('none'), probes=[tracer])
+        return result, phases(tracer, limit)
+    finally:
+        if not keep:
+            shutil.rmtree(tracer.directory, ignore_errors=True)
+
+
+def _where(traceback):
+    return ' <- '.join('%s:%d' % (os.path.relpath(frame.filename), frame.lineno)
+                       if os.path.isabs(frame.filename) else
+                       '%s:%d' % (frame.filename, frame.lineno)
+                       for frame in traceback)
+
+
+def report(bench, result, phases, out=sys.stdout):
+    for p in phases:
+        process = 'main' if p.role == 'main' else 'worker %d' % p.pid
+        out.write('%s\t%s\t%s\tpeak %.1f KB\tcurrent %.1f KB\t%d blocks\n' % (
+            bench.name, process, p.label, p.peak / 1024.0, p.current / 1024.0, p.blocks))
+        for site in p.sites:
+            out.write('\t%+10.1f KB\t%+8d blocks\t%s\n' % (
+                site.size / 1024.0, site.count, _where(site.where)))
+    if result.returncode != 0:
+        out.write('%s\texited with status %d\n' % (bench.name, result.returncode))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('benchmark', nargs='+', help='benchmark names, or "all"')
+    parser.add_argument('--arg', help='override the Makefile argument (problem size)')
+    parser.add_argument('--stdin', metavar='FILE',
+                        help='input for the benchmarks that read stdin (default: the Makefile\'s)')
+    parser.add_argument('--top', type=int, default=10, help='sites per phase (default: 10)')
+    parser.add_argument('--frames', type=int, default=1,
+                        help='frames per allocation site (default: 1)')
+    parser.add_argument('--executor', help='BENCH_EXECUTOR for the runs')
+    parser.add_argument('--keep', metavar='DIR', help='keep the snapshots in DIR')
+    parser.add_argument('--interpreter',
+                        help='Python to run (default: the Makefiles\' one when installed)')
+    args = parser.parse_args(argv)
+
+    names = args.benchmark
+    if names == ['all']:
+        names = [b.name for b in benchmarks.BENCHMARKS]
+    failed = False
+    for name in names:
+        bench = benchmarks.get(name)
+        keep = args.keep and os.path.join(args.keep, name)
+        result, found = run(bench, args.interpreter, args.arg, args.executor, args.frames,
+                            args.top, keep, args.stdin and os.path.abspath(args.stdin))
+        report(bench, result, found)
+        failed = failed or result.returncode != 0
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,171 @@
+"""Registry of the Python benchmark implementations.
+
+Each entry records which file the ``Python/<benchmark>/Makefile`` runs, the
+function that does the work and the argument the Makefile passes, so the
+harness can drive a benchmark in-process instead of through ``make run``.
+
+``call`` says how the entry point takes its input:
+
+* ``int``  -- ``entry(int(arg))``
+* ``argv`` -- ``entry()`` with ``sys.argv[1] == arg``
+
+``stdin`` is the input file, relative to the benchmark directory, that the
+Makefile redirects into the program.  ``pool_reuse`` is False for programs
+whose workers depend on state set up in the parent just before forking, so a
+pool created earlier cannot serve them.
+
+``VARIANTS`` declares the alternative implementations kept next to a
+benchmark's source.  A variant runs like the Makefile's program, with
+``env`` added to the environment, and is skipped when a module it
+``requires`` is not installed; ``harness.variants`` checks and compares
+them.
+"""
+
+import importlib.util
+import os
+import subprocess
+import sys
+from collections import namedtuple
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PYTHON_DIR = os.path.join(ROOT, 'Python')
+
+# What the Makefiles' run/measure/mem rules invoke.
+MAKEFILE_INTERPRETER = '/usr/local/src/Python-3.6.1/bin/python3.6'
+MAKEFILE_FLAGS = ('-OO',)
+
+Benchmark = namedtuple('Benchmark', 'name source entry call arg stdin pool_reuse')
+
+BENCHMARKS = (
+    Benchmark('binary-trees', 'binarytrees.py', 'main', 'int', '21', None, True),
+    Benchmark('fannkuch-redux', 'fannkuchredux.py', 'fannkuch', 'int', '12', None, True),
+    Benchmark('fasta', 'fasta.python3-3.py', 'main', 'argv', '25000000', None, True),
+    Benchmark('k-nucleotide', 'knucleotide.python3-3.py', 'main', 'argv', '0',
+              'knucleotide-input25000000.txt', False),
+    Benchmark('mandelbrot', 'mandelbrot.python3-7.py', 'mandelbrot', 'int', '16000', None, True),
+    Benchmark('n-body', 'nbody.py', 'main', 'int', '50000000', None, True),
+    Benchmark('pidigits', 'pidigits.python3-2.py', 'compute_pi_digits', 'int', '10000', None, True),
+    Benchmark('regex-redux', 'regexredux.py', 'main', 'argv', '0',
+              '../../regexredux-input5000000.txt', False),
+    Benchmark('reverse-complement', 'revcomp.python3-6.py', 'main', 'argv', '0',
+              '../../revcomp-input25000000.txt', False),
+    Benchmark('spectral-norm', 'spectralnorm.python3-5.py', 'main', 'argv', '5500', None, True),
+)
+
+
+Variant = namedtuple('Variant', 'benchmark name source env requires')
+
+VARIANTS = (
+    Variant('binary-trees', 'optimized', 'optimized_code.py', {}, ()),
+    Variant('binary-trees', 'arena', 'arena.py', {}, ()),
+    Variant('binary-trees', 'nodepool', 'nodepool.py', {}, ()),
+    Variant('binary-trees', 'iterative', 'iterative.py', {}, ()),
+    Variant('binary-trees', 'fused', 'fused.py', {}, ()),
+    Variant('binary-trees', 'shared', 'shared.py', {}, ()),
+    Variant('fannkuch-redux', 'optimized', 'optimized_code.py', {'FORCE_PURE_PY': '1'}, ()),
+    Variant('fannkuch-redux', 'optimized-numba', 'optimized_code.py', {'FORCE_PURE_PY': '0'},
+            ('numpy', 'numba')),
+)
+
+
+def get(name):
+    for bench in BENCHMARKS:
+        if bench.name == name:
+            return bench
+    raise ValueError('unknown Python benchmark %r' % name)
+
+
+def directory(bench):
+    return os.path.join(PYTHON_DIR, bench.name)
+
+
+def source_path(bench):
+    return os.path.join(directory(bench), bench.source)
+
+
+def stdin_path(bench):
+    if bench.stdin is None:
+        return None
+    return os.path.normpath(os.path.join(directory(bench), bench.stdin))
+
+
+def command(bench, interpreter=MAKEFILE_INTERPRETER, flags=MAKEFILE_FLAGS, arg=None,
+            variant=None):
+    """Command line of the Makefile ``run`` rule, relative to ``directory(bench)``."""
+    source = bench.source if variant is None else variant.source
+    return [interpreter] + list(flags) + [source, bench.arg if arg is None else str(arg)]
+
+
+def variants(bench):
+    """``baseline``, the program the Makefile runs, then the declared variants."""
+    return [Variant(bench.name, 'baseline', bench.source, {}, ())] + [
+        v for v in VARIANTS if v.benchmark == bench.name]
+
+
+def get_variant(bench, name):
+    for variant in variants(bench):
+        if variant.name == name:
+            return variant
+    raise ValueError('unknown variant %r of %s' % (name, bench.name))
+
+
+def installed(variant, python=None):
+    """True when ``python`` can import every module ``variant`` requires."""
+    if not variant.requires:
+        return True
+    code = 'import ' + ', '.join(variant.requires)
+    return subprocess.call([python or interpreter(), '-c', code], stdout=subprocess.DEVNULL,
+                           stderr=subprocess.DEVNULL) == 0
+
+
+def interpreter():
+    """The Makefiles' interpreter when it is installed, else this one."""
+    if os.access(MAKEFILE_INTERPRETER, os.X_OK):
+        return MAKEFILE_INTERPRETER
+    return sys.executable
+
+
+def module_name(bench, variant=None):
+    name = 'bench_' + bench.name
+    if variant is not None and variant.name != 'baseline':
+        name += '_' + variant.name
+    return name.replace('-', '_')
+
+
+def load(bench, variant=None):
+    """Import the benchmark source (or ``variant``'s) as ``bench_<name>``.
+
+    The module is registered in ``sys.modules`` so functions handed to
+    ``multiprocessing`` workers can be pickled by reference.
+    """
+    name = module_name(bench, variant)
+    source = source_path(bench) if variant is None else os.path.join(directory(bench),
+                                                                       variant.source)
+    spec = importlib.util.spec_from_file_location(name, source)
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    try:
+        spec.loader.exec_module(module)
+    except BaseException:
+        del sys.modules[name]
+        raise
+    return module
+
+
+def invoke(bench, entry, arg=None):
+    """Call ``entry`` the way the Makefile's command line would."""
+    arg = bench.arg if arg is None else str(arg)
+    # In place, so a module that did ``from sys import argv`` sees it too.
+    saved_argv = sys.argv[:]
+    sys.argv[:] = [bench.source, arg]
+    try:
+        if bench.call == 'int':
+            result = entry(int(arg))
+        else:
+            result = entry()
+    finally:
+        sys.argv[:] = saved_argv
+    # pidigits builds its output and leaves printing to the script body.
+    if isinstance(result, str):
+        sys.stdout.write(result)
+    return result
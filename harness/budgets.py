@@ -0,0 +1,231 @@
+"""Time, memory and garbage collector budgets for the Python benchmarks.
+
+A slowdown in a kernel such as ``count_frequencies`` or ``advance`` used to
+show up weeks later in the RAPL runs.  ``BUDGETS`` gives every benchmark a
+reduced but representative workload -- the program's entry point at a
+small argument, or its hot kernel when the program only reads stdin -- and
+three limits:
+
+* ``units``: wall time of the best of ``repeat`` calls, in multiples of a
+  fixed calibration loop timed on the same host, so the limit holds on a
+  laptop and on a CI runner alike;
+* ``memory``: peak traced memory of one call, in KB (``tracemalloc``);
+* ``gc_objects``: container objects (lists, dicts, tuples, instances...)
+  allocated by one call and still alive when the next generation-0
+  collection starts, or when the call returns -- the objects the collector
+  has to take on, from its own counters.  Ints, floats and strings are not
+  containers, and containers freed before a collection cancel out, so
+  this is collector pressure, not every allocation: churn of short-lived
+  objects shows in ``units``, a larger working set in ``memory``.
+
+Programs run in-process with ``BENCH_EXECUTOR=serial`` and their output
+goes to ``/dev/null``.  ``harness/test_budgets.py`` enforces the budgets
+when ``HARNESS_PERF=1``; this tool prints the usage next to them, and with
+``--suggest`` the budgets the current tree would get.
+
+    python3 -m harness.budgets n-body k-nucleotide --suggest
+"""
+
+import argparse
+import gc
+import os
+import sys
+import time
+import tracemalloc
+from collections import namedtuple
+
+from harness import benchmarks, micro
+from harness.sinks import NullSink, redirect_stdout
+
+ENV_VAR = 'HARNESS_PERF'
+
+# Suggested budgets: measured usage times the factor, plus the slack.
+HEADROOM = {'units': (2.0, 0.5), 'memory': (1.5, 64), 'gc_objects': (1.25, 100)}
+
+Budget = namedtuple('Budget', 'name benchmark setup units memory gc_objects')
+Usage = namedtuple('Usage', 'seconds units memory gc_objects')
+
+
+def _program(arg):
+    def setup(bench, module):
+        entry = getattr(module, bench.entry)
+        return lambda: benchmarks.invoke(bench, entry, arg)
+    return setup
+
+
+def _kernel(name, number=1):
+    def setup(bench, module):
+        kernel = micro.get(name).setup(module)
+
+        def repeated():
+            for _ in range(number):
+                kernel()
+        return repeated
+    return setup
+
+
+# Measured with --suggest on CPython 3.11; pidigits (gmpy2) is an estimate.
+BUDGETS = (
+    Budget('binary-trees', 'binary-trees', _program(12), 10.0, 1100, 47000),
+    Budget('fannkuch-redux', 'fannkuch-redux', _program(8), 7.0, 72, 170),
+    Budget('fasta', 'fasta', _program(25000), 7.0, 70, 110),
+    Budget('count_frequencies', 'k-nucleotide', _kernel('count_frequencies'), 4.0, 4100, 140),
+    Budget('mandelbrot', 'mandelbrot', _program(200), 12.0, 75, 120),
+    Budget('n-body', 'n-body', _program(20000), 15.0, 65, 110),
+    Budget('advance', 'n-body', _kernel('advance', 100), 17.0, 64, 100),
+    Budget('pidigits', 'pidigits', _program(300), 10.0, 500, 500),
+    Budget('reverse_complement', 'reverse-complement', _kernel('reverse_complement', 100),
+           4.0, 340, 110),
+    Budget('spectral-norm', 'spectral-norm', _program(100), 13.0, 90, 170),
+)
+
+
+def get(name):
+    for budget in BUDGETS:
+        if budget.name == name:
+            return budget
+    raise ValueError('unknown budget %r' % name)
+
+
+def calibration_loop():
+    """A fixed mix of integer arithmetic, calls and dict stores."""
+    table = {}
+    total = 0
+    for i in range(100000):
+        total += (i * i) % 7
+        table[i & 1023] = abs(total - i)
+    return total
+
+
+def calibrate(repeat=5):
+    """Seconds of the best of ``repeat`` calibration loops on this host."""
+    best = None
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        calibration_loop()
+        elapsed = time.perf_counter() - t0
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+class _GCObjectCounter(object):
+    """Counts the containers the collector takes on, through ``gc.callbacks``.
+
+    Generation 0's count, read as a collection starts, is the number of
+    containers allocated since the previous collection less those freed.
+    """
+
+    def __init__(self):
+        self.objects = 0
+
+    def _callback(self, phase, info):
+        if phase == 'start':
+            self.objects += gc.get_count()[0]
+
+    def __enter__(self):
+        gc.collect()
+        self._start = gc.get_count()[0]
+        gc.callbacks.append(self._callback)
+        return self
+
+    def __exit__(self, *exc):
+        gc.callbacks.remove(self._callback)
+        self.objects += gc.get_count()[0] - self._start
+        return False
+
+
+def _setup(budget):
+    bench = benchmarks.get(budget.benchmark)
+    module = sys.modules.get(benchmarks.module_name(bench)) or benchmarks.load(bench)
+    return budget.setup(bench, module)
+
+
+def measure(func, unit, repeat=3):
+    """``Usage`` of ``func``: best of ``repeat`` timed calls, then one traced."""
+    saved = os.environ.get('BENCH_EXECUTOR')
+    os.environ['BENCH_EXECUTOR'] = 'serial'
+    try:
+        with NullSink() as sink, redirect_stdout(sink):
+            func()    # warm-up: imports, caches
+            seconds = None
+            for _ in range(repeat):
+                t0 = time.perf_counter()
+                func()
+                elapsed = time.perf_counter() - t0
+                seconds = elapsed if seconds is None else min(seconds, elapsed)
+            tracemalloc.start()
+            try:
+                with _GCObjectCounter() as counter:
+                    func()
+                peak = tracemalloc.get_traced_memory()[1]
+            finally:
+                tracemalloc.stop()
+    finally:
+        if saved is None:
+            del os.environ['BENCH_EXECUTOR']
+        else:
+            os.environ['BENCH_EXECUTOR'] = saved
+    return Usage(seconds, seconds / unit, peak // 1024, counter.objects)
+
+
+def run(budget, unit=None, repeat=3):
+    """Set up and measure ``budget``'s workload; returns its ``Usage``."""
+    func = _setup(budget)
+    return measure(func, unit or calibrate(), repeat)
+
+
+def exceeded(budget, usage):
+    """Names of the limits ``usage`` goes over, as ``(name, used, limit)``."""
+    over = []
+    for name in ('units', 'memory', 'gc_objects'):
+        limit = getattr(budget, name)
+        used = getattr(usage, name)
+        if used > limit:
+            over.append((name, used, limit))
+    return over
+
+
+def suggest(usage):
+    """The budget ``(units, memory, gc_objects)`` for a measured ``usage``."""
+    limits = []
+    for name in ('units', 'memory', 'gc_objects'):
+        factor, slack = HEADROOM[name]
+        limits.append(getattr(usage, name) * factor + slack)
+    return round(limits[0], 1), int(limits[1]), int(limits[2])
+
+
+def report(budget, usage, out=sys.stdout):
+    over = exceeded(budget, usage)
+    out.write('%s\t%s\t%.1f/%.1f units (%.3f s)\t%d/%d KB\t%d/%d GC objects\t%s\n' % (
+        budget.name, budget.benchmark, usage.units, budget.units, usage.seconds,
+        usage.memory, budget.memory, usage.gc_objects, budget.gc_objects,
+        'OVER: ' + ', '.join(name for name, _, _ in over) if over else 'ok'))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('budget', nargs='*', help='budget names (default: all)')
+    parser.add_argument('-r', '--repeat', type=int, default=3, help='timed calls per budget')
+    parser.add_argument('--suggest', action='store_true',
+                        help='also print budgets with headroom over the measured usage')
+    args = parser.parse_args(argv)
+
+    budgets = [get(name) for name in args.budget] if args.budget else list(BUDGETS)
+    unit = calibrate()
+    print('calibration loop: %.3f ms' % (unit * 1000))
+    failed = False
+    for budget in budgets:
+        try:
+            usage = run(budget, unit, args.repeat)
+        except ImportError as e:
+            print('%s\t%s\tskipped: %s' % (budget.name, budget.benchmark, e))
+            continue
+        report(budget, usage)
+        failed = failed or bool(exceeded(budget, usage))
+        if args.suggest:
+            print('  suggested: units=%.1f memory=%d gc_objects=%d' % suggest(usage))
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,195 @@
+"""cgroup v2 sandboxes: one leaf per run, for accounting and CPU quotas.
+
+``wait4`` only accounts for descendants that were waited for, and a
+wall-clock delta says nothing about what else ran.  A ``Sandbox`` puts the
+child in a fresh cgroup leaf before it execs, so every process it starts is
+accounted, and reads the leaf's ``cpu.stat``, ``memory.peak``,
+``memory.stat`` and ``io.stat`` when the run ends.  Leftover processes are
+killed with ``cgroup.kill`` and the leaf is removed.
+
+Leaves live under ``<base>/<group>``; compile jobs and measure jobs use
+separate groups, so each group can be given its own CPUs (``cpuset.cpus``)
+and quota and the two cannot perturb each other.  The base defaults to
+``energy-harness`` under the cgroup v2 mount and can be moved with
+``HARNESS_CGROUP``; it has to be writable (root, or a delegated subtree).
+"""
+
+import itertools
+import os
+from collections import namedtuple
+
+ENV_VAR = 'HARNESS_CGROUP'
+MOUNTS = ('/sys/fs/cgroup', '/sys/fs/cgroup/unified')
+CONTROLLERS = ('cpu', 'cpuset', 'memory', 'io')
+CPU_PERIOD_USEC = 100000
+
+_serial = itertools.count()
+
+Usage = namedtuple('Usage', 'cpu_usec user_usec system_usec throttled_usec '
+                            'memory_peak memory_stat io')
+
+
+def mount():
+    """The cgroup v2 hierarchy: the unified mount, or its hybrid-mode location."""
+    for path in MOUNTS:
+        if os.path.exists(os.path.join(path, 'cgroup.controllers')):
+            return path
+    return None
+
+
+def default_base():
+    if os.environ.get(ENV_VAR):
+        return os.environ[ENV_VAR]
+    root = mount()
+    return os.path.join(root, 'energy-harness') if root else None
+
+
+def available(base=None):
+    base = base or default_base()
+    if base is None:
+        return False
+    parent = base if os.path.isdir(base) else os.path.dirname(base)
+    return os.access(os.path.join(parent, 'cgroup.subtree_control'), os.W_OK)
+
+
+def _write(path, value):
+    with open(path, 'w') as f:
+        f.write(value)
+
+
+def _read(path):
+    try:
+        with open(path) as f:
+            return f.read()
+    except OSError:
+        return None
+
+
+def _keyed(text):
+    """``key value`` lines, as in cpu.stat and memory.stat."""
+    values = {}
+    for line in (text or '').splitlines():
+        key, _, value = line.partition(' ')
+        if value.strip().isdigit():
+            values[key] = int(value)
+    return values
+
+
+def _io(text):
+    """io.stat summed over devices: ``rbytes``, ``wbytes``, ``rios``, ...."""
+    totals = {}
+    for line in (text or '').splitlines():
+        for field in line.split()[1:]:
+            key, _, value = field.partition('=')
+            if value.isdigit():
+                totals[key] = totals.get(key, 0) + int(value)
+    return totals
+
+
+def _enable_controllers(directory):
+    available_controllers = (_read(os.path.join(directory, 'cgroup.controllers')) or '').split()
+    wanted = ' '.join('+' + c for c in CONTROLLERS if c in available_controllers)
+    if wanted:
+        try:
+            _write(os.path.join(directory, 'cgroup.subtree_control'), wanted)
+        except OSError:
+            pass    # e.g. cpuset not delegated; accounting still works
+
+
+def ensure_group(group, base=None, cpus=None):
+    """Create ``<base>/<group>`` with the controllers enabled for its leaves."""
+    base = base or default_base()
+    path = os.path.join(base, group)
+    for directory in (base, path):
+        if not os.path.isdir(directory):
+            os.mkdir(directory)
+        _enable_controllers(os.path.dirname(directory))
+    _enable_controllers(path)
+    if cpus is not None:
+        _write(os.path.join(path, 'cpuset.cpus'), cpus)
+    return path
+
+
+class Sandbox(object):
+    """A cgroup leaf for one run, used as a ``runner.measure`` probe.
+
+    ``cpu_quota`` is in CPUs (1.5 allows one and a half CPUs' worth of time
+    per period); ``memory_max`` is in bytes; ``cpus`` restricts the whole
+    group to a CPU list such as ``'0-3'``.  After the run ``usage`` holds the
+    leaf's ``Usage``.
+    """
+
+    fd = None
+
+    def __init__(self, name, group='measure', base=None, cpu_quota=None, memory_max=None,
+                 cpus=None):
+        leaf = '%s-%d-%d' % (name, os.getpid(), next(_serial))
+        self.path = os.path.join(ensure_group(group, base, cpus), leaf)
+        self.cpu_quota = cpu_quota
+        self.memory_max = memory_max
+        self.usage = None
+
+    def environ(self, env=None):
+        return env
+
+    def _create(self):
+        os.mkdir(self.path)
+        if self.cpu_quota is not None:
+            _write(os.path.join(self.path, 'cpu.max'), '%d %d' % (
+                int(self.cpu_quota * CPU_PERIOD_USEC), CPU_PERIOD_USEC))
+        if self.memory_max is not None:
+            _write(os.path.join(self.path, 'memory.max'), str(int(self.memory_max)))
+
+    def preexec(self):
+        # runs in the child between fork and exec; '0' means the writer
+        _write(os.path.join(self.path, 'cgroup.procs'), '0')
+
+    def start(self, seconds, reading):
+        pass
+
+    def read_usage(self):
+        cpu = _keyed(_read(os.path.join(self.path, 'cpu.stat')))
+        peak = _read(os.path.join(self.path, 'memory.peak'))
+        return Usage(cpu.get('usage_usec'), cpu.get('user_usec'), cpu.get('system_usec'),
+                     cpu.get('throttled_usec'),
+                     int(peak) if peak and peak.strip().isdigit() else None,
+                     _keyed(_read(os.path.join(self.path, 'memory.stat'))),
+                     _io(_read(os.path.join(self.path, 'io.stat'))))
+
+    def stop(self, seconds, reading):
+        self.usage = self.read_usage()
+        self.remove()
+
+    def remove(self):
+        kill = os.path.join(self.path, 'cgroup.kill')
+        if os.path.exists(kill):
+            _write(kill, '1')
+        try:
+            os.rmdir(self.path)
+        except OSError:
+            pass    # processes still exiting; the next run uses a new leaf
+
+    def __enter__(self):
+        self._create()
+        return self
+
+    def __exit__(self, *exc):
+        if os.path.isdir(self.path):
+            self.remove()
+        return False
+
+
+def group_for(rule):
+    """Builds and measurements never share a group."""
+    return 'compile' if rule == 'compile' else 'measure'
+
+
+def account(result, usage):
+    """``result`` with CPU time and peak memory taken from the cgroup."""
+    if usage is None:
+        return result
+    if usage.user_usec is not None:
+        result = result._replace(user=usage.user_usec / 1e6, system=usage.system_usec / 1e6)
+    if usage.memory_peak is not None:
+        result = result._replace(maxrss=usage.memory_peak // 1024)
+    return result
@@ -0,0 +1,322 @@
+"""Statistical comparison of two result sets, for gating changes.
+
+Comparing the means of ``<Language>.csv`` files by eye misses small shifts
+and flags noise.  This tool compares every language/benchmark pair present
+in two result sets with a Mann-Whitney U test and a bootstrap confidence
+interval of the difference of medians, for energy, time and (when
+recorded) peak memory, and reports effect sizes: the relative change of the
+median and Cliff's delta.  A change is significant when the Holm-corrected
+p-value is below ``--alpha``, the interval excludes zero and the median
+moved by at least ``--min-change``.  The exit status is 1 when anything
+regressed, so the tool can gate merges.
+
+A result set is one of:
+
+* a git revision (``HEAD~1``, a tag, a branch): the ``<Language>.csv``
+  files committed there;
+* a directory: the ``<Language>/<Language>.csv`` files below it (default
+  for the candidate: the working tree);
+* a watchdog log, optionally restricted to one run: ``watchdog.jsonl`` or
+  ``watchdog.jsonl#20260301-101500``.  Only logs record peak memory.
+
+The CSV files only ever grow, so when a file of the base set is a prefix of
+the candidate's, only the rows appended since are compared.
+
+    python3 -m harness.compare v1.0 --language C --language Rust
+"""
+
+import argparse
+import json
+import math
+import os
+import random
+import statistics
+import subprocess
+import sys
+from collections import namedtuple
+
+from harness.benchmarks import ROOT
+from harness.report import parse_row
+
+METRICS = ('energy', 'time', 'memory')
+UNITS = {'energy': 'J', 'time': 's', 'memory': 'KB'}
+
+Comparison = namedtuple('Comparison', 'language benchmark metric base candidate change '
+                                      'p_value delta interval verdict')
+
+
+# -- result sets ---------------------------------------------------------------
+
+def _csv_name(path):
+    """``C/C.csv`` and the like: the run results of one language."""
+    parts = path.split('/')
+    return (len(parts) == 2 and parts[1].endswith('.csv') and not parts[1].startswith('x')
+            and not parts[1].endswith('.compile.csv'))
+
+
+def _git(args, root):
+    return subprocess.run(['git'] + args, cwd=root, stdout=subprocess.PIPE,
+                          stderr=subprocess.PIPE, universal_newlines=True, check=True).stdout
+
+
+def git_files(revision, root=ROOT):
+    """``{path: lines}`` of the ``<Language>.csv`` files at ``revision``."""
+    names = _git(['ls-tree', '-r', '--name-only', revision], root).splitlines()
+    return dict((name, _git(['show', '%s:%s' % (revision, name)], root).splitlines())
+                for name in names if _csv_name(name))
+
+
+def directory_files(directory):
+    files = {}
+    for language in sorted(os.listdir(directory)):
+        if not os.path.isdir(os.path.join(directory, language)):
+            continue
+        for name in sorted(os.listdir(os.path.join(directory, language))):
+            if _csv_name('%s/%s' % (language, name)):
+                with open(os.path.join(directory, language, name)) as f:
+                    files['%s/%s' % (language, name)] = f.read().splitlines()
+    return files
+
+
+def appended(base_lines, lines):
+    """The rows of ``lines`` added after ``base_lines``, if it is a prefix."""
+    if len(lines) > len(base_lines) and lines[:len(base_lines)] == base_lines:
+        return lines[len(base_lines):]
+    return lines
+
+
+def csv_samples(files):
+    """``{(language, benchmark): {metric: [values]}}`` from ``RAPL/main`` rows."""
+    samples = {}
+    for path, lines in sorted(files.items()):
+        language = path.split('/')[0]
+        for line in lines:
+            row = parse_row(line)
+            if row is None:
+                continue
+            benchmark, joules, milliseconds = row
+            metrics = samples.setdefault((language, benchmark), {})
+            metrics.setdefault('energy', []).append(joules)
+            metrics.setdefault('time', []).append(milliseconds / 1000)
+    return samples
+
+
+def log_samples(path, rule='run'):
+    """Samples of the successful ``rule`` jobs in a watchdog log (``path#run``)."""
+    path, _, run_id = path.partition('#')
+    samples = {}
+    with open(path) as f:
+        for line in f:
+            if not line.strip():
+                continue
+            entry = json.loads(line)
+            if entry['status'] != 'ok' or entry['rule'] != rule:
+                continue
+            if run_id and entry.get('run') != run_id:
+                continue
+            metrics = samples.setdefault((entry['language'], entry['benchmark']), {})
+            if (entry.get('energy') or {}).get('package') is not None:
+                metrics.setdefault('energy', []).append(entry['energy']['package'])
+            metrics.setdefault('time', []).append(entry['seconds'])
+            metrics.setdefault('memory', []).append(entry['maxrss'])
+    return samples
+
+
+def _is_log(source):
+    return source.partition('#')[0].endswith('.jsonl')
+
+
+def _files(source, root):
+    if os.path.isdir(source):
+        return directory_files(source)
+    return git_files(source, root)
+
+
+def load(base, candidate=None, rule='run', root=ROOT):
+    """Samples of the ``base`` and ``candidate`` result sets."""
+    candidate = candidate or root
+    if _is_log(base) or _is_log(candidate):
+        return (log_samples(base, rule) if _is_log(base) else csv_samples(_files(base, root)),
+                log_samples(candidate, rule) if _is_log(candidate)
+                else csv_samples(_files(candidate, root)))
+    base_files = _files(base, root)
+    candidate_files = _files(candidate, root)
+    for path, lines in candidate_files.items():
+        candidate_files[path] = appended(base_files.get(path, []), lines)
+    return csv_samples(base_files), csv_samples(candidate_files)
+
+
+# -- statistics ----------------------------------------------------------------
+
+def _ranks(values):
+    """1-based ranks, ties sharing their average rank."""
+    order = sorted(range(len(values)), key=values.__getitem__)
+    ranks = [0.0] * len(values)
+    i = 0
+    while i < len(order):
+        j = i
+        while j + 1 < len(order) and values[order[j + 1]] == values[order[i]]:
+            j += 1
+        for k in range(i, j + 1):
+            ranks[order[k]] = (i + j) / 2.0 + 1
+        i = j + 1
+    return ranks
+
+
+def mann_whitney(a, b):
+    """U statistic of ``b`` against ``a`` and its two-sided p-value.
+
+    Normal approximation with tie and continuity corrections.
+    """
+    n1, n2 = len(a), len(b)
+    ranks = _ranks(list(a) + list(b))
+    u = sum(ranks[n1:]) - n2 * (n2 + 1) / 2.0
+    n = n1 + n2
+    ties = {}
+    for value in list(a) + list(b):
+        ties[value] = ties.get(value, 0) + 1
+    tie_term = sum(t ** 3 - t for t in ties.values()) / float(n * (n - 1))
+    variance = n1 * n2 / 12.0 * ((n + 1) - tie_term)
+    if variance <= 0:
+        return u, 1.0
+    mean = n1 * n2 / 2.0
+    z = (abs(u - mean) - 0.5) / math.sqrt(variance)
+    return u, min(1.0, math.erfc(max(z, 0.0) / math.sqrt(2)))
+
+
+def cliffs_delta(a, b):
+    """P(b > a) - P(b < a): +1 when every ``b`` exceeds every ``a``."""
+    greater = sum(1 for x in a for y in b if y > x)
+    less = sum(1 for x in a for y in b if y < x)
+    return (greater - less) / float(len(a) * len(b))
+
+
+def magnitude(delta):
+    """Conventional labels for ``|delta|`` (Romano et al. thresholds)."""
+    size = abs(delta)
+    if size < 0.147:
+        return 'negligible'
+    if size < 0.33:
+        return 'small'
+    if size < 0.474:
+        return 'medium'
+    return 'large'
+
+
+def bootstrap(a, b, resamples=2000, confidence=0.95, seed=0):
+    """Percentile interval of ``median(b) - median(a)``."""
+    rng = random.Random(seed)
+    diffs = sorted(statistics.median([rng.choice(b) for _ in b])
+                   - statistics.median([rng.choice(a) for _ in a])
+                   for _ in range(resamples))
+    tail = (1 - confidence) / 2
+    return (diffs[int(tail * (resamples - 1))],
+            diffs[int(math.ceil((1 - tail) * (resamples - 1)))])
+
+
+def holm(p_values):
+    """Holm-Bonferroni adjusted p-values, in the original order."""
+    order = sorted(range(len(p_values)), key=p_values.__getitem__)
+    adjusted = [0.0] * len(p_values)
+    running = 0.0
+    for position, index in enumerate(order):
+        running = max(running, min(1.0, (len(p_values) - position) * p_values[index]))
+        adjusted[index] = running
+    return adjusted
+
+
+# -- comparison ----------------------------------------------------------------
+
+def compare(base, candidate, metrics=METRICS, alpha=0.05, min_change=0.02, min_samples=3,
+            resamples=2000, correction=True):
+    """One ``Comparison`` per language, benchmark and metric in both sets."""
+    tested = []
+    rows = []
+    for key in sorted(set(base) & set(candidate)):
+        for metric in metrics:
+            a = base[key].get(metric, [])
+            b = candidate[key].get(metric, [])
+            if not a or not b:
+                continue
+            median_a, median_b = statistics.median(a), statistics.median(b)
+            change = (median_b - median_a) / median_a if median_a else None
+            if len(a) < min_samples or len(b) < min_samples:
+                rows.append(Comparison(key[0], key[1], metric, median_a, median_b, change,
+                                       None, None, None, 'insufficient'))
+                continue
+            _, p_value = mann_whitney(a, b)
+            rows.append(Comparison(key[0], key[1], metric, median_a, median_b, change,
+                                   p_value, cliffs_delta(a, b), bootstrap(a, b, resamples),
+                                   None))
+            tested.append(len(rows) - 1)
+    if correction and tested:
+        for index, p_value in zip(tested, holm([rows[i].p_value for i in tested])):
+            rows[index] = rows[index]._replace(p_value=p_value)
+    for index in tested:
+        row = rows[index]
+        low, high = row.interval
+        significant = (row.p_value < alpha and (low > 0 or high < 0)
+                       and row.change is not None and abs(row.change) >= min_change)
+        verdict = 'unchanged'
+        if significant:
+            verdict = 'regression' if row.change > 0 else 'improvement'
+        rows[index] = row._replace(verdict=verdict)
+    return rows
+
+
+def _value(metric, value):
+    return '%.4g %s' % (value, UNITS[metric])
+
+
+def report(rows, everything=False, out=sys.stdout):
+    for row in rows:
+        if row.verdict in ('unchanged', 'insufficient') and not everything:
+            continue
+        change = '-' if row.change is None else '%+.1f%%' % (100 * row.change)
+        line = '%s/%s\t%s\t%s -> %s\t%s' % (row.language, row.benchmark, row.metric,
+                                            _value(row.metric, row.base),
+                                            _value(row.metric, row.candidate), change)
+        if row.p_value is not None:
+            line += '\tp=%.3g\tdelta=%+.2f (%s)\tCI [%.4g, %.4g]' % (
+                row.p_value, row.delta, magnitude(row.delta), row.interval[0], row.interval[1])
+        out.write('%s\t%s\n' % (line, row.verdict))
+    counts = dict((verdict, sum(1 for r in rows if r.verdict == verdict))
+                  for verdict in ('regression', 'improvement', 'unchanged', 'insufficient'))
+    out.write('%(regression)d regressions, %(improvement)d improvements, '
+              '%(unchanged)d unchanged, %(insufficient)d with too few samples\n' % counts)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('base', help='git revision, directory or watchdog log[#run]')
+    parser.add_argument('candidate', nargs='?',
+                        help='git revision, directory or watchdog log[#run] '
+                             '(default: the working tree)')
+    parser.add_argument('--language', action='append', help='only this language, repeatable')
+    parser.add_argument('--metric', action='append', choices=METRICS,
+                        help='only this metric, repeatable (default: all)')
+    parser.add_argument('--rule', default='run', help='watchdog log rule (default: run)')
+    parser.add_argument('--alpha', type=float, default=0.05)
+    parser.add_argument('--min-change', type=float, default=0.02,
+                        help='smallest relative change of the median to flag (default: 0.02)')
+    parser.add_argument('--min-samples', type=int, default=3)
+    parser.add_argument('--resamples', type=int, default=2000, help='bootstrap resamples')
+    parser.add_argument('--no-correction', action='store_true',
+                        help='do not apply the Holm correction for multiple comparisons')
+    parser.add_argument('--all', action='store_true', help='also list unchanged pairs')
+    args = parser.parse_args(argv)
+
+    try:
+        base, candidate = load(args.base, args.candidate, args.rule)
+    except subprocess.CalledProcessError as e:
+        parser.error('not a git revision, directory or watchdog log: %s' % e.stderr.strip())
+    if args.language:
+        base = dict((k, v) for k, v in base.items() if k[0] in args.language)
+    rows = compare(base, candidate, args.metric or METRICS, args.alpha, args.min_change,
+                   args.min_samples, args.resamples, not args.no_correction)
+    report(rows, args.all)
+    return 1 if any(r.verdict == 'regression' for r in rows) else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
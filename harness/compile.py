@@ -0,0 +1,130 @@
+"""Energy, time and peak memory of the Makefile ``compile`` rules.
+
+``compile_all.py compile`` builds every benchmark but measures nothing, so
+the cost of gcc ``-O3 -march=native``, javac, rustc, ghc or dotnet builds
+never shows up next to the runtime they buy.  This tool runs ``make
+compile`` in each benchmark folder through the same measurement backend as
+the runs and appends the results to ``<Language>/<Language>.compile.csv``,
+kept apart from the run results in ``<Language>.csv``::
+
+    benchmark ; PKG (J) ; CPU (J) ; GPU (J) ; DRAM (J) ; Time (ms) ; Mem (KB) ; recipe
+
+``recipe`` is the command list ``make -n compile`` prints, so builds with
+different flag sets can be told apart.  With ``--cgroup`` every build runs
+in a leaf of the ``compile`` cgroup, apart from measured runs, and its CPU
+time and peak memory come from the cgroup.
+
+    python3 -m harness.compile C Rust/binary-trees -r 3
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+from collections import namedtuple
+
+from harness import cgroup
+from harness.benchmarks import ROOT
+from harness.energy import get_meter
+from harness.runner import measure
+
+Target = namedtuple('Target', 'language benchmark directory')
+
+
+def _has_compile_rule(makefile):
+    with open(makefile) as f:
+        return any(line.startswith('compile:') for line in f)
+
+
+def find(paths=None, root=ROOT):
+    """Benchmark folders with a ``compile`` rule below ``paths``.
+
+    ``paths`` are relative to ``root``; by default every language folder.
+    """
+    if not paths:
+        paths = sorted(d for d in os.listdir(root)
+                       if not d.startswith('.') and os.path.isdir(os.path.join(root, d)))
+    targets = []
+    for path in paths:
+        top = os.path.join(root, path)
+        for directory, dirs, files in os.walk(top):
+            dirs.sort()
+            makefile = os.path.join(directory, 'Makefile')
+            if 'Makefile' in files and _has_compile_rule(makefile):
+                parts = os.path.relpath(directory, root).split(os.sep)
+                if len(parts) == 2:
+                    targets.append(Target(parts[0], parts[1], directory))
+    return targets
+
+
+def recipe(target):
+    """The commands ``make compile`` would run, joined on one line."""
+    out = subprocess.run(['make', '-n', 'compile'], cwd=target.directory,
+                         stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+                         universal_newlines=True).stdout
+    return ' && '.join(line.strip() for line in out.splitlines() if line.strip())
+
+
+def build(target, meter, use_cgroup=False, cpu_quota=None):
+    if not use_cgroup:
+        return measure(['make', 'compile'], cwd=target.directory, meter=meter)
+    with cgroup.Sandbox('%s-%s' % (target.language, target.benchmark), 'compile',
+                        cpu_quota=cpu_quota) as box:
+        result = measure(['make', 'compile'], cwd=target.directory, meter=meter, probes=[box])
+    return cgroup.account(result, box.usage)
+
+
+def run(target, repetitions=1, meter=None, use_cgroup=False, cpu_quota=None):
+    """Build ``target`` ``repetitions`` times; returns the ``Result`` of each."""
+    meter = meter or get_meter()
+    return [build(target, meter, use_cgroup, cpu_quota) for _ in range(repetitions)]
+
+
+def csv_path(language, root=ROOT):
+    return os.path.join(root, language, language + '.compile.csv')
+
+
+def csv_row(target, result, build_recipe):
+    energy = result.energy
+    fields = [target.benchmark] + ['%.6f' % energy.get(domain, 0.0)
+                                   for domain in ('package', 'core', 'uncore', 'dram')]
+    fields += ['%G' % (result.seconds * 1000), '%d' % result.maxrss,
+               build_recipe.replace(';', ',')]
+    return ' ; '.join(fields) + '\n'
+
+
+def record(target, results, build_recipe, root=ROOT):
+    with open(csv_path(target.language, root), 'a') as f:
+        for result in results:
+            if result.returncode == 0:
+                f.write(csv_row(target, result, build_recipe))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('path', nargs='*',
+                        help='language or language/benchmark folders (default: all)')
+    parser.add_argument('-r', '--repetitions', type=int, default=1)
+    parser.add_argument('--energy', help='energy backend (default: $HARNESS_ENERGY or auto)')
+    parser.add_argument('--cgroup', action='store_true',
+                        help='build in leaves of the compile cgroup ($HARNESS_CGROUP)')
+    parser.add_argument('--cpu-quota', type=float, metavar='CPUS',
+                        help='with --cgroup, CPU time allowed per period, in CPUs')
+    args = parser.parse_args(argv)
+
+    meter = get_meter(args.energy)
+    failed = 0
+    for target in find(args.path):
+        build_recipe = recipe(target)
+        results = run(target, args.repetitions, meter, args.cgroup, args.cpu_quota)
+        record(target, results, build_recipe)
+        for result in results:
+            status = 'ok' if result.returncode == 0 else 'failed (%d)' % result.returncode
+            print('%s/%s\t%s\t%.3f s\t%d KB' % (target.language, target.benchmark, status,
+                                               result.seconds, result.maxrss))
+            failed += result.returncode != 0
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
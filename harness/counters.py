@@ -0,0 +1,116 @@
+"""Work-unit throughput and efficiency of the Python benchmarks.
+
+Benchmarks count their work with ``benchlib.counters.add(unit, n)``: nodes
+in binary-trees, permutations in fannkuch-redux, bytes in fasta, and so on.
+This module collects the counts of a run and turns them into units per
+second and units per joule.
+
+    python3 -m harness.counters binary-trees n-body --arg 12
+"""
+
+import argparse
+import json
+import os
+import sys
+from collections import namedtuple
+
+from harness import benchmarks
+from harness.energy import get_meter, package_joules
+from harness.runner import measure
+from harness.sinks import SINKS, get_sink
+
+ENV_VAR = 'BENCH_COUNTER_FD'
+
+Rate = namedtuple('Rate', 'unit count per_second per_joule')
+
+
+class CounterReader(object):
+    """Receives the counts a child writes at exit; see ``runner.measure``."""
+
+    env_var = ENV_VAR
+
+    def __init__(self):
+        self._read_fd, self.fd = os.pipe()
+        self.counts = {}
+
+    def environ(self, env=None):
+        env = dict(os.environ if env is None else env)
+        env[self.env_var] = str(self.fd)
+        return env
+
+    def start(self, seconds, reading):
+        os.close(self.fd)
+
+    def stop(self, seconds, reading):
+        # The report fits in the pipe buffer and the child has exited, but
+        # lingering pool workers may still hold the write end open.
+        os.set_blocking(self._read_fd, False)
+        chunks = []
+        while True:
+            try:
+                data = os.read(self._read_fd, 65536)
+            except BlockingIOError:
+                break
+            if not data:
+                break
+            chunks.append(data)
+        os.close(self._read_fd)
+        if chunks:
+            self.counts = json.loads(b''.join(chunks).decode())
+
+
+def rates(counts, seconds, joules=None):
+    """One ``Rate`` per unit; ``per_joule`` is None without an energy reading."""
+    return [Rate(unit, count,
+                 count / seconds if seconds else None,
+                 count / joules if joules else None)
+            for unit, count in sorted(counts.items())]
+
+
+def run(bench, interpreter=None, arg=None, meter=None, sink=None):
+    """Run ``bench`` once as a script; returns its ``Result`` and rates."""
+    meter = meter or get_meter()
+    reader = CounterReader()
+    result = measure(benchmarks.command(bench, interpreter or benchmarks.interpreter(),
+                                        arg=arg),
+                     cwd=benchmarks.directory(bench), stdin=benchmarks.stdin_path(bench),
+                     meter=meter, probes=[reader], sink=sink)
+    return result, rates(reader.counts, result.seconds, package_joules(result.energy))
+
+
+def format_rate(rate):
+    per_joule = '-' if rate.per_joule is None else '%.4g/J' % rate.per_joule
+    return '%s\t%d\t%.4g/s\t%s' % (rate.unit, rate.count, rate.per_second, per_joule)
+
+
+def report(bench, result, bench_rates, out=sys.stdout):
+    if result.returncode != 0:
+        out.write('%s\texited with status %d\n' % (bench.name, result.returncode))
+    for rate in bench_rates:
+        out.write('%s\t%s\n' % (bench.name, format_rate(rate)))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('benchmark', nargs='+', help='benchmark names, or "all"')
+    parser.add_argument('--arg', help='override the Makefile argument (problem size)')
+    parser.add_argument('--energy', help='energy backend (default: $HARNESS_ENERGY or auto)')
+    parser.add_argument('--interpreter',
+                        help='Python to run (default: the Makefiles\' one when installed)')
+    parser.add_argument('--sink', choices=sorted(SINKS), default='null',
+                        help='where benchmark output goes (default: null)')
+    args = parser.parse_args(argv)
+
+    names = args.benchmark
+    if names == ['all']:
+        names = [b.name for b in benchmarks.BENCHMARKS]
+    meter = get_meter(args.energy)
+    for name in names:
+        bench = benchmarks.get(name)
+        result, bench_rates = run(bench, args.interpreter, args.arg, meter,
+                                  get_sink(args.sink))
+        report(bench, result, bench_rates)
+
+
+if __name__ == '__main__':
+    main()
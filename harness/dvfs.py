@@ -0,0 +1,186 @@
+"""CPU frequency sweep: the energy-optimal clock of each benchmark.
+
+Energy per job depends strongly on the clock.  Memory-bound runs such as
+``Python/k-nucleotide`` or ``regex-redux`` may be cheaper at a low frequency
+than compute-bound ones such as ``n-body`` or ``mandelbrot``.  This tool
+pins every CPU to each of a series of frequencies through ``cpufreq`` in
+sysfs, runs ``make run`` for each benchmark at every step and reports the
+frequency with the lowest energy and the one with the lowest energy-delay
+product (joules x seconds).  The original governor and limits are restored
+afterwards.
+
+Writing to cpufreq needs root.  ``--sysfs`` points the tool at another tree,
+which is how it is tested.
+
+    sudo python3 -m harness.dvfs Python/k-nucleotide C/n-body --steps 5 -r 3
+"""
+
+import argparse
+import os
+import statistics
+import sys
+from collections import namedtuple
+
+from harness.energy import get_meter, package_joules
+from harness.runner import measure
+from harness.watchdog import find
+
+SYSFS = '/sys/devices/system/cpu'
+
+Step = namedtuple('Step', 'khz seconds joules')
+
+
+def _read(path):
+    try:
+        with open(path) as f:
+            return f.read().strip()
+    except OSError:
+        return None
+
+
+def _write(path, value):
+    with open(path, 'w') as f:
+        f.write(str(value))
+
+
+class FrequencyControl(object):
+    """The cpufreq policy files of every CPU under ``root``."""
+
+    def __init__(self, root=SYSFS):
+        self.root = root
+        self.cpus = []
+        for entry in sorted(os.listdir(root)) if os.path.isdir(root) else ():
+            path = os.path.join(root, entry, 'cpufreq')
+            if entry.startswith('cpu') and entry[3:].isdigit() and os.path.isdir(path):
+                self.cpus.append(path)
+        self._saved = None
+
+    def available(self):
+        return bool(self.cpus)
+
+    def _get(self, name, cpu=None):
+        return _read(os.path.join(cpu or self.cpus[0], name))
+
+    def frequencies(self):
+        """Settable frequencies in kHz, lowest first."""
+        listed = self._get('scaling_available_frequencies')
+        if listed:
+            return sorted(set(int(f) for f in listed.split()))
+        return [int(self._get('cpuinfo_min_freq')), int(self._get('cpuinfo_max_freq'))]
+
+    def steps(self, count):
+        """``count`` frequencies spread evenly between the lowest and highest."""
+        freqs = self.frequencies()
+        if count >= len(freqs) and len(freqs) > 2:
+            return freqs
+        low, high = freqs[0], freqs[-1]
+        if count < 2:
+            return [high]
+        wanted = [low + (high - low) * i // (count - 1) for i in range(count)]
+        if len(freqs) > 2:
+            wanted = sorted(set(min(freqs, key=lambda f: abs(f - w)) for w in wanted))
+        return wanted
+
+    def save(self):
+        self._saved = [(cpu, self._get('scaling_governor', cpu),
+                        self._get('scaling_min_freq', cpu), self._get('scaling_max_freq', cpu))
+                       for cpu in self.cpus]
+
+    def pin(self, khz):
+        """Run every CPU at ``khz``: userspace governor if offered, else min = max."""
+        governors = (self._get('scaling_available_governors') or '').split()
+        for cpu in self.cpus:
+            if 'userspace' in governors:
+                _write(os.path.join(cpu, 'scaling_governor'), 'userspace')
+                _write(os.path.join(cpu, 'scaling_setspeed'), khz)
+            else:
+                self._limit(cpu, khz, khz)
+
+    def _limit(self, cpu, low, high):
+        # keep min <= max at every moment, or the kernel rejects the write
+        if int(self._get('scaling_max_freq', cpu)) < int(low):
+            _write(os.path.join(cpu, 'scaling_max_freq'), high)
+            _write(os.path.join(cpu, 'scaling_min_freq'), low)
+        else:
+            _write(os.path.join(cpu, 'scaling_min_freq'), low)
+            _write(os.path.join(cpu, 'scaling_max_freq'), high)
+
+    def restore(self):
+        for cpu, governor, low, high in self._saved or ():
+            if governor:
+                _write(os.path.join(cpu, 'scaling_governor'), governor)
+            if low and high:
+                self._limit(cpu, low, high)
+        self._saved = None
+
+
+def sweep(target, cpufreq, freqs, repetitions=3, meter=None, rule='run'):
+    """One ``Step`` per frequency: median time and energy of ``make rule``."""
+    meter = meter or get_meter()
+    steps = []
+    cpufreq.save()
+    try:
+        for khz in freqs:
+            cpufreq.pin(khz)
+            results = [measure(['make', rule], cwd=target.directory, meter=meter)
+                       for _ in range(repetitions)]
+            ok = [r for r in results if r.returncode == 0]
+            if not ok:
+                steps.append(Step(khz, None, None))
+                continue
+            joules = [package_joules(r.energy) for r in ok]
+            steps.append(Step(khz, statistics.median(r.seconds for r in ok),
+                              None if None in joules else statistics.median(joules)))
+    finally:
+        cpufreq.restore()
+    return steps
+
+
+def best(steps, metric='energy'):
+    """The step minimizing ``energy`` or ``edp``; None without energy readings."""
+    measured = [s for s in steps if s.joules is not None]
+    if not measured:
+        return None
+    if metric == 'edp':
+        return min(measured, key=lambda s: s.joules * s.seconds)
+    return min(measured, key=lambda s: s.joules)
+
+
+def report(target, steps, out=sys.stdout):
+    name = '%s/%s' % (target.language, target.benchmark)
+    for s in steps:
+        if s.seconds is None:
+            out.write('%s\t%d MHz\tfailed\n' % (name, s.khz // 1000))
+            continue
+        joules = '-' if s.joules is None else '%.3f J\tEDP %.3f Js' % (s.joules,
+                                                                       s.joules * s.seconds)
+        out.write('%s\t%d MHz\t%.3f s\t%s\n' % (name, s.khz // 1000, s.seconds, joules))
+    for metric in ('energy', 'edp'):
+        chosen = best(steps, metric)
+        out.write('%s\tbest %s\t%s\n' % (
+            name, metric, 'no energy readings' if chosen is None else '%d MHz' % (chosen.khz // 1000)))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('path', nargs='+', help='language or language/benchmark folders')
+    parser.add_argument('--steps', type=int, default=5, help='number of frequencies')
+    parser.add_argument('--freq', type=int, action='append', metavar='KHZ',
+                        help='explicit frequency, repeatable (overrides --steps)')
+    parser.add_argument('-r', '--repetitions', type=int, default=3)
+    parser.add_argument('--rule', default='run', help='Makefile rule (default: run)')
+    parser.add_argument('--sysfs', default=SYSFS, help='cpufreq sysfs root')
+    parser.add_argument('--energy', help='energy backend (default: $HARNESS_ENERGY or auto)')
+    args = parser.parse_args(argv)
+
+    cpufreq = FrequencyControl(args.sysfs)
+    if not cpufreq.available():
+        parser.error('no cpufreq policies under %s' % args.sysfs)
+    freqs = args.freq or cpufreq.steps(args.steps)
+    meter = get_meter(args.energy)
+    for target in find(args.path):
+        report(target, sweep(target, cpufreq, freqs, args.repetitions, meter, args.rule))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,142 @@
+"""Energy counters for the harness.
+
+``RAPL/main`` reads the RAPL MSRs through ``/dev/cpu/*/msr``.  The harness
+reads the same counters through the Linux powercap interface, which needs no
+``msr`` module and exposes the package, core, uncore and dram domains as
+plain files.  Meters hand out opaque readings; ``delta`` turns two readings
+into joules per domain, and ``close`` releases what a meter holds (the
+``model`` backend's ``perf`` process).
+"""
+
+import os
+
+DOMAINS = ('package', 'core', 'uncore', 'dram')
+
+
+def _read(path):
+    try:
+        with open(path) as f:
+            return f.read().strip()
+    except OSError:
+        return None
+
+
+class NullMeter(object):
+    """Meter used when no energy counters are available."""
+
+    name = 'none'
+
+    def available(self):
+        return False
+
+    def read(self):
+        return ()
+
+    def delta(self, before, after):
+        return {}
+
+    def close(self):
+        pass
+
+
+class PowercapMeter(object):
+    """Cumulative RAPL counters from ``/sys/class/powercap``.
+
+    Zones of all packages are summed per domain.  Counter wrap-around is
+    corrected with the zone's ``max_energy_range_uj``.
+    """
+
+    name = 'rapl'
+
+    def __init__(self, root='/sys/class/powercap'):
+        self.root = root
+        self.zones = self._discover()
+
+    def _discover(self):
+        try:
+            entries = sorted(os.listdir(self.root))
+        except OSError:
+            return []
+        zones = []
+        for entry in entries:
+            if not entry.startswith('intel-rapl:'):
+                continue
+            path = os.path.join(self.root, entry)
+            name = _read(os.path.join(path, 'name')) or ''
+            domain = 'package' if name.startswith('package') else name
+            counter = os.path.join(path, 'energy_uj')
+            if domain not in DOMAINS or _read(counter) is None:
+                continue
+            max_range = int(_read(os.path.join(path, 'max_energy_range_uj')) or 0)
+            zones.append((domain, counter, max_range))
+        return zones
+
+    def available(self):
+        return bool(self.zones)
+
+    def read(self):
+        return tuple(int(_read(counter)) for _, counter, _ in self.zones)
+
+    def delta(self, before, after):
+        joules = {}
+        for (domain, _, max_range), b, a in zip(self.zones, before, after):
+            d = a - b
+            if d < 0:
+                d += max_range
+            joules[domain] = joules.get(domain, 0.0) + d / 1e6
+        return joules
+
+    def close(self):
+        pass
+
+
+def _model_meter():
+    # harness.model builds on this module
+    from harness.model import ModelMeter
+    return ModelMeter()
+
+
+METERS = {
+    'none': NullMeter,
+    'rapl': PowercapMeter,
+    'model': _model_meter,
+}
+
+
+def get_meter(name=None):
+    """Return the meter called ``name`` (default: ``$HARNESS_ENERGY``).
+
+    ``auto`` picks RAPL when the powercap counters are readable, then a
+    calibrated energy model (see ``harness.model``), and falls back to
+    ``NullMeter`` otherwise.
+    """
+    name = name or os.environ.get('HARNESS_ENERGY', 'auto')
+    if name == 'auto':
+        for meter in (PowercapMeter(), _model_meter()):
+            if meter.available():
+                return meter
+        return NullMeter()
+    if name not in METERS:
+        raise ValueError('unknown energy backend %r (choose from %s)'
+                         % (name, ', '.join(sorted(METERS))))
+    return METERS[name]()
+
+
+def package_joules(energy):
+    """Headline figure of an energy dict, as reported in ``<Language>.csv``."""
+    return energy.get('package')
+
+
+def package_error(energy):
+    """95% half-width of an estimated ``package_joules``; None when measured."""
+    return energy.get('package_error')
+
+
+def format_joules(energy):
+    joules = package_joules(energy)
+    if joules is None:
+        return '-'
+    error = package_error(energy)
+    if error is None:
+        return '%.3f J' % joules
+    return '%.3f +/- %.3f J' % (joules, error)
@@ -0,0 +1,181 @@
+"""Time, energy and collector statistics of a benchmark under each GC policy.
+
+Binary-trees is the allocation benchmark, and how the cyclic collector is
+run matters as much there as how the trees are built.  The benchmark marks
+where it builds data and when its long-lived tree is complete
+(``benchlib.gcprofile``), and this tool runs it ``-r`` times under every
+policy of ``--policy`` (all of them by default: ``default``, ``freeze``,
+``thresholds``, ``no-gc-build``), interleaved.  For each policy it prints
+the median time and energy, relative to the first policy, and from
+``gc.callbacks`` the collections per generation, the total and longest
+pause, and the objects collected.  Counting the objects each collection
+examines slows the program down, so that is done in one more, untimed run
+per policy.  ``freeze`` needs ``gc.freeze`` (Python 3.7+); on an older
+interpreter, such as the Makefiles' 3.6, it is reported as unavailable
+instead of being run.
+
+The collector statistics come from the main process, so the benchmark runs
+with ``BENCH_EXECUTOR=serial`` unless ``--executor`` says otherwise.
+
+    python3 -m harness.gcprofile binary-trees --arg 18 -r 3
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+from collections import namedtuple
+
+from harness import benchmarks
+from harness.counters import CounterReader
+from harness.energy import get_meter, package_joules
+from harness.runner import measure
+
+# benchlib.gcprofile's settings; the harness does not import benchlib
+ENV_VAR = 'BENCH_GC_FD'
+POLICY_VAR = 'BENCH_GC_POLICY'
+EXAMINE_VAR = 'BENCH_GC_EXAMINE'
+POLICIES = ('default', 'freeze', 'thresholds', 'no-gc-build')
+
+# What a policy needs from the interpreter, as code that fails without it.
+REQUIRES = {'freeze': ('import gc; gc.freeze', 'gc.freeze needs Python 3.7+')}
+
+Profile = namedtuple('Profile', 'policy seconds joules collections pause longest_pause '
+                                'examined collected failures unavailable')
+
+
+class GCReader(CounterReader):
+    """Receives the collector statistics a child writes at exit."""
+
+    env_var = ENV_VAR
+
+
+def unavailable(policy, interpreter):
+    """Why ``interpreter`` cannot run ``policy``, or None when it can."""
+    if policy not in REQUIRES:
+        return None
+    code, reason = REQUIRES[policy]
+    with open(os.devnull, 'w') as devnull:
+        ok = subprocess.call([interpreter, '-c', code], stdout=devnull, stderr=devnull) == 0
+    return None if ok else reason
+
+
+def run(bench, policy, interpreter=None, arg=None, meter=None, executor='serial',
+        examine=False):
+    """Run ``bench`` once under ``policy``; returns its ``Result`` and statistics."""
+    env = dict(os.environ)
+    env[POLICY_VAR] = policy
+    env[EXAMINE_VAR] = '1' if examine else '0'
+    if executor:
+        env['BENCH_EXECUTOR'] = executor
+    reader = GCReader()
+    result = measure(benchmarks.command(bench, interpreter or benchmarks.interpreter(),
+                                        arg=arg),
+                     cwd=benchmarks.directory(bench), env=env,
+                     stdin=benchmarks.stdin_path(bench), meter=meter, probes=[reader])
+    return result, reader.counts
+
+
+def _median(values):
+    values = [v for v in values if v is not None]
+    return statistics.median(values) if values else None
+
+
+def summarize(policy, runs, failures=0, examined=None):
+    """One ``Profile`` of medians from ``(Result, statistics)`` pairs."""
+    if not runs:
+        return Profile(policy, None, None, None, None, None, None, None, failures, None)
+    stats = [s for _, s in runs]
+
+    def median_of(key):
+        return _median(s.get(key) for s in stats)
+    return Profile(policy, _median(r.seconds for r, _ in runs),
+                   _median(package_joules(r.energy) for r, _ in runs),
+                   [_median(s['collections'][g] for s in stats) for g in range(3)],
+                   _median(sum(s['pause']) for s in stats),
+                   median_of('longest_pause'), examined, median_of('collected'), failures,
+                   None)
+
+
+def profile(bench, policies=POLICIES, repetitions=3, interpreter=None, arg=None, meter=None,
+            executor='serial'):
+    """One ``Profile`` per policy; the runs are interleaved.
+
+    Policies the interpreter cannot run are not run; their ``Profile`` only
+    says why.
+    """
+    meter = meter or get_meter()
+    interpreter = interpreter or benchmarks.interpreter()
+    missing = dict((p, unavailable(p, interpreter)) for p in policies)
+    policies = [p for p in policies if missing[p] is None]
+    runs = dict((p, []) for p in policies)
+    failures = dict((p, 0) for p in policies)
+    for _ in range(repetitions):
+        for policy in policies:
+            result, stats = run(bench, policy, interpreter, arg, meter, executor)
+            if result.returncode == 0 and stats:
+                runs[policy].append((result, stats))
+            else:
+                failures[policy] += 1
+    profiles = []
+    for policy in missing:
+        if missing[policy] is not None:
+            profiles.append(summarize(policy, [])._replace(unavailable=missing[policy]))
+            continue
+        _, stats = run(bench, policy, interpreter, arg, get_meter('none'), executor,
+                       examine=True)
+        profiles.append(summarize(policy, runs[policy], failures[policy],
+                                  stats.get('examined')))
+    return profiles
+
+
+def report(bench, profiles, out=sys.stdout):
+    base = profiles[0]
+    for p in profiles:
+        if p.unavailable:
+            out.write('%s\t%s\tunavailable: %s\n' % (bench.name, p.policy, p.unavailable))
+            continue
+        if p.seconds is None:
+            out.write('%s\t%s\tfailed (%d runs)\n' % (bench.name, p.policy, p.failures))
+            continue
+        speedup = base.seconds / p.seconds if base.seconds else 0.0
+        joules = '-' if p.joules is None else '%.3f J' % p.joules
+        if p.joules is not None and base.joules:
+            joules += ' (x%.2f)' % (p.joules / base.joules)
+        examined = '-' if p.examined is None else '%d' % p.examined
+        out.write('%s\t%s\t%.3f s (x%.2f)\t%s\tcollections %s\tpause %.1f ms (max %.1f ms)'
+                  '\texamined %s\tcollected %d\n' % (
+                      bench.name, p.policy, p.seconds, speedup, joules,
+                      '/'.join('%d' % c for c in p.collections), 1000 * p.pause,
+                      1000 * p.longest_pause, examined, p.collected))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('benchmark', nargs='*', default=['binary-trees'],
+                        help='benchmark names (default: binary-trees)')
+    parser.add_argument('--policy', action='append', choices=POLICIES,
+                        help='policy to run, repeatable (default: all)')
+    parser.add_argument('--arg', help='override the Makefile argument (problem size)')
+    parser.add_argument('-r', '--repetitions', type=int, default=3)
+    parser.add_argument('--executor', default='serial',
+                        help='BENCH_EXECUTOR for the runs (default: %(default)s)')
+    parser.add_argument('--interpreter',
+                        help='Python to run (default: the Makefiles\' one when installed)')
+    parser.add_argument('--energy', help='energy backend (default: $HARNESS_ENERGY or auto)')
+    args = parser.parse_args(argv)
+
+    meter = get_meter(args.energy)
+    failed = False
+    for name in args.benchmark:
+        bench = benchmarks.get(name)
+        profiles = profile(bench, args.policy or POLICIES, args.repetitions, args.interpreter,
+                           args.arg, meter, args.executor)
+        report(bench, profiles)
+        failed = failed or any(p.failures for p in profiles)
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,240 @@
+"""Interpreter, flag, allocator and GC matrix for the Python benchmarks.
+
+Every Python Makefile runs ``python3.6 -OO`` with the default allocator and
+GC settings.  This tool runs each benchmark under every combination of a
+declared set of interpreters, flag sets, environments and GC thresholds,
+then ranks the configurations by energy and time.
+
+A matrix is declared as JSON; every axis is optional and defaults to the
+built-in matrix below::
+
+    {
+      "interpreters": ["/usr/local/src/Python-3.6.1/bin/python3.6", "python3.12"],
+      "flags": [["-OO"], ["-OO", "-X", "importtime"]],
+      "env": {"default": {}, "malloc": {"PYTHONMALLOC": "malloc"}},
+      "gc": {"default": null, "relaxed": [10000, 50, 50]}
+    }
+
+Environments that ``LD_PRELOAD`` a missing library and interpreters that
+cannot be found are skipped.  Output goes to the ``--sink`` chosen from
+``harness.sinks`` (``/dev/null`` by default), recorded in every row.
+
+    python3 -m harness.matrix binary-trees n-body --spec matrix.json -r 3
+"""
+
+import argparse
+import csv
+import json
+import os
+import shutil
+import statistics
+import sys
+from collections import namedtuple
+from itertools import product
+
+from harness import benchmarks
+from harness.energy import get_meter, package_joules
+from harness.runner import measure
+from harness.sinks import SINKS, Output, get_sink
+
+Config = namedtuple('Config', 'name interpreter flags env gc_threshold')
+Row = namedtuple('Row', 'benchmark config seconds joules maxrss failures output')
+
+# Shared libraries tried for each LD_PRELOAD allocator, first match wins.
+ALLOCATORS = {
+    'jemalloc': ('/usr/lib/x86_64-linux-gnu/libjemalloc.so.2',
+                 '/usr/lib64/libjemalloc.so.2',
+                 '/usr/local/lib/libjemalloc.so.2'),
+    'tcmalloc': ('/usr/lib/x86_64-linux-gnu/libtcmalloc_minimal.so.4',
+                 '/usr/lib64/libtcmalloc_minimal.so.4',
+                 '/usr/local/lib/libtcmalloc_minimal.so.4'),
+    'mimalloc': ('/usr/lib/x86_64-linux-gnu/libmimalloc.so.2',
+                 '/usr/lib64/libmimalloc.so.2',
+                 '/usr/local/lib/libmimalloc.so.2'),
+}
+
+# Runs the benchmark script after setting the GC thresholds; the thresholds
+# travel as the first argument so the command line stays readable.
+GC_BOOTSTRAP = ("import gc, runpy, sys; "
+                "gc.set_threshold(*map(int, sys.argv[1].split(','))); "
+                "del sys.argv[:2]; "
+                "runpy.run_path(sys.argv[0], run_name='__main__')")
+
+
+def default_spec():
+    env = {
+        'default': {},
+        'pymalloc-off': {'PYTHONMALLOC': 'malloc'},
+        'hashseed-0': {'PYTHONHASHSEED': '0'},
+        # glibc >= 2.35: back malloc arenas with transparent huge pages
+        'thp-malloc': {'GLIBC_TUNABLES': 'glibc.malloc.hugetlb=1'},
+    }
+    for name, paths in sorted(ALLOCATORS.items()):
+        found = [p for p in paths if os.path.exists(p)]
+        if found:
+            # pymalloc serves small objects itself unless it is switched off
+            env[name] = {'LD_PRELOAD': found[0], 'PYTHONMALLOC': 'malloc'}
+    return {
+        'interpreters': [benchmarks.MAKEFILE_INTERPRETER, sys.executable],
+        'flags': [list(benchmarks.MAKEFILE_FLAGS)],
+        'env': env,
+        'gc': {'default': None, 'relaxed': [10000, 50, 50]},
+    }
+
+
+def load_spec(path):
+    with open(path) as f:
+        spec = json.load(f)
+    defaults = default_spec()
+    for axis in defaults:
+        spec.setdefault(axis, defaults[axis])
+    return spec
+
+
+def _resolve(interpreter):
+    if os.sep in interpreter:
+        return interpreter if os.access(interpreter, os.X_OK) else None
+    return shutil.which(interpreter)
+
+
+def expand(spec, out=sys.stderr):
+    """Cartesian product of the spec's axes, minus unusable entries."""
+    interpreters = []
+    for interpreter in spec['interpreters']:
+        path = _resolve(interpreter)
+        if path is None:
+            out.write('skipping interpreter %s: not found\n' % interpreter)
+        elif path not in interpreters:
+            interpreters.append(path)
+
+    envs = []
+    for name, env in sorted(spec['env'].items()):
+        preload = env.get('LD_PRELOAD')
+        if preload and not os.path.exists(preload):
+            out.write('skipping environment %s: %s not found\n' % (name, preload))
+        else:
+            envs.append((name, env))
+
+    configs = []
+    for interpreter, flags, (env_name, env), (gc_name, gc_threshold) in product(
+            interpreters, spec['flags'], envs, sorted(spec['gc'].items())):
+        name = ' '.join([os.path.basename(interpreter)] + list(flags)
+                        + [env_name, 'gc=' + gc_name])
+        configs.append(Config(name, interpreter, tuple(flags), dict(env),
+                              tuple(gc_threshold) if gc_threshold else None))
+    return configs
+
+
+def command(bench, config, arg=None):
+    argv = benchmarks.command(bench, config.interpreter, config.flags, arg)
+    if config.gc_threshold is None:
+        return argv
+    script_and_arg = argv[-2:]
+    return (argv[:-2] + ['-c', GC_BOOTSTRAP, ','.join(map(str, config.gc_threshold))]
+            + script_and_arg)
+
+
+def environment(config):
+    env = dict(os.environ)
+    env.update(config.env)
+    return env
+
+
+def run_config(bench, config, repetitions=3, arg=None, meter=None, sink=None):
+    if repetitions < 1:
+        raise ValueError('repetitions must be at least 1')
+    meter = meter or get_meter()
+    results = []
+    failures = 0
+    for _ in range(repetitions):
+        result = measure(command(bench, config, arg), cwd=benchmarks.directory(bench),
+                         env=environment(config), stdin=benchmarks.stdin_path(bench),
+                         meter=meter, sink=sink)
+        if result.returncode != 0:
+            failures += 1
+        else:
+            results.append(result)
+    if not results:
+        return Row(bench.name, config, None, None, None, failures, result.output)
+    joules = [package_joules(r.energy) for r in results]
+    return Row(bench.name, config,
+               statistics.median(r.seconds for r in results),
+               None if None in joules else statistics.median(joules),
+               max(r.maxrss for r in results), failures, results[-1].output)
+
+
+def rank(rows):
+    """Order ``rows`` best first: by energy when measured, else by time."""
+    ok = [r for r in rows if r.seconds is not None]
+    failed = [r for r in rows if r.seconds is None]
+    return sorted(ok, key=lambda r: (r.joules is None, r.joules, r.seconds)) + failed
+
+
+def report(rows, out=sys.stdout):
+    by_time = dict((id(r), i) for i, r in enumerate(
+        sorted((r for r in rows if r.seconds is not None), key=lambda r: r.seconds), 1))
+    baseline = rows[0] if rows else None
+    for position, row in enumerate(rank(rows), 1):
+        if row.seconds is None:
+            out.write('  -\tfailed (%d runs)\t\t\t\t%s\n' % (row.failures, row.config.name))
+            continue
+        joules = '-' if row.joules is None else '%.3f J' % row.joules
+        relative = row.seconds / baseline.seconds if baseline.seconds else 0.0
+        out.write('  %d\t%s\t%.3f s (#%d, x%.2f)\t%d KB\t%s\n' % (
+            position, joules, row.seconds, by_time[id(row)], relative,
+            row.maxrss, row.config.name))
+
+
+def write_csv(path, rows):
+    with open(path, 'w', newline='') as f:
+        writer = csv.writer(f, delimiter=';')
+        writer.writerow(['benchmark', 'config', 'interpreter', 'flags', 'env',
+                         'gc_threshold', 'seconds', 'joules', 'maxrss_kb', 'failures',
+                         'sink', 'output_bytes', 'output_sha256'])
+        for r in rows:
+            output = r.output or Output(None, None, None)
+            writer.writerow([r.benchmark, r.config.name, r.config.interpreter,
+                             ' '.join(r.config.flags), json.dumps(r.config.env, sort_keys=True),
+                             ','.join(map(str, r.config.gc_threshold or ())),
+                             r.seconds, r.joules, r.maxrss, r.failures,
+                             output.sink, output.bytes, output.sha256])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('benchmark', nargs='+', help='benchmark names, or "all"')
+    parser.add_argument('--spec', help='JSON matrix declaration (default: built-in matrix)')
+    parser.add_argument('-r', '--repetitions', type=int, default=3)
+    parser.add_argument('--arg', help='override the Makefile argument (problem size)')
+    parser.add_argument('--energy', help='energy backend (default: $HARNESS_ENERGY or auto)')
+    parser.add_argument('--csv', help='also write every row to this file')
+    parser.add_argument('--sink', choices=sorted(SINKS), default='null',
+                        help='where benchmark output goes (default: null)')
+    args = parser.parse_args(argv)
+    if args.repetitions < 1:
+        parser.error('--repetitions must be at least 1')
+
+    spec = load_spec(args.spec) if args.spec else default_spec()
+    configs = expand(spec)
+    if not configs:
+        parser.error('the matrix has no usable configuration')
+    names = args.benchmark
+    if names == ['all']:
+        names = [b.name for b in benchmarks.BENCHMARKS]
+    meter = get_meter(args.energy)
+
+    all_rows = []
+    for name in names:
+        bench = benchmarks.get(name)
+        rows = [run_config(bench, config, args.repetitions, args.arg, meter,
+                           get_sink(args.sink))
+                for config in configs]
+        print('%s\t(output to %s)' % (bench.name, args.sink))
+        report(rows)
+        all_rows.extend(rows)
+    if args.csv:
+        write_csv(args.csv, all_rows)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,276 @@
+"""Micro-benchmarks of the hot kernels of the Python benchmarks.
+
+A full run of a benchmark takes minutes and mixes start-up, I/O and pool
+traffic with the loop that does the work.  This suite imports each program
+once and times its kernel directly, on a small fixed input:
+
+* the loop count is calibrated, doubling until one batch takes at least
+  ``--min-time``, and each sample is a batch divided by the loop count;
+* the garbage collector is off while a batch runs, as in ``timeit``;
+* every kernel gets ``--repeat`` samples, summarized by median,
+  interquartile range, minimum and relative standard deviation.
+
+A kernel can also come from one of the benchmark's variants, so
+``make_tree`` and ``make_tree_iterative`` time the recursive and the
+iterative binary-trees builders on the same tree.
+
+Results are appended to ``micro.jsonl`` together with the git revision
+and the interpreter, and each run is compared with the previous one of the
+same kernel on the same interpreter (Mann-Whitney test, as in
+``harness.compare``), so kernel changes can be tracked without end-to-end
+runs.
+
+    python3 -m harness.micro check_tree advance -r 9
+"""
+
+import argparse
+import copy
+import gc
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import time
+from collections import deque, namedtuple
+
+from harness import benchmarks
+from harness.benchmarks import ROOT
+from harness.compare import mann_whitney
+from harness.sinks import NullSink, redirect_stdout
+
+LOG = os.path.join(ROOT, 'micro.jsonl')
+
+# ``variant`` names a module of ``harness.benchmarks.VARIANTS`` to take the
+# kernel from instead of the benchmark's own source.
+Kernel = namedtuple('Kernel', 'name benchmark setup variant')
+Kernel.__new__.__defaults__ = (None,)
+Summary = namedtuple('Summary', 'kernel benchmark number samples median iqr minimum rsd')
+
+
+def _nucleotides(length, seed=0):
+    rng = random.Random(seed)
+    return bytearray(rng.choice(b'\x00\x01\x02\x03') for _ in range(length))
+
+
+def _count_frequencies(module):
+    sequence = _nucleotides(20000)
+    frames = [(1, (0, 1, 2, 3)), (2, tuple(range(16)))] + [
+        (k, (0,)) for k in (3, 4, 6, 12, 18)]
+    return lambda: module.count_frequencies(sequence, frames, 0, len(sequence))
+
+
+def _advance(module):
+    bodies = copy.deepcopy(module.SYSTEM)
+    pairs = module.combinations(bodies)
+    return lambda: module.advance(0.01, 200, bodies, pairs)
+
+
+def _compute_row(module):
+    return lambda: module.compute_row((100, 200))
+
+
+def _part_a_times_u(module):
+    u = [1.0] * 200
+    return lambda: module.part_A_times_u((7, u))
+
+
+def _alternating_flips(module):
+    # all 5040 permutations of 7 elements, as one task
+    return lambda: deque(module.alternating_flips_generator(7, 0, 5040), maxlen=0)
+
+
+def _random_fasta(module):
+    return lambda: module.random_fasta(module.iub, 6000, 42.0)
+
+
+def _reverse_complement(module):
+    rng = random.Random(0)
+    sequence = bytearray()
+    for _ in range(1000):
+        sequence += bytes(rng.choice(b'ACGT') for _ in range(60)) + b'\n'
+    return lambda: module.reverse_complement(b'>ONE\n', sequence)
+
+
+def _check_tree(module):
+    tree = module.make_tree(12)
+    return lambda: module.check_tree(tree)
+
+
+def _make_tree(module):
+    return lambda: module.make_tree(12)
+
+
+def _make_check(module):
+    return lambda: module.make_check((1, 12))
+
+
+KERNELS = (
+    Kernel('count_frequencies', 'k-nucleotide', _count_frequencies),
+    Kernel('advance', 'n-body', _advance),
+    Kernel('compute_row', 'mandelbrot', _compute_row),
+    Kernel('part_A_times_u', 'spectral-norm', _part_a_times_u),
+    Kernel('alternating_flips_generator', 'fannkuch-redux', _alternating_flips),
+    Kernel('random_fasta', 'fasta', _random_fasta),
+    Kernel('reverse_complement', 'reverse-complement', _reverse_complement),
+    Kernel('check_tree', 'binary-trees', _check_tree),
+    Kernel('make_tree', 'binary-trees', _make_tree),
+    Kernel('check_tree_iterative', 'binary-trees', _check_tree, 'iterative'),
+    Kernel('make_tree_iterative', 'binary-trees', _make_tree, 'iterative'),
+    Kernel('make_check', 'binary-trees', _make_check),
+    Kernel('make_check_fused', 'binary-trees', _make_check, 'fused'),
+)
+
+
+def get(name):
+    for kernel in KERNELS:
+        if kernel.name == name:
+            return kernel
+    raise ValueError('unknown kernel %r' % name)
+
+
+def _batch(func, number):
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        t0 = time.perf_counter()
+        for _ in range(number):
+            func()
+        return time.perf_counter() - t0
+    finally:
+        if enabled:
+            gc.enable()
+
+
+def calibrate(func, min_time=0.05):
+    """The smallest power of two loop count whose batch takes ``min_time``."""
+    number = 1
+    while _batch(func, number) < min_time:
+        number *= 2
+    return number
+
+
+def _iqr(ordered):
+    """Interquartile range, quartiles being the medians of the two halves."""
+    half = len(ordered) // 2
+    if half == 0:
+        return 0.0
+    return statistics.median(ordered[-half:]) - statistics.median(ordered[:half])
+
+
+def summarize(kernel, number, samples):
+    ordered = sorted(samples)
+    mean = statistics.mean(ordered)
+    return Summary(kernel.name, kernel.benchmark, number, samples, statistics.median(ordered),
+                   _iqr(ordered), ordered[0],
+                   statistics.stdev(ordered) / mean if len(ordered) > 1 and mean else 0.0)
+
+
+def run(kernel, repeat=9, min_time=0.05):
+    """Time ``kernel``; returns its ``Summary`` (seconds per call)."""
+    bench = benchmarks.get(kernel.benchmark)
+    variant = kernel.variant and benchmarks.get_variant(bench, kernel.variant)
+    module = (sys.modules.get(benchmarks.module_name(bench, variant))
+              or benchmarks.load(bench, variant))
+    func = kernel.setup(module)
+    # kernels that print (random_fasta) write to /dev/null
+    with NullSink() as sink, redirect_stdout(sink):
+        number = calibrate(func, min_time)
+        samples = [_batch(func, number) / number for _ in range(repeat)]
+    return summarize(kernel, number, samples)
+
+
+def _revision():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT,
+                              stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+                              universal_newlines=True).stdout.strip() or None
+    except OSError:
+        return None
+
+
+def interpreter_id():
+    return '%s-%s' % (platform.python_implementation(), platform.python_version())
+
+
+def entry(summary, revision=None, interpreter=None):
+    return {
+        'kernel': summary.kernel, 'benchmark': summary.benchmark,
+        'time': time.strftime('%Y-%m-%dT%H:%M:%S'), 'revision': revision,
+        'interpreter': interpreter or interpreter_id(), 'number': summary.number,
+        'seconds': summary.samples,
+    }
+
+
+def read_log(path=LOG):
+    if not os.path.exists(path):
+        return []
+    with open(path) as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def previous(log, kernel, interpreter=None):
+    """The last logged entry for ``kernel`` on ``interpreter``, or None."""
+    interpreter = interpreter or interpreter_id()
+    for logged in reversed(log):
+        if logged['kernel'] == kernel and logged['interpreter'] == interpreter:
+            return logged
+    return None
+
+
+def trend(summary, earlier):
+    """``(relative change of the median, p-value)`` against an earlier entry."""
+    before = statistics.median(earlier['seconds'])
+    _, p_value = mann_whitney(earlier['seconds'], summary.samples)
+    return (summary.median - before) / before, p_value
+
+
+def _us(seconds):
+    return '%.2f us' % (seconds * 1e6)
+
+
+def report(summary, earlier=None, alpha=0.05, out=sys.stdout):
+    line = '%s\t%s\tmedian %s\tIQR %s\tmin %s\tRSD %.1f%%\t(%d x %d)' % (
+        summary.kernel, summary.benchmark, _us(summary.median), _us(summary.iqr),
+        _us(summary.minimum), 100 * summary.rsd, len(summary.samples), summary.number)
+    if earlier is not None:
+        change, p_value = trend(summary, earlier)
+        verdict = 'unchanged'
+        if p_value < alpha:
+            verdict = 'slower' if change > 0 else 'faster'
+        line += '\t%+.1f%% vs %s (p=%.3g, %s)' % (100 * change, earlier['revision'] or '?',
+                                                  p_value, verdict)
+    out.write(line + '\n')
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('kernel', nargs='*', help='kernel names (default: all)')
+    parser.add_argument('-r', '--repeat', type=int, default=9, help='samples per kernel')
+    parser.add_argument('--min-time', type=float, default=0.05,
+                        help='calibrated duration of one batch, in seconds')
+    parser.add_argument('--alpha', type=float, default=0.05)
+    parser.add_argument('--log', default=LOG, help='result history (default: %(default)s)')
+    parser.add_argument('--no-store', action='store_true', help='do not append to the log')
+    parser.add_argument('--list', action='store_true', help='list the kernels and exit')
+    args = parser.parse_args(argv)
+
+    if args.list:
+        for kernel in KERNELS:
+            print('%s\t%s' % (kernel.name, kernel.benchmark))
+        return
+    kernels = [get(name) for name in args.kernel] if args.kernel else list(KERNELS)
+    log = read_log(args.log)
+    revision = _revision()
+    for kernel in kernels:
+        summary = run(kernel, args.repeat, args.min_time)
+        report(summary, previous(log, kernel.name), args.alpha)
+        if not args.no_store:
+            with open(args.log, 'a') as f:
+                f.write(json.dumps(entry(summary, revision)) + '\n')
+
+
+if __name__ == '__main__':
+    main()
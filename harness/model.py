@@ -0,0 +1,426 @@
+"""Model-based energy estimates for hosts without RAPL counters.
+
+AMD hosts, VMs and containers expose neither ``/dev/cpu/*/msr`` nor the
+powercap counters, so ``RAPL/main`` exits and the harness reads no energy.
+This module fits a linear power model on a host that has RAPL and uses it
+elsewhere as the ``model`` energy backend (``HARNESS_ENERGY=model``):
+
+    E = p_idle * seconds + p_busy * cpu_seconds + k_f * cpu_seconds * GHz
+        + e_i * instructions + e_m * cache_misses
+
+CPU time comes from ``/proc/stat``, the clock from ``cpufreq`` and the
+instruction and cache-miss counts from ``perf stat`` when it is installed
+and permitted.  VMs and containers often have neither of the last two, so
+calibration fits one model per combination of the inputs it could read --
+the base ``seconds``/``cpu_seconds`` model, with the clock, with the perf
+counts, with both -- and the meter uses the richest model the host can
+feed.  Every estimate carries a 95% prediction half-width as
+``package_error``, so trends between variants can be compared offline with
+their uncertainty.
+
+    python3 -m harness.model calibrate -o model.json    # on a RAPL host
+    HARNESS_ENERGY=model HARNESS_ENERGY_MODEL=model.json python3 -m harness.warm n-body
+"""
+
+import argparse
+import atexit
+import json
+import math
+import multiprocessing
+import os
+import shutil
+import subprocess
+import sys
+import threading
+import time
+
+from harness.benchmarks import ROOT
+from harness.energy import PowercapMeter, package_joules
+
+ENV_VAR = 'HARNESS_ENERGY_MODEL'
+DEFAULT_PATH = os.path.join(ROOT, 'energy-model.json')
+
+# Two-sided 95% quantile of the normal distribution.
+Z95 = 1.959964
+
+# Every model has the base features; each optional group is fitted with and
+# without, since a host may lack cpufreq, perf or both.
+BASE_FEATURES = ['seconds', 'cpu_seconds']
+OPTIONAL_FEATURES = (['cpu_ghz_seconds'], ['instructions', 'cache_misses'])
+
+
+class ProcStat(object):
+    """Busy CPU seconds, summed over all CPUs, from ``/proc/stat``."""
+
+    def __init__(self, root='/proc'):
+        self.path = os.path.join(root, 'stat')
+        self.hz = os.sysconf('SC_CLK_TCK')
+
+    def read(self):
+        with open(self.path) as f:
+            fields = f.readline().split()
+        user, nice, system, idle, iowait, irq, softirq = map(int, fields[1:8])
+        return (user + nice + system + irq + softirq) / self.hz
+
+
+class CpuFreq(object):
+    """Mean current clock over all CPUs in GHz, from ``cpufreq``; None without it."""
+
+    def __init__(self, root='/sys/devices/system/cpu'):
+        self.paths = []
+        try:
+            entries = sorted(os.listdir(root))
+        except OSError:
+            entries = []
+        for entry in entries:
+            path = os.path.join(root, entry, 'cpufreq', 'scaling_cur_freq')
+            if entry[3:].isdigit() and os.path.exists(path):
+                self.paths.append(path)
+
+    def read(self):
+        khz = []
+        for path in self.paths:
+            with open(path) as f:
+                khz.append(int(f.read()))
+        return sum(khz) / len(khz) / 1e6 if khz else None
+
+
+class PerfCounters(object):
+    """System-wide instruction and cache-miss totals from a background ``perf stat``.
+
+    Counts arrive every ``interval`` seconds, which bounds the resolution.
+    ``perf`` starts with the first ``read`` and runs until ``close``, or
+    until the interpreter exits.
+    """
+
+    EVENTS = ('instructions', 'cache-misses')
+
+    def __init__(self, interval=0.1):
+        self.interval = interval
+        self.totals = dict.fromkeys(self.EVENTS, 0)
+        self._proc = None
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def installed():
+        return shutil.which('perf') is not None
+
+    @classmethod
+    def usable(cls):
+        """True when ``perf`` is installed and may count the events system-wide."""
+        if not cls.installed():
+            return False
+        return subprocess.call(['perf', 'stat', '-a', '-x', ',', '-e', ','.join(cls.EVENTS),
+                                'true'], stdout=subprocess.DEVNULL,
+                               stderr=subprocess.DEVNULL) == 0
+
+    def _start(self):
+        self._proc = subprocess.Popen(
+            ['perf', 'stat', '-a', '-x', ',', '-I', str(int(self.interval * 1000)),
+             '-e', ','.join(self.EVENTS)],
+            stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, universal_newlines=True)
+        threading.Thread(target=self._collect, daemon=True).start()
+        atexit.register(self.close)
+
+    def _collect(self):
+        for line in self._proc.stderr:
+            fields = line.strip().split(',')
+            if len(fields) >= 4 and fields[3] in self.totals and fields[1].isdigit():
+                with self._lock:
+                    self.totals[fields[3]] += int(fields[1])
+
+    def read(self):
+        if self._proc is None:
+            self._start()
+        with self._lock:
+            return tuple(self.totals[e] for e in self.EVENTS)
+
+    def close(self):
+        if self._proc is not None:
+            atexit.unregister(self.close)
+            self._proc.terminate()
+            self._proc.wait()
+            self._proc.stderr.close()
+            self._proc = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+        return False
+
+
+class Sampler(object):
+    """Readings of the model's inputs; ``features`` turns two into a sample."""
+
+    def __init__(self, proc=None, freq=None, perf=None):
+        self.proc = proc or ProcStat()
+        self.freq = freq if freq is not None else CpuFreq()
+        self.perf = perf
+
+    def names(self):
+        names = ['seconds', 'cpu_seconds']
+        if self.freq.paths:
+            names.append('cpu_ghz_seconds')
+        if self.perf is not None:
+            names += ['instructions', 'cache_misses']
+        return names
+
+    def read(self):
+        return (time.perf_counter(), self.proc.read(), self.freq.read(),
+                self.perf.read() if self.perf is not None else None)
+
+    def close(self):
+        if self.perf is not None:
+            self.perf.close()
+
+    def features(self, before, after):
+        cpu_seconds = after[1] - before[1]
+        values = {'seconds': after[0] - before[0], 'cpu_seconds': cpu_seconds}
+        if before[2] is not None and after[2] is not None:
+            values['cpu_ghz_seconds'] = cpu_seconds * (before[2] + after[2]) / 2
+        if before[3] is not None:
+            values['instructions'] = after[3][0] - before[3][0]
+            values['cache_misses'] = after[3][1] - before[3][1]
+        return values
+
+
+def _solve(a, b):
+    """Solve ``a x = b`` by Gaussian elimination with partial pivoting."""
+    n = len(a)
+    m = [list(row) + [v] for row, v in zip(a, b)]
+    for col in range(n):
+        pivot = max(range(col, n), key=lambda r: abs(m[r][col]))
+        if abs(m[pivot][col]) < 1e-12:
+            raise ValueError('calibration samples do not determine the model; '
+                             'vary the workloads')
+        m[col], m[pivot] = m[pivot], m[col]
+        for r in range(col + 1, n):
+            f = m[r][col] / m[col][col]
+            for c in range(col, n + 1):
+                m[r][c] -= f * m[col][c]
+    x = [0.0] * n
+    for r in range(n - 1, -1, -1):
+        x[r] = (m[r][n] - sum(m[r][c] * x[c] for c in range(r + 1, n))) / m[r][r]
+    return x
+
+
+def _inverse(a):
+    n = len(a)
+    columns = [_solve(a, [1.0 if i == j else 0.0 for i in range(n)]) for j in range(n)]
+    return [[columns[j][i] for j in range(n)] for i in range(n)]
+
+
+class Model(object):
+    """Linear energy model with the covariance needed for prediction intervals."""
+
+    def __init__(self, features, coefficients, covariance, variance, samples=0, host=None):
+        self.features = list(features)
+        self.coefficients = list(coefficients)
+        self.covariance = covariance      # (X'X)^-1
+        self.variance = variance          # residual variance, J^2
+        self.samples = samples
+        self.host = host
+
+    @classmethod
+    def fit(cls, samples, features, host=None):
+        """Least-squares fit of ``[(feature dict, joules), ...]``."""
+        if len(samples) <= len(features):
+            raise ValueError('need more calibration samples than features (%d)'
+                             % len(features))
+        k = len(features)
+        x = [[values[name] for name in features] for values, _ in samples]
+        y = [joules for _, joules in samples]
+        # Columns range from seconds to billions of instructions; solve on
+        # columns scaled to unit RMS and scale the results back.
+        scale = [math.sqrt(sum(row[i] ** 2 for row in x) / len(x)) or 1.0 for i in range(k)]
+        xs = [[row[i] / scale[i] for i in range(k)] for row in x]
+        xtx = [[sum(row[i] * row[j] for row in xs) for j in range(k)] for i in range(k)]
+        xty = [sum(row[i] * v for row, v in zip(xs, y)) for i in range(k)]
+        coefficients = [c / scale[i] for i, c in enumerate(_solve(xtx, xty))]
+        covariance = [[c / (scale[i] * scale[j]) for j, c in enumerate(row)]
+                      for i, row in enumerate(_inverse(xtx))]
+        residuals = [v - sum(c * f for c, f in zip(coefficients, row)) for row, v in zip(x, y)]
+        variance = sum(e * e for e in residuals) / (len(samples) - k)
+        return cls(features, coefficients, covariance, variance, len(samples), host)
+
+    def predict(self, values):
+        """Estimated joules and the 95% prediction half-width."""
+        x = [values[name] for name in self.features]
+        joules = sum(c * f for c, f in zip(self.coefficients, x))
+        leverage = sum(x[i] * self.covariance[i][j] * x[j]
+                       for i in range(len(x)) for j in range(len(x)))
+        return max(joules, 0.0), Z95 * math.sqrt(self.variance * (1 + leverage))
+
+    def to_json(self):
+        return {'features': self.features, 'coefficients': self.coefficients,
+                'covariance': self.covariance, 'variance': self.variance,
+                'samples': self.samples, 'host': self.host}
+
+    @classmethod
+    def from_json(cls, data):
+        return cls(data['features'], data['coefficients'], data['covariance'],
+                   data['variance'], data.get('samples', 0), data.get('host'))
+
+    def save(self, path):
+        with open(path, 'w') as f:
+            json.dump(self.to_json(), f, indent=2)
+
+    @classmethod
+    def load(cls, path):
+        with open(path) as f:
+            return cls.from_json(json.load(f))
+
+
+def feature_sets(names):
+    """The base features plus every combination of the optional groups in
+    ``names``, fewest features first."""
+    sets = [list(BASE_FEATURES)]
+    for group in OPTIONAL_FEATURES:
+        if all(name in names for name in group):
+            sets += [features + group for features in sets]
+    return sorted(sets, key=len)
+
+
+def save_models(models, path):
+    with open(path, 'w') as f:
+        json.dump({'models': [m.to_json() for m in models]}, f, indent=2)
+
+
+def load_models(path):
+    """The models of a calibration file; older files hold a single model."""
+    with open(path) as f:
+        data = json.load(f)
+    if 'models' in data:
+        return [Model.from_json(m) for m in data['models']]
+    return [Model.from_json(data)]
+
+
+class ModelMeter(object):
+    """Energy meter that estimates package joules with a calibrated ``Model``.
+
+    ``models`` is a ``Model`` or a list of them; the meter uses the one with
+    the most features this host's sampler provides.
+    """
+
+    name = 'model'
+
+    def __init__(self, models=None, sampler=None):
+        if models is None:
+            path = os.environ.get(ENV_VAR, DEFAULT_PATH)
+            models = load_models(path) if os.path.exists(path) else []
+        elif isinstance(models, Model):
+            models = [models]
+        self.models = list(models)
+        if sampler is None:
+            needs_perf = any('instructions' in m.features for m in self.models)
+            sampler = Sampler(perf=PerfCounters() if needs_perf and PerfCounters.usable()
+                              else None)
+        self.sampler = sampler
+        names = set(sampler.names())
+        usable = [m for m in self.models if set(m.features) <= names]
+        self.model = max(usable, key=lambda m: len(m.features)) if usable else None
+
+    def available(self):
+        return self.model is not None
+
+    def read(self):
+        return self.sampler.read()
+
+    def delta(self, before, after):
+        joules, error = self.model.predict(self.sampler.features(before, after))
+        return {'package': joules, 'package_error': error}
+
+    def close(self):
+        """Stop the sampler's ``perf`` process, if one was started."""
+        close = getattr(self.sampler, 'close', None)
+        if close is not None:
+            close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+        return False
+
+
+# Calibration workloads, run with 1..N copies in parallel.
+WORKLOADS = {
+    'idle': 'import time; time.sleep(%(seconds)s)',
+    'compute': ('import time\nend = time.time() + %(seconds)s\nx = 1.0\n'
+                'while time.time() < end:\n'
+                '    for _ in range(10000): x = x * 1.000001 + 1e-9\n'),
+    'memory': ('import time\nend = time.time() + %(seconds)s\nb = bytearray(64 << 20)\n'
+               'while time.time() < end:\n    b[:] = b[1:] + b[:1]\n'),
+}
+
+
+def sample(command_lines, sampler, meter):
+    """Run commands concurrently; returns (features, measured package joules)."""
+    before, energy_before = sampler.read(), meter.read()
+    procs = [subprocess.Popen(argv) for argv in command_lines]
+    for proc in procs:
+        proc.wait()
+    after, energy_after = sampler.read(), meter.read()
+    return sampler.features(before, after), package_joules(meter.delta(energy_before, energy_after))
+
+
+def calibrate(seconds=2.0, repetitions=2, parallelism=None, sampler=None, meter=None):
+    """One ``Model`` per set of ``feature_sets``, fewest features first."""
+    meter = meter or PowercapMeter()
+    if not meter.available():
+        raise RuntimeError('calibration needs readable RAPL counters (/sys/class/powercap)')
+    owned = sampler is None
+    if owned:
+        sampler = Sampler(perf=PerfCounters() if PerfCounters.usable() else None)
+    cpus = multiprocessing.cpu_count()
+    levels = parallelism or sorted(set([1, max(1, cpus // 2), cpus]))
+    samples = []
+    try:
+        for _ in range(repetitions):
+            for name, code in sorted(WORKLOADS.items()):
+                for n in levels:
+                    argv = [sys.executable, '-c', code % {'seconds': seconds}]
+                    samples.append(sample([argv] * n, sampler, meter))
+    finally:
+        if owned:
+            sampler.close()
+    # perf may be installed but not permitted, leaving its counts at zero
+    names = [name for name in sampler.names() if any(values[name] for values, _ in samples)]
+    host = {'cpus': cpus, 'node': os.uname().nodename}
+    return [Model.fit(samples, features, host) for features in feature_sets(names)]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    sub = parser.add_subparsers(dest='command')
+    cal = sub.add_parser('calibrate', help='fit a model on this (RAPL-capable) host')
+    cal.add_argument('-o', '--output', default=os.environ.get(ENV_VAR, DEFAULT_PATH))
+    cal.add_argument('--seconds', type=float, default=2.0, help='length of each workload')
+    cal.add_argument('-r', '--repetitions', type=int, default=2)
+    show = sub.add_parser('show', help='print a model')
+    show.add_argument('path', nargs='?', default=os.environ.get(ENV_VAR, DEFAULT_PATH))
+    args = parser.parse_args(argv)
+
+    if args.command == 'calibrate':
+        models = calibrate(args.seconds, args.repetitions)
+        save_models(models, args.output)
+        print('wrote %s (%d samples)' % (args.output, models[0].samples))
+        for model in models:
+            print('  %s: residual sd %.3f J'
+                  % (', '.join(model.features), math.sqrt(model.variance)))
+    elif args.command == 'show':
+        for model in load_models(args.path):
+            print('== %s' % ', '.join(model.features))
+            for name, c in zip(model.features, model.coefficients):
+                print('%s\t%.6g' % (name, c))
+            print('residual sd\t%.3f J\t(%d samples)'
+                  % (math.sqrt(model.variance), model.samples))
+    else:
+        parser.print_help()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,133 @@
+"""Per-phase time and energy from markers emitted by a benchmark.
+
+Benchmarks mark their stages with ``benchlib.phases.phase(name)``.  This
+module gives the child the write end of a pipe in ``BENCH_PHASE_FD``, reads
+the markers as they arrive and takes an energy reading for each one, so the
+run's joules can be split between the stages.  Time before the first marker
+(interpreter start-up and imports) is reported as ``startup``.
+
+    python3 -m harness.phases k-nucleotide
+"""
+
+import argparse
+import os
+import sys
+import threading
+import time
+from collections import namedtuple, OrderedDict
+
+from harness import benchmarks
+from harness.energy import get_meter, package_joules
+from harness.runner import measure
+from harness.sinks import SINKS, get_sink
+
+ENV_VAR = 'BENCH_PHASE_FD'
+
+Mark = namedtuple('Mark', 'name seconds reading')
+Phase = namedtuple('Phase', 'name seconds energy entries')
+
+
+class PhaseRecorder(object):
+    """Collects the markers of one child process; see ``runner.measure``."""
+
+    def __init__(self, meter=None):
+        self.meter = meter or get_meter()
+        self.marks = []
+        self._read_fd, self.fd = os.pipe()
+        self._thread = None
+
+    def environ(self, env=None):
+        env = dict(os.environ if env is None else env)
+        env[ENV_VAR] = str(self.fd)
+        return env
+
+    def start(self, seconds, reading):
+        """Called once the child has been started at ``seconds``."""
+        # Only the child (and its forked workers) hold the write end now,
+        # so the reader sees EOF once they are gone.
+        os.close(self.fd)
+        self.marks.append(Mark('startup', seconds, reading))
+        self._thread = threading.Thread(target=self._read, daemon=True)
+        self._thread.start()
+
+    def _read(self):
+        pending = b''
+        while True:
+            data = os.read(self._read_fd, 4096)
+            if not data:
+                break
+            seconds = time.perf_counter()
+            reading = self.meter.read()
+            lines = (pending + data).split(b'\n')
+            pending = lines.pop()
+            for name in lines:
+                self.marks.append(Mark(name.decode(), seconds, reading))
+
+    def stop(self, seconds, reading):
+        """Called once the child has been reaped at ``seconds``."""
+        self._thread.join()
+        os.close(self._read_fd)
+        # markers written just before exit may be read after the reaping
+        self.marks = [m if m.seconds <= seconds else Mark(m.name, seconds, reading)
+                      for m in self.marks]
+        self.marks.append(Mark(None, seconds, reading))
+
+    def phases(self):
+        """One ``Phase`` per distinct marker name, in order of first use."""
+        totals = OrderedDict()
+        for mark, following in zip(self.marks, self.marks[1:]):
+            seconds, energy, entries = totals.get(mark.name, (0.0, {}, 0))
+            for domain, joules in self.meter.delta(mark.reading, following.reading).items():
+                energy[domain] = energy.get(domain, 0.0) + joules
+            totals[mark.name] = (seconds + following.seconds - mark.seconds, energy,
+                                 entries + 1)
+        return [Phase(name, s, e, n) for name, (s, e, n) in totals.items()]
+
+
+def run(bench, interpreter=None, arg=None, meter=None, sink=None):
+    """Run ``bench`` once as a script; returns its ``Result`` and phases."""
+    meter = meter or get_meter()
+    recorder = PhaseRecorder(meter)
+    result = measure(benchmarks.command(bench, interpreter or benchmarks.interpreter(),
+                                        arg=arg),
+                     cwd=benchmarks.directory(bench), stdin=benchmarks.stdin_path(bench),
+                     meter=meter, probes=[recorder], sink=sink)
+    return result, recorder.phases()
+
+
+def report(bench, result, phases, out=sys.stdout):
+    total = package_joules(result.energy)
+    for p in phases:
+        joules = package_joules(p.energy)
+        share = '' if not total or joules is None else ' (%.1f%%)' % (100.0 * joules / total)
+        out.write('%s\t%s\t%.6f s\t%s%s\n' % (
+            bench.name, p.name, p.seconds,
+            '-' if joules is None else '%.3f J' % joules, share))
+    if result.returncode != 0:
+        out.write('%s\texited with status %d\n' % (bench.name, result.returncode))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('benchmark', nargs='+', help='benchmark names, or "all"')
+    parser.add_argument('--arg', help='override the Makefile argument (problem size)')
+    parser.add_argument('--energy', help='energy backend (default: $HARNESS_ENERGY or auto)')
+    parser.add_argument('--interpreter',
+                        help='Python to run (default: the Makefiles\' one when installed)')
+    parser.add_argument('--sink', choices=sorted(SINKS), default='null',
+                        help='where benchmark output goes (default: null)')
+    args = parser.parse_args(argv)
+
+    names = args.benchmark
+    if names == ['all']:
+        names = [b.name for b in benchmarks.BENCHMARKS]
+    meter = get_meter(args.energy)
+    for name in names:
+        bench = benchmarks.get(name)
+        result, phases = run(bench, args.interpreter, args.arg, meter,
+                             get_sink(args.sink))
+        report(bench, result, phases)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,320 @@
+"""Cross-language report: normalized results, rankings and Pareto frontiers.
+
+Aggregating the ``<Language>.csv`` and ``x<Language>.csv`` files of every
+language used to be done by hand.  This tool loads all of them in one pass
+into columnar arrays (one ``array`` per field, with languages and
+benchmarks stored as small integer codes), takes the median energy, time
+and peak memory of every language/benchmark pair, and prints:
+
+* per benchmark, each language's figures relative to a reference language
+  (``--reference``, C by default), ranked by ``--metric``, with the
+  languages on the energy/time/memory Pareto frontier marked;
+* an overall ranking by the geometric mean of the normalized figures over
+  the benchmarks each language shares with the reference.
+
+Peak memory is not in the CSV files; it comes from the ``run`` jobs of the
+watchdog log when there is one.  An ``x<Language>.csv`` file that is a
+prefix of ``<Language>.csv`` (an older copy) is not counted twice.
+
+    python3 -m harness.report --reference C --metric energy --csv report.csv
+"""
+
+import argparse
+import csv
+import json
+import math
+import os
+import sys
+from array import array
+from collections import namedtuple
+
+from harness.benchmarks import ROOT
+from harness.watchdog import LOG
+
+METRICS = ('energy', 'time', 'memory')
+NAN = float('nan')
+
+Aggregate = namedtuple('Aggregate', 'language benchmark runs energy time memory')
+Normalized = namedtuple('Normalized', 'language benchmark energy time memory')
+
+
+def _fields(line):
+    """The fields of a result row; rows are ``;``-separated, a few older files use ``,``."""
+    fields = line.split(';')
+    if len(fields) < 6:
+        fields = line.split(',')
+        if len(fields) < 6:
+            return None
+    return fields
+
+
+def parse_row(line):
+    """``(benchmark, joules, milliseconds)`` of a ``RAPL/main`` row, or None."""
+    fields = _fields(line)
+    if fields is None:
+        return None
+    try:
+        return fields[0].strip(), float(fields[1]), float(fields[-1])
+    except ValueError:
+        return None    # header or truncated row
+
+
+def result_files(root=ROOT):
+    """``{language: [paths]}`` of the run results below ``root``.
+
+    History files (``x*.csv``) whose rows all reappear at the start of
+    another file of the same language are left out.
+    """
+    files = {}
+    for language in sorted(os.listdir(root)):
+        directory = os.path.join(root, language)
+        if language.startswith('.') or not os.path.isdir(directory):
+            continue
+        names = sorted(n for n in os.listdir(directory)
+                       if n.endswith('.csv') and not n.endswith('.compile.csv'))
+        contents = {}
+        for name in names:
+            with open(os.path.join(directory, name), 'rb') as f:
+                contents[name] = f.read()
+        kept = [name for name in names
+                if not (name.startswith('x') and any(
+                    other != name and contents[other].startswith(contents[name])
+                    for other in names))]
+        if kept:
+            files[language] = [os.path.join(directory, name) for name in kept]
+    return files
+
+
+class Columns(object):
+    """Result rows stored column by column.
+
+    ``language`` and ``benchmark`` hold indices into ``languages`` and
+    ``benchmarks``; unknown values are NaN.
+    """
+
+    def __init__(self):
+        self.languages = []
+        self.benchmarks = []
+        self._codes = ({}, {})
+        self.language = array('H')
+        self.benchmark = array('H')
+        self.energy = array('d')
+        self.time = array('d')
+        self.memory = array('d')
+
+    def __len__(self):
+        return len(self.energy)
+
+    def _code(self, table, names, value):
+        code = table.get(value)
+        if code is None:
+            code = table[value] = len(names)
+            names.append(value)
+        return code
+
+    def append(self, language, benchmark, energy=NAN, seconds=NAN, memory=NAN):
+        self.language.append(self._code(self._codes[0], self.languages, language))
+        self.benchmark.append(self._code(self._codes[1], self.benchmarks, benchmark))
+        self.energy.append(energy)
+        self.time.append(seconds)
+        self.memory.append(memory)
+
+    def read_csv(self, language, path):
+        """Append the rows of a result file, parsed straight into the columns."""
+        code = self._code(self._codes[0], self.languages, language)
+        codes, names = self._codes[1], self.benchmarks
+        benchmark, energy, seconds = self.benchmark.append, self.energy.append, self.time.append
+        start = len(self.energy)
+        with open(path) as f:
+            for line in f:
+                fields = _fields(line)
+                if fields is None:
+                    continue
+                try:
+                    joules, milliseconds = float(fields[1]), float(fields[-1])
+                except ValueError:
+                    continue    # header or truncated row
+                name = fields[0].strip()
+                index = codes.get(name)
+                if index is None:
+                    index = codes[name] = len(names)
+                    names.append(name)
+                benchmark(index)
+                energy(joules)
+                seconds(milliseconds / 1000)
+        rows = len(self.energy) - start
+        self.language.extend(array('H', [code]) * rows)
+        self.memory.extend(array('d', [NAN]) * rows)
+
+    def read_log(self, path, rule='run'):
+        """Peak memory of the successful ``rule`` jobs of a watchdog log."""
+        with open(path) as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                entry = json.loads(line)
+                if entry['status'] == 'ok' and entry['rule'] == rule:
+                    self.append(entry['language'], entry['benchmark'],
+                                memory=float(entry['maxrss']))
+
+
+def load(root=ROOT, log=LOG):
+    columns = Columns()
+    for language, paths in result_files(root).items():
+        for path in paths:
+            columns.read_csv(language, path)
+    if log and os.path.exists(log):
+        columns.read_log(log)
+    return columns
+
+
+def _median(values):
+    values = sorted(v for v in values if v == v)
+    if not values:
+        return None
+    middle = len(values) // 2
+    if len(values) % 2:
+        return values[middle]
+    return (values[middle - 1] + values[middle]) / 2.0
+
+
+def aggregate(columns):
+    """One ``Aggregate`` of medians per language/benchmark pair."""
+    width = len(columns.benchmarks) or 1
+    groups = {}
+    for language, benchmark, energy, seconds, memory in zip(
+            columns.language, columns.benchmark, columns.energy, columns.time, columns.memory):
+        key = language * width + benchmark
+        group = groups.get(key)
+        if group is None:
+            group = groups[key] = ([], [], [])
+        group[0].append(energy)
+        group[1].append(seconds)
+        group[2].append(memory)
+    result = []
+    for key in sorted(groups):
+        energies, times, memories = groups[key]
+        result.append(Aggregate(columns.languages[key // width], columns.benchmarks[key % width],
+                                sum(1 for t in times if t == t),
+                                _median(energies), _median(times), _median(memories)))
+    return result
+
+
+def _ratio(value, reference):
+    if value is None or not reference:
+        return None
+    return value / reference
+
+
+def normalize(aggregates, reference='C'):
+    """Figures relative to ``reference`` on the same benchmark."""
+    references = dict((a.benchmark, a) for a in aggregates if a.language == reference)
+    normalized = []
+    for a in aggregates:
+        ref = references.get(a.benchmark)
+        if ref is None:
+            continue
+        normalized.append(Normalized(a.language, a.benchmark, _ratio(a.energy, ref.energy),
+                                     _ratio(a.time, ref.time), _ratio(a.memory, ref.memory)))
+    return normalized
+
+
+def pareto(aggregates):
+    """The aggregates of one benchmark that no other one dominates.
+
+    Only the metrics every aggregate has are compared.
+    """
+    metrics = [m for m in METRICS if all(getattr(a, m) is not None for a in aggregates)]
+    if not metrics:
+        return []
+
+    def dominates(x, y):
+        pairs = [(getattr(x, m), getattr(y, m)) for m in metrics]
+        return all(p <= q for p, q in pairs) and any(p < q for p, q in pairs)
+    return [a for a in aggregates if not any(dominates(b, a) for b in aggregates if b is not a)]
+
+
+def ranking(normalized, metric='energy'):
+    """``(language, geometric mean, benchmarks)`` sorted best first."""
+    logs = {}
+    for n in normalized:
+        value = getattr(n, metric)
+        if value:
+            logs.setdefault(n.language, []).append(math.log(value))
+    means = [(language, math.exp(sum(values) / len(values)), len(values))
+             for language, values in logs.items()]
+    return sorted(means, key=lambda entry: entry[1])
+
+
+def _fmt(value, ratio):
+    if value is None:
+        return '-'
+    if ratio is None:
+        return '%.4g' % value
+    return '%.4g (x%.2f)' % (value, ratio)
+
+
+def report(aggregates, reference='C', metric='energy', out=sys.stdout):
+    normalized = dict(((n.language, n.benchmark), n) for n in normalize(aggregates, reference))
+    by_benchmark = {}
+    for a in aggregates:
+        by_benchmark.setdefault(a.benchmark, []).append(a)
+    for benchmark in sorted(by_benchmark):
+        group = by_benchmark[benchmark]
+        frontier = set(id(a) for a in pareto(group))
+        out.write('== %s (relative to %s)\n' % (benchmark, reference))
+        out.write('  #\tlanguage\tenergy (J)\ttime (s)\tmemory (KB)\truns\n')
+        ordered = sorted(group, key=lambda a: (getattr(a, metric) is None, getattr(a, metric)))
+        for position, a in enumerate(ordered, 1):
+            n = normalized.get((a.language, benchmark))
+            out.write('  %d\t%s%s\t%s\t%s\t%s\t%d\n' % (
+                position, a.language, ' *' if id(a) in frontier else '',
+                _fmt(a.energy, n and n.energy), _fmt(a.time, n and n.time),
+                _fmt(a.memory, n and n.memory), a.runs))
+    out.write('* on the Pareto frontier of its benchmark\n\n')
+    out.write('== overall %s, geometric mean relative to %s\n' % (metric, reference))
+    for position, (language, mean, count) in enumerate(
+            ranking(list(normalized.values()), metric), 1):
+        out.write('  %d\t%s\tx%.2f\t(%d benchmarks)\n' % (position, language, mean, count))
+
+
+def write_csv(path, aggregates, reference='C'):
+    normalized = dict(((n.language, n.benchmark), n) for n in normalize(aggregates, reference))
+    frontiers = {}
+    for a in aggregates:
+        frontiers.setdefault(a.benchmark, []).append(a)
+    on_frontier = set(id(a) for group in frontiers.values() for a in pareto(group))
+    with open(path, 'w', newline='') as f:
+        writer = csv.writer(f, delimiter=';')
+        writer.writerow(['language', 'benchmark', 'runs', 'energy_j', 'time_s', 'memory_kb',
+                         'energy_rel', 'time_rel', 'memory_rel', 'pareto'])
+        for a in aggregates:
+            n = normalized.get((a.language, a.benchmark)) or Normalized(None, None, None,
+                                                                         None, None)
+            writer.writerow([a.language, a.benchmark, a.runs, a.energy, a.time, a.memory,
+                             n.energy, n.time, n.memory, int(id(a) in on_frontier)])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--reference', default='C', help='language to normalize against')
+    parser.add_argument('--metric', choices=METRICS, default='energy', help='ranking metric')
+    parser.add_argument('--language', action='append', help='only this language, repeatable')
+    parser.add_argument('--benchmark', action='append', help='only this benchmark, repeatable')
+    parser.add_argument('--log', default=LOG, help='watchdog log for peak memory')
+    parser.add_argument('--csv', help='also write the aggregated table to this file')
+    args = parser.parse_args(argv)
+
+    aggregates = aggregate(load(log=args.log))
+    if args.language:
+        aggregates = [a for a in aggregates
+                      if a.language in args.language or a.language == args.reference]
+    if args.benchmark:
+        aggregates = [a for a in aggregates if a.benchmark in args.benchmark]
+    report(aggregates, args.reference, args.metric)
+    if args.csv:
+        write_csv(args.csv, aggregates, args.reference)
+
+
+if __name__ == '__main__':
+    main()
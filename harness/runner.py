@@ -0,0 +1,121 @@
+"""Measure one benchmark process: wall time, CPU time, peak memory, energy.
+
+This is the Python counterpart of ``RAPL/main``'s ``system(command)`` loop.
+The child is reaped with ``os.wait4`` so its resource usage (including the
+workers it waited for) is read directly rather than through
+``/usr/bin/time -v``.
+
+The child leads its own process group, so when it times out, or leaves
+stray workers behind, the whole group is killed.
+
+The child's stdout goes to a sink from ``harness.sinks`` (``/dev/null`` by
+default), and the sink's ``Output`` is part of the result.
+"""
+
+import os
+import signal
+import subprocess
+import threading
+import time
+from collections import namedtuple
+
+from harness.energy import get_meter
+from harness.sinks import NullSink
+
+# maxrss is in kilobytes, as reported by getrusage(2) and /usr/bin/time -v.
+# output is the ``harness.sinks.Output`` of the sink stdout went to, or None
+# when the caller passed its own ``stdout``.
+Result = namedtuple('Result', 'returncode seconds user system maxrss energy timed_out output')
+
+
+def exit_code(status):
+    """Popen-style return code of a wait status (negative for signals)."""
+    if os.WIFSIGNALED(status):
+        return -os.WTERMSIG(status)
+    return os.WEXITSTATUS(status)
+
+
+def kill_group(pgid):
+    try:
+        os.killpg(pgid, signal.SIGKILL)
+    except (ProcessLookupError, PermissionError):
+        pass
+
+
+def _chain(hooks):
+    def run_all():
+        for hook in hooks:
+            hook()
+    return run_all
+
+
+def measure(argv, cwd=None, env=None, stdin=None, stdout=None,
+            meter=None, probes=(), stderr=None, timeout=None, preexec_fn=None, sink=None):
+    """Run ``argv`` to completion and return its ``Result``.
+
+    ``stdin`` is a path or None; ``env`` replaces the environment when
+    given.  ``probes`` observe the child, such as a
+    ``harness.phases.PhaseRecorder``, a ``harness.counters.CounterReader`` or
+    a ``harness.cgroup.Sandbox``: each may add to the child's environment
+    with ``environ``, pass it a descriptor ``fd`` and run a ``preexec`` hook
+    in it, and is told when the child started and when it was reaped.
+
+    After ``timeout`` seconds the child's process group is killed and the
+    result is marked ``timed_out``.  ``preexec_fn`` runs in the child before
+    the exec, e.g. to set resource limits.
+
+    ``sink`` is an unopened ``harness.sinks`` sink for stdout; it is opened
+    for this run and closed once the child has been reaped.  ``stdout``
+    passes a file or descriptor instead.
+    """
+    own_meter = meter is None
+    meter = meter or get_meter()
+    if stdout is None and sink is None:
+        sink = NullSink()
+    for probe in probes:
+        env = probe.environ(env)
+    pass_fds = [probe.fd for probe in probes if getattr(probe, 'fd', None) is not None]
+    hooks = [hook for hook in [preexec_fn] + [getattr(probe, 'preexec', None) for probe in probes]
+             if hook is not None]
+    stdin_file = open(stdin, 'rb') if stdin else subprocess.DEVNULL
+    if sink is not None:
+        stdout = sink.open().fileno()
+    try:
+        before = meter.read()
+        t0 = time.perf_counter()
+        proc = subprocess.Popen(argv, cwd=cwd, env=env, stdin=stdin_file, stdout=stdout,
+                                stderr=stderr, pass_fds=pass_fds, start_new_session=True,
+                                preexec_fn=_chain(hooks) if hooks else None)
+        for probe in probes:
+            probe.start(t0, before)
+        expired = threading.Event()
+        timer = None
+        if timeout is not None:
+            def expire():
+                expired.set()
+                kill_group(proc.pid)
+            timer = threading.Timer(timeout, expire)
+            timer.start()
+        try:
+            _, status, usage = os.wait4(proc.pid, 0)
+        finally:
+            if timer is not None:
+                timer.cancel()
+            # workers orphaned by the child, or everything on an interrupt
+            kill_group(proc.pid)
+        t1 = time.perf_counter()
+        after = meter.read()
+        for probe in probes:
+            probe.stop(t1, after)
+    finally:
+        if stdin:
+            stdin_file.close()
+        if sink is not None:
+            sink.close()
+    proc.returncode = exit_code(status)
+    energy = meter.delta(before, after)
+    if own_meter:
+        meter.close()
+    return Result(proc.returncode, t1 - t0, usage.ru_utime, usage.ru_stime,
+                  usage.ru_maxrss, energy, expired.is_set(),
+                  sink.output() if sink is not None else None)
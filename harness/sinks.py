@@ -0,0 +1,268 @@
+"""Destinations for benchmark output.
+
+Several benchmarks write hundreds of megabytes to stdout (``fasta
+25000000`` and ``revcomp`` about 250 MB each, ``mandelbrot 16000`` 32 MB),
+so where that output goes is part of what gets measured.  ``RAPL/main``
+leaves it to whatever the harness inherited, a terminal or a pipe of
+unknown speed.  A sink owns the file descriptor that stands in for the
+benchmark's stdout, and its ``Output`` is recorded with every result:
+
+* ``null``: ``/dev/null``, nothing is read back;
+* ``count``: a pipe whose reader thread counts the bytes;
+* ``hash``: a pipe whose reader thread also computes their SHA-256;
+* ``tmpfs``: a file in ``/dev/shm`` (the temporary directory when that is
+  missing), whose size is recorded before it is removed.
+
+Redirection happens at the file descriptor level, which also captures
+output written by forked workers and by code that bound
+``sys.stdout.buffer.write`` at import time.
+"""
+
+import fcntl
+import hashlib
+import os
+import select
+import sys
+import tempfile
+import threading
+from collections import namedtuple
+from contextlib import contextmanager
+
+# ``bytes`` and ``sha256`` are None when the sink does not look at the data.
+Output = namedtuple('Output', 'sink bytes sha256')
+
+TMPFS = '/dev/shm'
+
+
+class NullSink(object):
+    """``/dev/null``: the cheapest destination, and the measure default."""
+
+    name = 'null'
+
+    def __init__(self):
+        self._fd = None
+
+    def open(self):
+        self._fd = os.open(os.devnull, os.O_WRONLY)
+        return self
+
+    def fileno(self):
+        return self._fd
+
+    def sync(self):
+        return None
+
+    def close(self):
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
+
+    def output(self):
+        return Output(self.name, None, None)
+
+    def __enter__(self):
+        return self.open()
+
+    def __exit__(self, *exc):
+        self.close()
+        return False
+
+
+class CountingSink(object):
+    """Pipe whose reader thread counts and discards everything written."""
+
+    name = 'count'
+
+    def __init__(self, chunk=1 << 16):
+        self.chunk = chunk
+        self.bytes = 0
+        self._lock = threading.Lock()
+        self._rfd = self._wfd = None
+        self._stop = False
+        self._thread = None
+
+    def open(self):
+        self.bytes = 0
+        self._rfd, self._wfd = os.pipe()
+        flags = fcntl.fcntl(self._rfd, fcntl.F_GETFL)
+        fcntl.fcntl(self._rfd, fcntl.F_SETFL, flags | os.O_NONBLOCK)
+        self._stop = False
+        self._thread = threading.Thread(target=self._reader, daemon=True)
+        self._thread.start()
+        return self
+
+    def fileno(self):
+        return self._wfd
+
+    def consume(self, data):
+        self.bytes += len(data)
+
+    def _drain(self):
+        while True:
+            try:
+                data = os.read(self._rfd, self.chunk)
+            except BlockingIOError:
+                return
+            if not data:
+                return
+            self.consume(data)
+
+    def _reader(self):
+        while not self._stop:
+            readable, _, _ = select.select([self._rfd], [], [], 0.05)
+            if readable:
+                with self._lock:
+                    self._drain()
+
+    def sync(self):
+        """Account for everything written so far and return the byte count.
+
+        Callers must have flushed their own buffers and waited for any
+        writers before calling this.
+        """
+        with self._lock:
+            self._drain()
+            return self.bytes
+
+    def close(self):
+        if self._thread is None:
+            return
+        os.close(self._wfd)
+        self._stop = True
+        self._thread.join()
+        self._drain()
+        os.close(self._rfd)
+        self._thread = None
+
+    def output(self):
+        return Output(self.name, self.bytes, None)
+
+    def __enter__(self):
+        return self.open()
+
+    def __exit__(self, *exc):
+        self.close()
+        return False
+
+
+class HashingSink(CountingSink):
+    """Counting pipe that also hashes the output, so runs can be compared."""
+
+    name = 'hash'
+
+    def open(self):
+        self._hash = hashlib.sha256()
+        self._part = hashlib.sha256()
+        return super(HashingSink, self).open()
+
+    def consume(self, data):
+        self.bytes += len(data)
+        self._hash.update(data)
+        self._part.update(data)
+
+    def checkpoint(self):
+        """SHA-256 of the output since the previous checkpoint, or the open.
+
+        The same caveats as for ``sync`` apply.
+        """
+        with self._lock:
+            self._drain()
+            digest = self._part.hexdigest()
+            self._part = hashlib.sha256()
+        return digest
+
+    def output(self):
+        return Output(self.name, self.bytes, self._hash.hexdigest())
+
+
+class FileSink(object):
+    """A file in ``directory`` (tmpfs by default), removed on close unless kept."""
+
+    name = 'tmpfs'
+
+    def __init__(self, directory=None, keep=False):
+        if directory is None:
+            directory = TMPFS if os.access(TMPFS, os.W_OK) else tempfile.gettempdir()
+        self.directory = directory
+        self.keep = keep
+        self.path = None
+        self.bytes = 0
+        self._fd = None
+
+    def open(self):
+        self._fd, self.path = tempfile.mkstemp(prefix='bench-output-', dir=self.directory)
+        self.bytes = 0
+        return self
+
+    def fileno(self):
+        return self._fd
+
+    def sync(self):
+        self.bytes = os.fstat(self._fd).st_size
+        return self.bytes
+
+    def close(self):
+        if self._fd is None:
+            return
+        self.sync()
+        os.close(self._fd)
+        self._fd = None
+        if not self.keep:
+            os.unlink(self.path)
+
+    def output(self):
+        return Output(self.name, self.bytes, None)
+
+    def __enter__(self):
+        return self.open()
+
+    def __exit__(self, *exc):
+        self.close()
+        return False
+
+
+SINKS = {
+    'null': NullSink,
+    'count': CountingSink,
+    'hash': HashingSink,
+    'tmpfs': FileSink,
+}
+
+
+def get_sink(name='null'):
+    """A new, unopened sink called ``name``."""
+    if name not in SINKS:
+        raise ValueError('unknown output sink %r (choose from %s)'
+                         % (name, ', '.join(sorted(SINKS))))
+    return SINKS[name]()
+
+
+def _writes_fd1(stream):
+    try:
+        return stream.fileno() == 1
+    except (AttributeError, OSError, ValueError):
+        return False
+
+
+@contextmanager
+def redirect_stdout(sink):
+    """Point file descriptor 1 at ``sink`` for the duration of the block.
+
+    If ``sys.stdout`` is not backed by descriptor 1 (as under pytest's
+    capturing) it is temporarily replaced by a stream that is.
+    """
+    stream = sys.stdout
+    stream.flush()
+    saved = os.dup(1)
+    os.dup2(sink.fileno(), 1)
+    if not _writes_fd1(stream):
+        sys.stdout = open(1, 'w', closefd=False)
+    try:
+        yield sink
+    finally:
+        sys.stdout.flush()
+        if sys.stdout is not stream:
+            sys.stdout.close()
+            sys.stdout = stream
+        os.dup2(saved, 1)
+        os.close(saved)
@@ -0,0 +1,36 @@
+import io
+import sys
+
+from harness import allocations, benchmarks
+
+
+def test_phases_of_binary_trees(tmpdir):
+    bench = benchmarks.get('binary-trees')
+    result, phases = allocations.run(bench, sys.executable, 8, executor='fork', limit=3,
+                                     keep=str(tmpdir))
+    assert result.returncode == 0
+    main = [p for p in phases if p.role == 'main']
+    assert [p.label for p in main][:2] == ['startup', 'pool startup']
+    assert 'trees' in [p.label for p in main]
+    assert any(p.role == 'worker' for p in phases)
+    assert all(len(p.sites) <= 3 for p in phases)
+    assert all(p.peak >= p.current > 0 for p in phases)
+    out = io.StringIO()
+    allocations.report(bench, result, phases, out)
+    assert out.getvalue().count('binary-trees\t') == len(phases)
+    assert ' KB\t' in out.getvalue() and ' blocks\t' in out.getvalue()
+
+
+def test_top_sites_are_growth_since_the_previous_snapshot():
+    import tracemalloc
+    tracemalloc.start()
+    try:
+        before = tracemalloc.take_snapshot()
+        kept = [bytearray(100) for _ in range(1000)]
+        after = tracemalloc.take_snapshot()
+    finally:
+        tracemalloc.stop()
+    top = allocations.top_sites(after, before, limit=1)
+    assert len(top) == 1 and top[0].count >= 1000 and top[0].size >= 100 * 1000
+    assert top[0].where[0].filename == __file__
+    del kept
@@ -0,0 +1,58 @@
+import io
+import os
+
+import pytest
+
+from harness import budgets
+
+enforced = pytest.mark.skipif(not os.environ.get(budgets.ENV_VAR),
+                              reason='set %s=1 to enforce the budgets' % budgets.ENV_VAR)
+
+
+@pytest.fixture(scope='module')
+def unit():
+    return budgets.calibrate()
+
+
+@pytest.mark.perf
+@enforced
+@pytest.mark.parametrize('budget', budgets.BUDGETS, ids=lambda b: b.name)
+def test_budget(budget, unit):
+    if budget.benchmark == 'pidigits':
+        pytest.importorskip('gmpy2')
+    usage = budgets.run(budget, unit)
+    over = budgets.exceeded(budget, usage)
+    assert not over, '%s over budget: %s' % (budget.name, ', '.join(
+        '%s %.1f > %s' % limit for limit in over))
+
+
+def test_measure_counts_time_memory_and_gc_objects(unit):
+    def build():
+        return [[i] for i in range(20000)]
+    usage = budgets.measure(build, unit, repeat=2)
+    assert usage.seconds > 0 and usage.units == usage.seconds / unit
+    assert usage.memory > 20000 * 56 // 1024     # at least the inner lists
+    assert 15000 < usage.gc_objects < 25000     # less what the last collection freed
+
+
+def test_gc_objects_leave_out_what_is_freed_before_a_collection(unit):
+    def churn():
+        for i in range(20000):
+            [i]
+    assert budgets.measure(churn, unit, repeat=1).gc_objects < 1000
+
+
+def test_exceeded_and_report():
+    budget = budgets.Budget('toy', 'n-body', None, 2.0, 100, 10)
+    assert budgets.exceeded(budget, budgets.Usage(0.01, 1.5, 50, 10)) == []
+    usage = budgets.Usage(0.03, 3.0, 50, 11)
+    assert budgets.exceeded(budget, usage) == [('units', 3.0, 2.0), ('gc_objects', 11, 10)]
+    out = io.StringIO()
+    budgets.report(budget, usage, out)
+    assert 'OVER: units, gc_objects' in out.getvalue()
+    assert budgets.suggest(budgets.Usage(0.01, 1.0, 100, 100)) == (2.5, 214, 225)
+
+
+def test_kernel_budget_runs_in_process(unit):
+    usage = budgets.run(budgets.get('advance'), unit, repeat=1)
+    assert usage.units > 0 and usage.gc_objects >= 0
@@ -0,0 +1,48 @@
+import sys
+
+from harness import cgroup
+from harness.energy import NullMeter
+from harness.runner import measure
+
+
+def fake_hierarchy(root):
+    (root / 'cgroup.controllers').write_text('cpuset cpu io memory pids\n')
+    (root / 'cgroup.subtree_control').write_text('')
+    return root / 'energy-harness'
+
+
+def test_sandbox_moves_child_and_reads_usage(tmp_path):
+    base = fake_hierarchy(tmp_path)
+    with cgroup.Sandbox('job', 'measure', base=str(base), cpu_quota=1.5) as box:
+        leaf = tmp_path / 'energy-harness' / 'measure' / box.path.rsplit('/', 1)[1]
+        assert (leaf / 'cpu.max').read_text() == '150000 100000'
+        (leaf / 'cpu.stat').write_text('usage_usec 3000\nuser_usec 2000\nsystem_usec 1000\n'
+                                       'nr_throttled 0\nthrottled_usec 0\n')
+        (leaf / 'memory.peak').write_text('10485760\n')
+        (leaf / 'memory.stat').write_text('anon 4096\nfile 8192\n')
+        (leaf / 'io.stat').write_text('8:0 rbytes=100 wbytes=10 rios=1 wios=1\n'
+                                      '8:16 rbytes=1 wbytes=0 rios=1 wios=0\n')
+        result = measure([sys.executable, '-c', 'pass'], meter=NullMeter(), probes=[box])
+
+    assert result.returncode == 0
+    # a real cgroupfs moves the writer of '0'; the fake just records it
+    assert (leaf / 'cgroup.procs').read_text() == '0'
+    assert (tmp_path / 'cgroup.subtree_control').read_text() == '+cpu +cpuset +memory +io'
+    usage = box.usage
+    assert (usage.cpu_usec, usage.user_usec, usage.system_usec) == (3000, 2000, 1000)
+    assert usage.memory_peak == 10485760
+    assert usage.memory_stat == {'anon': 4096, 'file': 8192}
+    assert usage.io == {'rbytes': 101, 'wbytes': 10, 'rios': 2, 'wios': 1}
+
+    accounted = cgroup.account(result, usage)
+    assert (accounted.user, accounted.system, accounted.maxrss) == (0.002, 0.001, 10240)
+
+
+def test_compile_and_measure_groups_are_separate(tmp_path):
+    base = str(fake_hierarchy(tmp_path))
+    assert cgroup.available(base)
+    assert cgroup.group_for('compile') == 'compile'
+    assert cgroup.group_for('measure') == cgroup.group_for('run') == 'measure'
+    assert cgroup.ensure_group('compile', base, cpus='0-1').endswith('compile')
+    assert (tmp_path / 'energy-harness' / 'compile' / 'cpuset.cpus').read_text() == '0-1'
+    assert not cgroup.available(str(tmp_path / 'missing' / 'energy-harness'))
@@ -0,0 +1,84 @@
+import json
+import subprocess
+
+import pytest
+
+from harness import compare
+
+
+def rows(benchmark, joules, milliseconds):
+    return ['%s ; %f ; 0 ; 0 ; 0 ; %G ' % (benchmark, j, ms)
+            for j, ms in zip(joules, milliseconds)]
+
+
+def test_mann_whitney_and_effect_size():
+    a = [10.0, 10.2, 9.9, 10.1, 10.0, 9.8, 10.3, 10.1]
+    b = [11.0, 11.2, 10.9, 11.1, 11.3, 10.8, 11.0, 11.4]
+    u, p = compare.mann_whitney(a, b)
+    assert u == len(a) * len(b)
+    assert p < 0.001
+    assert compare.cliffs_delta(a, b) == 1.0
+    assert compare.magnitude(0.1) == 'negligible' and compare.magnitude(-0.5) == 'large'
+    assert compare.mann_whitney([1.0] * 4, [1.0] * 4)[1] == 1.0
+    low, high = compare.bootstrap(a, b, resamples=500)
+    assert 0.5 < low <= high < 1.5
+
+
+def test_holm_keeps_order_and_is_monotone():
+    assert compare.holm([0.01, 0.04, 0.03]) == pytest.approx([0.03, 0.06, 0.06])
+
+
+def test_compare_flags_regressions_and_improvements():
+    base = {('C', 'n-body'): {'energy': [70, 71, 72, 70.5, 71.5], 'time': [4.0, 4.1, 4.0, 4.05, 4.1]},
+            ('C', 'fasta'): {'energy': [5, 5.1, 5.2, 5.05, 5.1], 'time': [1.0, 1.0, 1.01, 1.0, 1.02]},
+            ('Go', 'fasta'): {'energy': [5, 6], 'time': [1, 1]}}
+    candidate = {('C', 'n-body'): {'energy': [80, 81, 82, 80.5, 81.5], 'time': [4.0, 4.1, 4.02, 4.05, 4.1]},
+                 ('C', 'fasta'): {'energy': [4, 4.1, 4.2, 4.05, 4.1], 'time': [1.0, 1.01, 1.0, 1.02, 1.0]},
+                 ('Go', 'fasta'): {'energy': [5, 6], 'time': [1, 1]}}
+    verdicts = dict(((r.benchmark, r.language, r.metric), r.verdict)
+                    for r in compare.compare(base, candidate, resamples=500, correction=False))
+    assert verdicts[('n-body', 'C', 'energy')] == 'regression'
+    assert verdicts[('fasta', 'C', 'energy')] == 'improvement'
+    assert verdicts[('n-body', 'C', 'time')] == 'unchanged'
+    assert verdicts[('fasta', 'Go', 'energy')] == 'insufficient'
+
+
+def test_git_revisions_compare_only_appended_rows(tmp_path):
+    def git(*args):
+        subprocess.run(('git',) + args, cwd=str(tmp_path), check=True, stdout=subprocess.DEVNULL)
+    git('init', '-q')
+    git('config', 'user.email', 't@example.com')
+    git('config', 'user.name', 't')
+    (tmp_path / 'C').mkdir()
+    csv = tmp_path / 'C' / 'C.csv'
+    base_rows = rows('n-body', [70, 71, 72, 70.5, 71.5], [4000, 4100, 4000, 4050, 4100])
+    csv.write_text('\n'.join(base_rows) + '\n')
+    git('add', '.')
+    git('commit', '-qm', 'base')
+    git('tag', 'base')
+    new_rows = rows('n-body', [80, 81, 82, 80.5, 81.5], [4000, 4100, 4020, 4050, 4100])
+    csv.write_text('\n'.join(base_rows + new_rows) + '\n')
+
+    base, candidate = compare.load('base', str(tmp_path), root=str(tmp_path))
+    assert candidate[('C', 'n-body')]['energy'] == [80, 81, 82, 80.5, 81.5]
+    git('commit', '-qam', 'candidate')
+    base, candidate = compare.load('base', 'HEAD', root=str(tmp_path))
+    assert len(base[('C', 'n-body')]['time']) == 5
+    assert candidate[('C', 'n-body')]['time'][0] == 4.0
+
+
+def test_watchdog_log_runs(tmp_path):
+    log = tmp_path / 'watchdog.jsonl'
+    entries = []
+    for run, seconds in (('r1', [1.0, 1.1, 1.0, 1.05, 1.1]), ('r2', [2.0, 2.1, 2.0, 2.05, 2.1])):
+        for s in seconds:
+            entries.append({'run': run, 'language': 'C', 'benchmark': 'fasta', 'rule': 'run',
+                            'status': 'ok', 'seconds': s, 'maxrss': 1000,
+                            'energy': {'package': 10 * s}})
+    entries.append(dict(entries[0], status='timeout'))
+    log.write_text(''.join(json.dumps(e) + '\n' for e in entries))
+    base, candidate = compare.load('%s#r1' % log, '%s#r2' % log)
+    assert base[('C', 'fasta')]['time'] == [1.0, 1.1, 1.0, 1.05, 1.1]
+    assert candidate[('C', 'fasta')]['memory'] == [1000] * 5
+    assert compare.main(['%s#r1' % log, '%s#r2' % log, '--no-correction']) == 1
+    assert compare.main(['%s#r2' % log, '%s#r1' % log, '--no-correction']) == 0
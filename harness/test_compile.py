@@ -0,0 +1,40 @@
+import sys
+
+from harness import compile as build
+from harness.energy import NullMeter
+
+
+def make_benchmark(root, language, benchmark, rules):
+    directory = root / language / benchmark
+    directory.mkdir(parents=True)
+    (directory / 'Makefile').write_text(rules)
+    return directory
+
+
+def test_find_and_record_compile_results(tmp_path):
+    make_benchmark(tmp_path, 'C', 'fasta',
+                   'compile:\n\t%s -c "open(\'fasta_run\', \'w\').close()"\n\nrun:\n\t./fasta_run\n'
+                   % sys.executable)
+    make_benchmark(tmp_path, 'C', 'broken', 'compile:\n\tfalse\n')
+    make_benchmark(tmp_path, 'Lua', 'fasta', 'run:\n\tlua fasta.lua\n')
+    make_benchmark(tmp_path, 'Python', 'fasta',
+                   'compile:\n\ttest -f fasta.py || cp fasta.python3 fasta.py\n')
+
+    targets = build.find(root=str(tmp_path))
+    assert [(t.language, t.benchmark) for t in targets] == [
+        ('C', 'broken'), ('C', 'fasta'), ('Python', 'fasta')]
+    assert [t.benchmark for t in build.find(['Python'], root=str(tmp_path))] == ['fasta']
+
+    broken, fasta, _ = targets
+    assert build.recipe(fasta).endswith('''-c "open('fasta_run', 'w').close()"''')
+    results = build.run(fasta, repetitions=2, meter=NullMeter())
+    assert [r.returncode for r in results] == [0, 0]
+    assert (tmp_path / 'C' / 'fasta' / 'fasta_run').exists()
+    assert build.run(broken, meter=NullMeter())[0].returncode != 0
+
+    build.record(fasta, results, build.recipe(fasta), root=str(tmp_path))
+    rows = (tmp_path / 'C' / 'C.compile.csv').read_text().splitlines()
+    assert len(rows) == 2
+    fields = rows[0].split(' ; ')
+    assert fields[0] == 'fasta' and len(fields) == 8
+    assert float(fields[5]) > 0 and int(fields[6]) > 0
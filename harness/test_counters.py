@@ -0,0 +1,50 @@
+import sys
+
+from harness import benchmarks, warm
+from harness.counters import rates, run
+from harness.energy import NullMeter
+
+
+def tree_nodes(depth):
+    return 2 ** (depth + 1) - 1
+
+
+def test_binary_trees_counts_every_node():
+    result, bench_rates = run(benchmarks.get('binary-trees'), sys.executable, 6, NullMeter())
+    assert result.returncode == 0
+    # stretch tree, the 4- and 6-deep iterations and the long-lived tree
+    expected = (tree_nodes(7) + 2 ** 6 * tree_nodes(4) + 2 ** 4 * tree_nodes(6)
+                + tree_nodes(6))
+    counts = dict((r.unit, r.count) for r in bench_rates)
+    # one range per worker and depth
+    assert counts.pop('tasks dispatched') >= 2
+    assert counts == {'nodes allocated': expected, 'nodes checked': expected}
+    assert all(r.per_second > 0 and r.per_joule is None for r in bench_rates)
+
+
+def test_mandelbrot_iterations_match_a_direct_count():
+    n = 12
+    iterations = 0
+    for y in range(n):
+        for x in range((n + 7) // 8 * 8):
+            c = complex(2.0 * x / n - 1.5, 2.0 * y / n - 1.0)
+            z = c
+            for block in range(7):
+                for _ in range(7):
+                    z = z * z + c
+                    iterations += 1
+                if abs(z) >= 2.0:
+                    break
+    samples = warm.run(benchmarks.get('mandelbrot'), iterations=2, arg=n, meter=NullMeter(),
+                       count=True)
+    assert samples[0].units == samples[1].units == {'pixels': n * n, 'iterations': iterations}
+
+
+def test_mandelbrot_counts_iterations_only_when_enabled():
+    samples = warm.run(benchmarks.get('mandelbrot'), iterations=1, arg=12, meter=NullMeter())
+    assert samples[0].units == {'pixels': 144}
+
+
+def test_rates_without_energy():
+    assert rates({'digits': 100}, 2.0) == [('digits', 100, 50.0, None)]
+    assert rates({'digits': 100}, 2.0, 4.0)[0].per_joule == 25.0
@@ -0,0 +1,80 @@
+import sys
+
+from harness import dvfs
+from harness.watchdog import Target
+
+
+def fake_cpufreq(root, cpus=2, governors='performance powersave',
+                 freqs=(800000, 1600000, 2400000, 3200000)):
+    for i in range(cpus):
+        policy = root / ('cpu%d' % i) / 'cpufreq'
+        policy.mkdir(parents=True)
+        files = {
+            'scaling_available_frequencies': ' '.join(map(str, freqs)),
+            'scaling_available_governors': governors,
+            'scaling_governor': 'powersave',
+            'scaling_min_freq': freqs[0],
+            'scaling_max_freq': freqs[-1],
+            'cpuinfo_min_freq': freqs[0],
+            'cpuinfo_max_freq': freqs[-1],
+        }
+        for name, value in files.items():
+            (policy / name).write_text('%s\n' % value)
+    (root / 'cpufreq').mkdir()        # not a CPU
+    return dvfs.FrequencyControl(str(root))
+
+
+class FreqMeter(object):
+    """Energy that is lowest at 1.6 GHz, read from the fake policy files."""
+
+    def __init__(self, policy):
+        self.policy = policy
+
+    def read(self):
+        return (int((self.policy / 'scaling_max_freq').read_text()),)
+
+    def delta(self, before, after):
+        ghz = after[0] / 1e6
+        return {'package': 10.0 + (ghz - 1.6) ** 2}
+
+
+def test_steps_and_pinning(tmp_path):
+    control = fake_cpufreq(tmp_path)
+    assert len(control.cpus) == 2
+    assert control.frequencies() == [800000, 1600000, 2400000, 3200000]
+    assert control.steps(2) == [800000, 3200000]
+    assert control.steps(10) == control.frequencies()
+
+    control.save()
+    control.pin(1600000)
+    policy = tmp_path / 'cpu1' / 'cpufreq'
+    assert (policy / 'scaling_min_freq').read_text() == '1600000'
+    assert (policy / 'scaling_max_freq').read_text() == '1600000'
+    control.restore()
+    assert (policy / 'scaling_min_freq').read_text() == '800000'
+    assert (policy / 'scaling_max_freq').read_text() == '3200000'
+    assert (policy / 'scaling_governor').read_text() == 'powersave'
+
+
+def test_userspace_governor_is_preferred(tmp_path):
+    control = fake_cpufreq(tmp_path, governors='userspace performance')
+    control.pin(2400000)
+    policy = tmp_path / 'cpu0' / 'cpufreq'
+    assert (policy / 'scaling_governor').read_text() == 'userspace'
+    assert (policy / 'scaling_setspeed').read_text() == '2400000'
+
+
+def test_sweep_finds_energy_and_edp_optimum(tmp_path):
+    control = fake_cpufreq(tmp_path / 'sys')
+    bench = tmp_path / 'C' / 'n-body'
+    bench.mkdir(parents=True)
+    (bench / 'Makefile').write_text('run:\n\t%s -c pass\n' % sys.executable)
+
+    meter = FreqMeter(tmp_path / 'sys' / 'cpu0' / 'cpufreq')
+    steps = dvfs.sweep(Target('C', 'n-body', str(bench)), control, control.frequencies(),
+                       repetitions=1, meter=meter)
+    assert [s.khz for s in steps] == control.frequencies()
+    assert dvfs.best(steps, 'energy').khz == 1600000
+    assert dvfs.best(steps, 'edp') is not None
+    assert dvfs.best([dvfs.Step(800000, 1.0, None)]) is None
+    assert (tmp_path / 'sys' / 'cpu0' / 'cpufreq' / 'scaling_max_freq').read_text() == '3200000'
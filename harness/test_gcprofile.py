@@ -0,0 +1,40 @@
+import io
+import sys
+
+from harness import benchmarks, gcprofile
+from harness.energy import NullMeter
+
+
+def test_profiles_binary_trees_under_each_policy():
+    bench = benchmarks.get('binary-trees')
+    profiles = gcprofile.profile(bench, ('default', 'no-gc-build'), 1, sys.executable, 10,
+                                 NullMeter())
+    default, no_gc = profiles
+    assert [p.policy for p in profiles] == ['default', 'no-gc-build']
+    assert default.failures == 0 and default.seconds > 0
+    assert sum(no_gc.collections) < sum(default.collections)
+    assert default.examined > no_gc.examined > 0
+    out = io.StringIO()
+    gcprofile.report(bench, profiles, out)
+    assert out.getvalue().count('binary-trees\t') == 2
+    assert 'x1.00' in out.getvalue()
+
+
+def test_summary_without_runs():
+    profile = gcprofile.summarize('freeze', [], failures=2)
+    assert profile.seconds is None and profile.failures == 2
+    out = io.StringIO()
+    gcprofile.report(benchmarks.get('binary-trees'), [profile], out)
+    assert 'failed (2 runs)' in out.getvalue()
+
+
+def test_policy_the_interpreter_lacks_is_reported_not_run(monkeypatch):
+    monkeypatch.setitem(gcprofile.REQUIRES, 'freeze', ('import sys; sys.exit(1)', 'no gc.freeze'))
+    bench = benchmarks.get('binary-trees')
+    profiles = gcprofile.profile(bench, ('default', 'freeze'), 1, sys.executable, 8, NullMeter())
+    assert [p.policy for p in profiles] == ['default', 'freeze']
+    assert profiles[0].unavailable is None and profiles[0].seconds > 0
+    assert profiles[1].unavailable == 'no gc.freeze' and profiles[1].failures == 0
+    out = io.StringIO()
+    gcprofile.report(bench, profiles, out)
+    assert 'binary-trees\tfreeze\tunavailable: no gc.freeze\n' in out.getvalue()
@@ -0,0 +1,66 @@
+import io
+import subprocess
+import sys
+
+import pytest
+
+from harness import benchmarks, matrix
+from harness.energy import NullMeter
+from harness.runner import measure
+
+
+def test_measure_reports_exit_status_and_usage():
+    result = measure([sys.executable, '-c', 'import sys; sys.exit(3)'], meter=NullMeter())
+    assert result.returncode == 3
+    assert result.seconds > 0
+    assert result.maxrss > 0
+    assert result.energy == {}
+
+
+def test_expand_skips_missing_interpreters_and_preloads(tmp_path):
+    spec = {
+        'interpreters': [sys.executable, '/nonexistent/python3.6'],
+        'flags': [['-OO'], []],
+        'env': {'default': {}, 'ghost': {'LD_PRELOAD': str(tmp_path / 'libghost.so')}},
+        'gc': {'default': None, 'relaxed': [10000, 50, 50]},
+    }
+    notes = io.StringIO()
+    configs = matrix.expand(spec, out=notes)
+    assert len(configs) == 4
+    assert set(c.interpreter for c in configs) == {sys.executable}
+    assert all('LD_PRELOAD' not in c.env for c in configs)
+    assert {c.gc_threshold for c in configs} == {None, (10000, 50, 50)}
+    assert notes.getvalue().count('skipping') == 2
+
+
+def test_gc_bootstrap_sets_thresholds_and_runs_script(tmp_path):
+    script = tmp_path / 'show.py'
+    script.write_text('import gc, sys\nprint(gc.get_threshold(), sys.argv[1:], __name__)\n')
+    bench = benchmarks.Benchmark('show', str(script), 'main', 'int', '7', None, True)
+    config = matrix.Config('x', sys.executable, (), {}, (1234, 5, 6))
+    out = subprocess.check_output(matrix.command(bench, config))
+    assert out.decode().strip() == "(1234, 5, 6) ['7'] __main__"
+
+
+def test_rank_prefers_energy_then_time():
+    def row(name, seconds, joules):
+        return matrix.Row('b', matrix.Config(name, '', (), {}, None), seconds, joules, 1, 0, None)
+    rows = [row('a', 1.0, 5.0), row('b', 2.0, 3.0), row('c', 0.5, None), row('d', None, None)]
+    assert [r.config.name for r in matrix.rank(rows)] == ['b', 'a', 'c', 'd']
+
+
+def test_run_config_on_small_nbody():
+    bench = benchmarks.get('n-body')
+    config = matrix.Config('malloc', sys.executable, ('-OO',), {'PYTHONMALLOC': 'malloc'}, None)
+    row = matrix.run_config(bench, config, repetitions=2, arg=1000, meter=NullMeter())
+    assert row.failures == 0
+    assert row.seconds > 0 and row.joules is None
+
+
+def test_run_config_needs_a_repetition():
+    bench = benchmarks.get('n-body')
+    config = matrix.Config('default', sys.executable, (), {}, None)
+    with pytest.raises(ValueError):
+        matrix.run_config(bench, config, repetitions=0, meter=NullMeter())
+    with pytest.raises(SystemExit):
+        matrix.main(['n-body', '-r', '0'])
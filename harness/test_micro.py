@@ -0,0 +1,35 @@
+import io
+
+from harness import micro
+
+
+def test_every_kernel_runs():
+    for kernel in micro.KERNELS:
+        summary = micro.run(kernel, repeat=2, min_time=0.0)
+        assert summary.number == 1
+        assert summary.median > 0
+
+
+def test_calibration_and_summary():
+    calls = []
+    number = micro.calibrate(lambda: calls.append(1), min_time=0.001)
+    assert number >= 2 and number & (number - 1) == 0
+    summary = micro.summarize(micro.get('check_tree'), 4, [4.0, 1.0, 3.0, 2.0])
+    assert summary.median == 2.5 and summary.minimum == 1.0
+    assert summary.iqr == 2.0
+
+
+def test_results_are_logged_and_compared(tmp_path):
+    log = tmp_path / 'micro.jsonl'
+    kernel = micro.get('reverse_complement')
+    micro.main(['reverse_complement', '-r', '5', '--min-time', '0.001', '--log', str(log)])
+    entries = micro.read_log(str(log))
+    assert len(entries) == 1 and len(entries[0]['seconds']) == 5
+    earlier = micro.previous(entries, kernel.name)
+    assert earlier is entries[0]
+
+    slower = micro.summarize(kernel, 1, [s * 3 for s in earlier['seconds']])
+    out = io.StringIO()
+    micro.report(slower, earlier, out=out)
+    assert '+200.0%' in out.getvalue() and 'slower' in out.getvalue()
+    assert micro.previous(entries, kernel.name, interpreter='PyPy-7') is None
@@ -0,0 +1,171 @@
+import os
+import random
+
+import pytest
+
+from harness import energy, model
+
+
+class FakeSampler(object):
+    """Readings are feature dicts; ``features`` subtracts them."""
+
+    def __init__(self, names):
+        self._names = names
+        self.now = dict.fromkeys(names, 0.0)
+
+    def names(self):
+        return self._names
+
+    def read(self):
+        return dict(self.now)
+
+    def features(self, before, after):
+        return dict((k, after[k] - before[k]) for k in self._names)
+
+
+def synthetic_samples(n=40, noise=0.5):
+    rng = random.Random(1)
+    samples = []
+    for _ in range(n):
+        values = {'seconds': rng.uniform(1, 10), 'cpu_seconds': rng.uniform(0, 40),
+                  'instructions': rng.uniform(0, 4e11)}
+        joules = (5.0 * values['seconds'] + 12.0 * values['cpu_seconds']
+                  + 2e-10 * values['instructions'] + rng.gauss(0, noise))
+        samples.append((values, joules))
+    return samples
+
+
+def test_fit_recovers_coefficients_and_bounds_error():
+    fitted = model.Model.fit(synthetic_samples(), ['seconds', 'cpu_seconds', 'instructions'])
+    assert fitted.coefficients == pytest.approx([5.0, 12.0, 2e-10], rel=0.02)
+    joules, error = fitted.predict({'seconds': 4.0, 'cpu_seconds': 16.0, 'instructions': 1e11})
+    assert joules == pytest.approx(20 + 192 + 20, rel=0.01)
+    assert 0.5 < error < 2.0
+
+
+def test_fit_needs_varied_samples():
+    flat = [({'seconds': 1.0, 'cpu_seconds': 1.0}, 10.0)] * 5
+    with pytest.raises(ValueError):
+        model.Model.fit(flat, ['seconds', 'cpu_seconds'])
+
+
+def test_model_meter_round_trip(tmp_path, monkeypatch):
+    names = ['seconds', 'cpu_seconds', 'instructions']
+    path = tmp_path / 'model.json'
+    model.Model.fit(synthetic_samples(), names).save(str(path))
+    monkeypatch.setenv(model.ENV_VAR, str(path))
+
+    sampler = FakeSampler(names)
+    meter = model.ModelMeter(sampler=sampler)
+    assert meter.available()
+    before = meter.read()
+    sampler.now.update(seconds=2.0, cpu_seconds=2.0, instructions=0.0)
+    estimate = meter.delta(before, meter.read())
+    assert estimate['package'] == pytest.approx(34.0, rel=0.05)
+    assert energy.format_joules(estimate).endswith(' J') and '+/-' in energy.format_joules(estimate)
+
+    # the model needs perf counts this sampler cannot provide
+    assert not model.ModelMeter(sampler=FakeSampler(['seconds', 'cpu_seconds'])).available()
+
+
+def test_feature_sets_nest_the_optional_inputs():
+    names = ['seconds', 'cpu_seconds', 'cpu_ghz_seconds', 'instructions', 'cache_misses']
+    assert model.feature_sets(names) == [
+        ['seconds', 'cpu_seconds'],
+        ['seconds', 'cpu_seconds', 'cpu_ghz_seconds'],
+        ['seconds', 'cpu_seconds', 'instructions', 'cache_misses'],
+        ['seconds', 'cpu_seconds', 'cpu_ghz_seconds', 'instructions', 'cache_misses']]
+    assert model.feature_sets(['seconds', 'cpu_seconds']) == [['seconds', 'cpu_seconds']]
+
+
+class FakeRapl(object):
+    """Package joules of the fake sampler's synthetic power model."""
+
+    def __init__(self, sampler):
+        self.sampler = sampler
+
+    def available(self):
+        return True
+
+    def read(self):
+        now = self.sampler.now
+        return (5.0 * now['seconds'] + 12.0 * now['cpu_seconds'] + 3.0 * now['cpu_ghz_seconds']
+                + 2e-10 * now['instructions'] + 1e-8 * now['cache_misses'])
+
+    def delta(self, before, after):
+        return {'package': after - before}
+
+
+class AdvancingSampler(FakeSampler):
+    """Each read moves every input by a random amount."""
+
+    def __init__(self, names):
+        FakeSampler.__init__(self, names)
+        self.rng = random.Random(2)
+        self.scale = {'seconds': 5, 'cpu_seconds': 20, 'cpu_ghz_seconds': 60,
+                      'instructions': 2e11, 'cache_misses': 1e9}
+
+    def read(self):
+        for name in self._names:
+            self.now[name] += self.rng.uniform(0, self.scale[name])
+        return dict(self.now)
+
+    def close(self):
+        pass
+
+
+def test_host_without_perf_or_cpufreq_gets_an_estimate(tmp_path, monkeypatch):
+    names = ['seconds', 'cpu_seconds', 'cpu_ghz_seconds', 'instructions', 'cache_misses']
+    sampler = AdvancingSampler(names)
+    models = model.calibrate(seconds=0, repetitions=3, parallelism=[1], sampler=sampler,
+                             meter=FakeRapl(sampler))
+    assert [m.features for m in models] == model.feature_sets(names)
+    path = tmp_path / 'model.json'
+    model.save_models(models, str(path))
+    monkeypatch.setenv(model.ENV_VAR, str(path))
+
+    # a VM: no cpufreq, no perf
+    bare = FakeSampler(['seconds', 'cpu_seconds'])
+    meter = model.ModelMeter(sampler=bare)
+    assert meter.available() and meter.model.features == ['seconds', 'cpu_seconds']
+    before = meter.read()
+    bare.now.update(seconds=2.0, cpu_seconds=2.0)
+    estimate = meter.delta(before, meter.read())
+    assert estimate['package'] > 0 and estimate['package_error'] > 0
+    assert '+/-' in energy.format_joules(estimate)
+
+    # the RAPL host itself uses every input
+    full = model.ModelMeter(sampler=FakeSampler(names))
+    assert full.model.features == names
+
+
+def test_proc_stat_and_cpufreq_sources(tmp_path):
+    (tmp_path / 'stat').write_text('cpu  100 20 30 1000 5 6 7 8 0 0\ncpu0 1 2 3 4 5 6 7 8 0 0\n')
+    proc = model.ProcStat(str(tmp_path))
+    assert proc.read() == pytest.approx(163.0 / proc.hz)
+
+    for cpu, khz in (('cpu0', 2000000), ('cpu1', 3000000)):
+        (tmp_path / cpu / 'cpufreq').mkdir(parents=True)
+        (tmp_path / cpu / 'cpufreq' / 'scaling_cur_freq').write_text('%d\n' % khz)
+    (tmp_path / 'cpufreq').mkdir()
+    assert model.CpuFreq(str(tmp_path)).read() == pytest.approx(2.5)
+    assert model.CpuFreq(str(tmp_path / 'missing')).read() is None
+
+
+def test_model_meter_stops_its_perf_process(tmp_path, monkeypatch):
+    fake = tmp_path / 'perf'
+    # counts in the background (-I) until killed; the one-off probe succeeds
+    fake.write_text('#!/bin/sh\ncase " $* " in *" -I "*) exec sleep 60;; esac\n')
+    fake.chmod(0o755)
+    monkeypatch.setenv('PATH', '%s%s%s' % (tmp_path, os.pathsep, os.environ['PATH']))
+    fitted = model.Model.fit(synthetic_samples(), ['seconds', 'cpu_seconds', 'instructions'])
+    with model.ModelMeter(fitted) as meter:
+        assert meter.available()
+        meter.read()
+        perf = meter.sampler.perf._proc
+        assert perf.poll() is None
+    assert meter.sampler.perf._proc is None
+    assert perf.returncode is not None
+    with pytest.raises(ProcessLookupError):
+        os.kill(perf.pid, 0)
+    meter.close()
@@ -0,0 +1,57 @@
+import itertools
+import sys
+
+from harness import benchmarks
+from harness.energy import NullMeter
+from harness.phases import PhaseRecorder, run
+from harness.runner import measure
+
+SCRIPT = '''
+import os, sys
+sys.path.insert(0, %r)
+from benchlib.phases import phase, enabled
+assert enabled() and 'BENCH_PHASE_FD' not in os.environ
+phase('parse')
+phase('count')
+if os.fork() == 0:
+    phase('child')      # ignored: not the process that imported phases
+    os._exit(0)
+os.wait()
+phase('parse')
+'''
+
+
+class TickMeter(object):
+    """One joule per reading, so every interval has a known energy."""
+    name = 'tick'
+
+    def __init__(self):
+        self._ticks = itertools.count()
+
+    def read(self):
+        return (next(self._ticks),)
+
+    def delta(self, before, after):
+        return {'package': float(after[0] - before[0])}
+
+
+def test_recorder_splits_run_between_markers(tmp_path):
+    script = tmp_path / 'marked.py'
+    script.write_text(SCRIPT % benchmarks.PYTHON_DIR)
+    meter = TickMeter()
+    recorder = PhaseRecorder(meter)
+    result = measure([sys.executable, str(script)], meter=meter, probes=[recorder])
+    assert result.returncode == 0
+
+    phases = recorder.phases()
+    assert [p.name for p in phases] == ['startup', 'parse', 'count']
+    assert [p.entries for p in phases] == [1, 2, 1]
+    assert sum(p.seconds for p in phases) <= result.seconds
+    assert sum(p.energy['package'] for p in phases) == (recorder.marks[-1].reading[0]
+                                                       - recorder.marks[0].reading[0])
+
+
+def test_fasta_phases():
+    result, phases = run(benchmarks.get('fasta'), sys.executable, arg=1000, meter=NullMeter())
+    assert result.returncode == 0
+    assert [p.name for p in phases] == ['startup', 'repeat', 'iub', 'homosapiens']
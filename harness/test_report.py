@@ -0,0 +1,61 @@
+import json
+
+from harness import report
+
+
+def write(path, rows, sep=' ; '):
+    path.parent.mkdir(exist_ok=True)
+    path.write_text(''.join('%s%s%f%s0%s0%s0%s %G \n' % (b, sep, j, sep, sep, sep, sep, ms)
+                            for b, j, ms in rows))
+
+
+def test_parse_row_handles_both_separators_and_headers():
+    assert report.parse_row('n-body ; 72.5 ; 48.4 ; 0 ; 10.4 ;  4303.42 \n') == (
+        'n-body', 72.5, 4303.42)
+    assert report.parse_row('fasta , 23.4, 20.4,  ,  ,  1434.56 ') == ('fasta', 23.4, 1434.56)
+    assert report.parse_row('benchmark-name, PKG (Joules), CPU (J), DRAM (J) , Time (ms)') is None
+    assert report.parse_row('\n') is None
+
+
+def test_history_prefix_is_not_counted_twice(tmp_path):
+    old = [('n-body', 10, 1000)] * 2
+    write(tmp_path / 'C' / 'C.csv', old + [('n-body', 12, 1200)])
+    write(tmp_path / 'C' / 'xC.csv', old)
+    write(tmp_path / 'Go' / 'xGo.csv', [('n-body', 20, 1500)])
+    write(tmp_path / 'Go' / 'Go.csv', [('n-body', 22, 1600)])
+    (tmp_path / 'C' / 'C.compile.csv').write_text('n-body ; 1 ; 1 ; 0 ; 0 ; 5 ; 100 ; gcc\n')
+    files = report.result_files(str(tmp_path))
+    assert [p.rsplit('/', 1)[1] for p in files['C']] == ['C.csv']
+    assert len(files['Go']) == 2
+    columns = report.load(str(tmp_path), log=None)
+    assert len(columns) == 5
+    assert columns.languages == ['C', 'Go']
+
+
+def test_aggregate_normalize_rank_and_pareto(tmp_path):
+    write(tmp_path / 'C' / 'C.csv', [('n-body', 10, 1000), ('n-body', 12, 1000),
+                                     ('n-body', 11, 1000), ('fasta', 2, 100)])
+    write(tmp_path / 'Rust' / 'Rust.csv', [('n-body', 11.5, 900), ('fasta', 3, 90)],
+          sep=' , ')
+    write(tmp_path / 'Python' / 'Python.csv', [('n-body', 500, 50000), ('fasta', 40, 4000)])
+    log = tmp_path / 'watchdog.jsonl'
+    log.write_text(json.dumps({'language': 'C', 'benchmark': 'n-body', 'rule': 'run',
+                               'status': 'ok', 'maxrss': 2000}) + '\n')
+    aggregates = report.aggregate(report.load(str(tmp_path), log=str(log)))
+    by_key = dict(((a.language, a.benchmark), a) for a in aggregates)
+    assert by_key[('C', 'n-body')].energy == 11
+    assert by_key[('C', 'n-body')].runs == 3
+    assert by_key[('C', 'n-body')].memory == 2000
+    assert by_key[('Rust', 'n-body')].time == 0.9
+
+    normalized = dict(((n.language, n.benchmark), n) for n in report.normalize(aggregates))
+    assert normalized[('Python', 'fasta')].energy == 20
+    assert [entry[0] for entry in report.ranking(list(normalized.values()))] == [
+        'C', 'Rust', 'Python']
+
+    frontier = report.pareto([a for a in aggregates if a.benchmark == 'n-body'])
+    assert set(a.language for a in frontier) == {'C', 'Rust'}
+
+    report.write_csv(str(tmp_path / 'out.csv'), aggregates)
+    lines = (tmp_path / 'out.csv').read_text().splitlines()
+    assert len(lines) == 1 + len(aggregates)
@@ -0,0 +1,48 @@
+import hashlib
+import os
+import sys
+
+import pytest
+
+from harness import sinks
+from harness.energy import NullMeter
+from harness.runner import measure
+
+WRITE = 'import sys; sys.stdout.write("x" * 100000); sys.stdout.flush()'
+
+
+@pytest.mark.parametrize('name', sorted(sinks.SINKS))
+def test_measure_records_the_sink(name):
+    sink = sinks.get_sink(name)
+    result = measure([sys.executable, '-c', WRITE], meter=NullMeter(), sink=sink)
+    assert result.returncode == 0
+    assert result.output.sink == name
+    if name == 'null':
+        assert result.output.bytes is None
+    else:
+        assert result.output.bytes == 100000
+    if name == 'hash':
+        assert result.output.sha256 == hashlib.sha256(b'x' * 100000).hexdigest()
+
+
+def test_default_sink_is_null_and_reusable_sinks_reset():
+    assert measure([sys.executable, '-c', 'pass'], meter=NullMeter()).output.sink == 'null'
+    sink = sinks.get_sink('count')
+    for _ in range(2):
+        assert measure([sys.executable, '-c', WRITE], meter=NullMeter(),
+                       sink=sink).output.bytes == 100000
+
+
+def test_file_sink_removes_its_file_unless_kept(tmp_path):
+    with sinks.FileSink(str(tmp_path)) as sink:
+        os.write(sink.fileno(), b'abc')
+        assert sink.sync() == 3
+    assert os.listdir(str(tmp_path)) == []
+    with sinks.FileSink(str(tmp_path), keep=True) as sink:
+        os.write(sink.fileno(), b'abc')
+    assert open(sink.path, 'rb').read() == b'abc'
+
+
+def test_unknown_sink():
+    with pytest.raises(ValueError):
+        sinks.get_sink('terminal')
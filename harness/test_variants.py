@@ -0,0 +1,40 @@
+import sys
+
+from harness import benchmarks, variants
+from harness.energy import NullMeter
+
+
+def test_registry_declares_baseline_first():
+    names = [v.name for v in benchmarks.variants(benchmarks.get('fannkuch-redux'))]
+    assert names[0] == 'baseline' and 'optimized' in names
+    assert [v.name for v in benchmarks.variants(benchmarks.get('n-body'))] == ['baseline']
+    assert benchmarks.installed(benchmarks.Variant('x', 'y', 'z', {}, ()))
+    assert not benchmarks.installed(benchmarks.Variant('x', 'y', 'z', {}, ('no_such_module',)),
+                                    sys.executable)
+
+
+def test_check_and_compare_fake_variants(tmp_path, monkeypatch):
+    monkeypatch.setattr(benchmarks, 'PYTHON_DIR', str(tmp_path))
+    folder = tmp_path / 'squares'
+    folder.mkdir()
+    (folder / 'base.py').write_text(
+        'import sys\nprint(sum(i * i for i in range(int(sys.argv[1]))))\n')
+    (folder / 'fast.py').write_text(
+        'import os, sys\nn = int(sys.argv[1]) + int(os.environ.get("OFF_BY", "0"))\n'
+        'print((n - 1) * n * (2 * n - 1) // 6)\n')
+    bench = benchmarks.Benchmark('squares', 'base.py', 'main', 'int', '100', None, True)
+    base = benchmarks.Variant('squares', 'baseline', 'base.py', {}, ())
+    fast = benchmarks.Variant('squares', 'fast', 'fast.py', {}, ())
+    broken = benchmarks.Variant('squares', 'broken', 'fast.py', {'OFF_BY': '1'}, ())
+
+    checks = variants.check(bench, [base, fast, broken], ('10', '1000'), python=sys.executable)
+    assert [(c.variant.name, c.matches) for c in checks] == [
+        ('baseline', True), ('fast', True), ('broken', False)] * 2
+    assert checks[0].output.sink == 'hash'
+
+    timings = variants.compare(bench, [base, fast], '1000', repetitions=3, meter=NullMeter(),
+                               python=sys.executable)
+    assert [t.variant.name for t in timings] == ['baseline', 'fast']
+    assert timings[0].speedup == 1.0 and timings[0].p_value is None
+    assert timings[1].seconds > 0 and timings[1].p_value is not None
+    assert timings[1].joules is None and timings[1].failures == 0
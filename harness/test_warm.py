@@ -0,0 +1,99 @@
+import os
+import sys
+
+import pytest
+
+from harness import benchmarks, warm
+from harness.energy import NullMeter, PowercapMeter
+from harness.sinks import CountingSink, HashingSink, redirect_stdout
+
+
+def write_zone(root, zone, name, energy_uj, max_range=1000000):
+    path = root / zone
+    path.mkdir()
+    (path / 'name').write_text(name + '\n')
+    (path / 'energy_uj').write_text('%d\n' % energy_uj)
+    (path / 'max_energy_range_uj').write_text('%d\n' % max_range)
+    return path
+
+
+def test_powercap_meter_sums_packages_and_handles_wraparound(tmp_path):
+    p0 = write_zone(tmp_path, 'intel-rapl:0', 'package-0', 999000)
+    p1 = write_zone(tmp_path, 'intel-rapl:1', 'package-1', 1000)
+    write_zone(tmp_path, 'intel-rapl:0:0', 'core', 500)
+    meter = PowercapMeter(str(tmp_path))
+    assert meter.available()
+
+    before = meter.read()
+    (p0 / 'energy_uj').write_text('1000\n')      # wrapped: +2000 uJ
+    (p1 / 'energy_uj').write_text('4000\n')      # +3000 uJ
+    joules = meter.delta(before, meter.read())
+    assert joules['package'] == pytest.approx(0.005)
+    assert joules['core'] == 0.0
+
+
+def test_powercap_meter_without_counters(tmp_path):
+    assert not PowercapMeter(str(tmp_path / 'missing')).available()
+
+
+def test_counting_sink_sees_fd_level_writes():
+    with CountingSink() as sink, redirect_stdout(sink):
+        print('hello')
+        sys.stdout.flush()
+        os.write(1, b'x' * 100000)
+        assert sink.sync() == 6 + 100000
+    assert sink.bytes == 100006
+
+
+def test_hashing_sink_checkpoints_hash_each_part():
+    with HashingSink() as sink, redirect_stdout(sink):
+        os.write(1, b'same')
+        first = sink.checkpoint()
+        os.write(1, b'same')
+        second = sink.checkpoint()
+        os.write(1, b'other')
+        third = sink.checkpoint()
+    assert first == second != third
+    assert sink.output().sha256 not in (first, third)
+
+
+def test_pool_keeper_reuses_plain_pools():
+    created = []
+
+    def factory(processes=None, initializer=None, initargs=()):
+        created.append(processes)
+        return object()
+
+    keeper = warm.PoolKeeper(factory)
+    assert keeper(2) is keeper(2)
+    assert keeper(2) is not keeper(4)
+    keeper(2, initializer=print)
+    keeper(2, initializer=print)
+    assert created == [2, 4, 2, 2]
+
+
+def test_warm_run_binarytrees_is_repeatable():
+    bench = benchmarks.get('binary-trees')
+    samples = warm.run(bench, iterations=3, arg=6, meter=NullMeter())
+    assert [s.index for s in samples] == [0, 1, 2]
+    summary = warm.summarize(bench, samples)
+    assert summary.output_bytes > 0
+    assert summary.consistent and samples[0].output_sha256
+    assert summary.warm_seconds is not None
+    assert summary.warm_joules is None
+
+
+def test_warm_iterations_start_from_fresh_module_state():
+    # n-body moves the bodies of its module-level SYSTEM in place
+    bench = benchmarks.get('n-body')
+    samples = warm.run(bench, iterations=2, arg=1000, meter=NullMeter())
+    assert samples[0].output_sha256 == samples[1].output_sha256
+    assert warm.summarize(bench, samples).consistent
+
+
+def test_summary_flags_outputs_that_differ():
+    bench = benchmarks.get('n-body')
+    samples = [warm.Iteration(i, 1.0, {}, 20, digest, {})
+               for i, digest in enumerate(['a' * 64, 'b' * 64])]
+    summary = warm.summarize(bench, samples)
+    assert summary.output_bytes == 20 and not summary.consistent
@@ -0,0 +1,98 @@
+import json
+import os
+import sys
+import time
+
+import pytest
+
+from harness import watchdog
+from harness.energy import NullMeter
+from harness.watchdog import Limits, POLICIES, Target
+
+
+def target_with_rule(tmp_path, script, language='Python', benchmark='job'):
+    directory = tmp_path / language / benchmark
+    directory.mkdir(parents=True)
+    (directory / 'job.py').write_text(script)
+    (directory / 'Makefile').write_text('run:\n\t%s job.py\n' % sys.executable)
+    return Target(language, benchmark, str(directory))
+
+
+def alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    return True
+
+
+def test_timeout_kills_the_whole_process_group(tmp_path):
+    target = target_with_rule(tmp_path, '''
+import multiprocessing, os, time
+def worker(_):
+    open('worker.pid', 'w').write(str(os.getpid()))
+    time.sleep(60)
+with multiprocessing.get_context('fork').Pool(1) as pool:
+    pool.map(worker, [0])
+''')
+    t0 = time.time()
+    outcome = watchdog.run(target, timeout=1.0, meter=NullMeter())
+    assert time.time() - t0 < 30
+    assert outcome.status == 'timeout' and outcome.result.timed_out
+    pid = int((tmp_path / 'Python' / 'job' / 'worker.pid').read_text())
+    for _ in range(50):
+        if not alive(pid):
+            break
+        time.sleep(0.1)
+    assert not alive(pid)
+
+
+def test_transient_policy_retries_failures(tmp_path):
+    target = target_with_rule(tmp_path, '''
+import os, sys
+first = not os.path.exists('tried')
+open('tried', 'w').close()
+sys.exit(3 if first else 0)
+''')
+    outcome = watchdog.run(target, policy=POLICIES['transient'], meter=NullMeter())
+    assert (outcome.status, outcome.attempts) == ('ok', 2)
+
+    os.remove(os.path.join(target.directory, 'tried'))
+    outcome = watchdog.run(target, policy=POLICIES['none'], meter=NullMeter())
+    assert (outcome.status, outcome.attempts) == ('failed', 1)
+    assert watchdog.log_entry(outcome)['returncode'] != 0
+
+
+def test_memory_limit_is_reported(tmp_path):
+    target = target_with_rule(tmp_path, 'data = bytearray(1024 * 1024 * 1024)\n')
+    outcome = watchdog.run(target, limits=Limits(256, None), meter=NullMeter())
+    assert outcome.status == 'memory-limit'
+    assert 'MemoryError' in outcome.stderr
+
+
+def test_timeout_from_history(tmp_path):
+    target = target_with_rule(tmp_path, '', language='C', benchmark='n-body')
+    (tmp_path / 'C' / 'C.csv').write_text(
+        'n-body ; 72.5 ; 48.4 ; 0.0 ; 10.4 ;  4303.42 \n'
+        'fasta ; 10.0 ; 8.0 ; 0.0 ; 1.0 ;  900000 \n'
+        'n-body ; 74.2 ; 50.6 ; 0.0 ; 10.2 ;  4189.86 \n')
+    root = str(tmp_path)
+    assert watchdog.history(target, 'run', root=root) == pytest.approx([4.30342, 4.18986])
+    assert watchdog.timeout_for(watchdog.history(target, 'measure', root=root),
+                                minimum=1) == pytest.approx(3 * 43.0342)
+    log = [{'language': 'C', 'benchmark': 'n-body', 'rule': 'run', 'status': 'ok',
+            'seconds': 30.0}]
+    assert watchdog.timeout_for(watchdog.history(target, 'run', log, root)) == 90.0
+    assert watchdog.timeout_for([], default=None) is None
+
+
+def test_jobs_without_history_get_the_default_timeout(tmp_path, monkeypatch):
+    target = target_with_rule(tmp_path, 'import time\ntime.sleep(60)\n',
+                              benchmark='new-hung-job')
+    monkeypatch.setattr(watchdog, 'find', lambda paths: [target])
+    log = tmp_path / 'watchdog.jsonl'
+    t0 = time.time()
+    assert watchdog.main(['--timeout', '1', '--log', str(log), '--energy', 'none']) == 1
+    assert time.time() - t0 < 30
+    entry = json.loads(log.read_text())
+    assert entry['status'] == 'timeout' and entry['timeout'] == 1.0
@@ -0,0 +1,187 @@
+"""Differential checks and A/B comparisons of benchmark variants.
+
+Some benchmarks keep alternative implementations next to the program the
+Makefile runs (``binarytrees.py`` and ``optimized_code.py``, say); they are
+declared in ``harness.benchmarks.VARIANTS``.  For every benchmark this tool
+
+1. runs each variant at several small sizes (``--sizes``, or
+   ``CHECK_ARGS``) and compares the SHA-256 of its output with the
+   baseline's, which is the Makefile's program;
+2. if all outputs agree, runs the variants interleaved (ABAB...) at
+   ``--arg`` and reports each one's median time and energy relative to the
+   baseline, with a Mann-Whitney p-value on the times.
+
+A variant whose output differs is not timed, and the exit status is 1, so
+a faster variant can only be promoted if it prints the same thing.
+
+    python3 -m harness.variants binary-trees fannkuch-redux --arg 10 -r 5
+"""
+
+import argparse
+import os
+import statistics
+import sys
+from collections import namedtuple
+
+from harness import benchmarks
+from harness.compare import mann_whitney
+from harness.energy import get_meter, package_joules
+from harness.runner import measure
+from harness.sinks import HashingSink
+
+# Sizes for the differential check: small, but past the special cases.
+CHECK_ARGS = {
+    'binary-trees': ('4', '6', '10'),
+    'fannkuch-redux': ('3', '7', '9'),
+    'fasta': ('1000', '25001'),
+    'k-nucleotide': ('0',),
+    'mandelbrot': ('8', '200', '1001'),
+    'n-body': ('1000', '20000'),
+    'pidigits': ('27', '300'),
+    'regex-redux': ('0',),
+    'reverse-complement': ('0',),
+    'spectral-norm': ('100', '251'),
+}
+
+Check = namedtuple('Check', 'variant arg returncode output matches')
+Timing = namedtuple('Timing', 'variant seconds joules speedup energy_ratio p_value failures')
+
+
+def environment(variant):
+    env = dict(os.environ)
+    env.update(variant.env)
+    return env
+
+
+def run_variant(bench, variant, arg=None, meter=None, sink=None, python=None):
+    """Run ``variant`` once as a script; returns its ``Result``."""
+    return measure(benchmarks.command(bench, python or benchmarks.interpreter(), arg=arg,
+                                      variant=variant),
+                   cwd=benchmarks.directory(bench), env=environment(variant),
+                   stdin=benchmarks.stdin_path(bench), meter=meter, sink=sink)
+
+
+def check(bench, variants, args, meter=None, python=None):
+    """One ``Check`` per variant and size, against the first variant's output."""
+    meter = meter or get_meter('none')
+    checks = []
+    for arg in args:
+        expected = None
+        for variant in variants:
+            result = run_variant(bench, variant, arg, meter, HashingSink(), python)
+            if expected is None:
+                expected = result.output if result.returncode == 0 else None
+            matches = (result.returncode == 0 and expected is not None
+                       and result.output.sha256 == expected.sha256)
+            checks.append(Check(variant, arg, result.returncode, result.output, matches))
+    return checks
+
+
+def compare(bench, variants, arg=None, repetitions=5, meter=None, python=None):
+    """One ``Timing`` per variant, relative to the first; runs are interleaved."""
+    meter = meter or get_meter()
+    results = dict((v.name, []) for v in variants)
+    failures = dict((v.name, 0) for v in variants)
+    for _ in range(repetitions):
+        for variant in variants:
+            result = run_variant(bench, variant, arg, meter, python=python)
+            if result.returncode == 0:
+                results[variant.name].append(result)
+            else:
+                failures[variant.name] += 1
+    base = results[variants[0].name]
+    base_seconds = [r.seconds for r in base]
+    base_time = statistics.median(base_seconds) if base else None
+    base_joules = _median_joules(base)
+    timings = []
+    for variant in variants:
+        runs = results[variant.name]
+        if not runs:
+            timings.append(Timing(variant, None, None, None, None, None, failures[variant.name]))
+            continue
+        seconds = statistics.median(r.seconds for r in runs)
+        joules = _median_joules(runs)
+        timings.append(Timing(
+            variant, seconds, joules,
+            base_time / seconds if base_time and seconds else None,
+            joules / base_joules if joules is not None and base_joules else None,
+            mann_whitney(base_seconds, [r.seconds for r in runs])[1]
+            if variant is not variants[0] and base else None,
+            failures[variant.name]))
+    return timings
+
+
+def _median_joules(results):
+    joules = [package_joules(r.energy) for r in results]
+    if not joules or None in joules:
+        return None
+    return statistics.median(joules)
+
+
+def report_checks(bench, checks, out=sys.stdout):
+    for c in checks:
+        if c.returncode != 0:
+            status = 'failed (%d)' % c.returncode
+        elif c.matches:
+            status = 'ok'
+        else:
+            status = 'OUTPUT DIFFERS'
+        out.write('%s\t%s\t%s\t%d bytes\t%s\t%s\n' % (
+            bench.name, c.variant.name, c.arg, c.output.bytes or 0,
+            c.output.sha256[:12] if c.output.sha256 else '-', status))
+
+
+def report_timings(bench, timings, out=sys.stdout):
+    for t in timings:
+        if t.seconds is None:
+            out.write('%s\t%s\tfailed (%d runs)\n' % (bench.name, t.variant.name, t.failures))
+            continue
+        joules = '-' if t.joules is None else '%.3f J' % t.joules
+        energy = '' if t.energy_ratio is None else '\tenergy x%.2f' % t.energy_ratio
+        p_value = '' if t.p_value is None else '\tp=%.3g' % t.p_value
+        out.write('%s\t%s\t%.3f s\t%s\tspeedup x%.2f%s%s\n' % (
+            bench.name, t.variant.name, t.seconds, joules, t.speedup or 0.0, energy, p_value))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('benchmark', nargs='+', help='benchmark names, or "all"')
+    parser.add_argument('--sizes', help='comma-separated arguments for the output check')
+    parser.add_argument('--arg', help='argument for the A/B runs (default: the largest size)')
+    parser.add_argument('-r', '--repetitions', type=int, default=5)
+    parser.add_argument('--check-only', action='store_true', help='skip the A/B runs')
+    parser.add_argument('--interpreter',
+                        help='Python to run (default: the Makefiles\' one when installed)')
+    parser.add_argument('--energy', help='energy backend (default: $HARNESS_ENERGY or auto)')
+    args = parser.parse_args(argv)
+
+    names = args.benchmark
+    if names == ['all']:
+        names = [b.name for b in benchmarks.BENCHMARKS]
+    python = args.interpreter or benchmarks.interpreter()
+    meter = get_meter(args.energy)
+    differs = False
+    for name in names:
+        bench = benchmarks.get(name)
+        variants = []
+        for variant in benchmarks.variants(bench):
+            if benchmarks.installed(variant, python):
+                variants.append(variant)
+            else:
+                print('%s\t%s\tskipped: needs %s' % (bench.name, variant.name,
+                                                     ', '.join(variant.requires)))
+        sizes = args.sizes.split(',') if args.sizes else CHECK_ARGS.get(name, (bench.arg,))
+        checks = check(bench, variants, sizes, python=python)
+        report_checks(bench, checks)
+        bad = set(c.variant.name for c in checks if not c.matches)
+        differs = differs or bool(bad)
+        if args.check_only or len(variants) < 2 or variants[0].name in bad:
+            continue
+        good = [v for v in variants if v.name not in bad]
+        timings = compare(bench, good, args.arg or sizes[-1], args.repetitions, meter, python)
+        report_timings(bench, timings)
+    return 1 if differs else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
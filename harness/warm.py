@@ -0,0 +1,282 @@
+"""Warm in-process runner for the Python benchmarks.
+
+``make run`` starts a fresh interpreter for every repetition, so interpreter
+start-up, imports, pool creation and cold caches are folded into every
+sample.  This runner imports a benchmark once, calls its entry point
+repeatedly in the same interpreter and reports the first (cold) iteration
+separately from the following (warm) ones.
+
+Benchmarks keep state in module globals (n-body moves the bodies of
+``SYSTEM`` in place), so the module is imported afresh, untimed, before
+every iteration; the interpreter, the imported libraries and the
+``multiprocessing`` pools created by the benchmark are kept between
+iterations.  Stdout goes to a sink from ``harness.sinks`` instead of the
+terminal (a hashing pipe unless ``--sink`` says otherwise), and each
+iteration's output is checked to be identical to the others': by SHA-256
+with the ``hash`` sink, by byte count with the others.
+
+    python3 -m harness.warm binary-trees -n 5 --arg 16
+"""
+
+import argparse
+import multiprocessing
+import os
+import statistics
+import sys
+import time
+from collections import namedtuple
+from contextlib import contextmanager
+
+from harness import benchmarks
+from harness.counters import format_rate, rates
+from harness.energy import format_joules, get_meter, package_joules
+from harness.sinks import SINKS, get_sink, redirect_stdout
+
+Iteration = namedtuple('Iteration', 'index seconds energy output_bytes output_sha256 units')
+Summary = namedtuple('Summary', 'benchmark cold warm_seconds warm_joules output_bytes units '
+                                 'output consistent')
+
+
+class _KeptPool(object):
+    """Pool proxy that ignores the benchmark's attempts to shut it down."""
+
+    def __init__(self, pool):
+        self._pool = pool
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def close(self):
+        pass
+
+    def terminate(self):
+        pass
+
+    def join(self):
+        pass
+
+    def __getattr__(self, name):
+        return getattr(self._pool, name)
+
+
+class PoolKeeper(object):
+    """Stand-in for ``multiprocessing.Pool`` that hands out long-lived pools.
+
+    Pools are keyed by their process count.  Pools with an initializer carry
+    per-run state and are created fresh every time.
+    """
+
+    def __init__(self, factory=multiprocessing.Pool):
+        self._factory = factory
+        self._pools = {}
+
+    def __call__(self, processes=None, initializer=None, initargs=(), *args, **kwargs):
+        if initializer is not None or args or kwargs:
+            return self._factory(processes, initializer, initargs, *args, **kwargs)
+        if processes not in self._pools:
+            self._pools[processes] = _KeptPool(self._factory(processes))
+        return self._pools[processes]
+
+    def shutdown(self):
+        for kept in self._pools.values():
+            kept._pool.terminate()
+            kept._pool.join()
+        self._pools.clear()
+
+
+@contextmanager
+def _kept_pools(keeper):
+    """Hand out ``keeper``'s pools; modules imported inside see it as ``Pool``."""
+    original = multiprocessing.Pool
+    multiprocessing.Pool = keeper
+    # Benchmarks that get their workers from benchlib.executor
+    executor = sys.modules.get('benchlib.executor')
+    try:
+        with executor.kept_alive() if executor else _no_pools():
+            yield keeper
+    finally:
+        multiprocessing.Pool = original
+        keeper.shutdown()
+
+
+@contextmanager
+def _stdin_from(module, path):
+    """Feed ``path`` to the benchmark as stdin, including a ``from sys import stdin``."""
+    if path is None:
+        yield
+        return
+    saved = sys.stdin
+    rebound = getattr(module, 'stdin', None) is saved
+    with open(path) as f:
+        sys.stdin = f
+        if rebound:
+            module.stdin = f
+        try:
+            yield
+        finally:
+            sys.stdin = saved
+            if rebound:
+                module.stdin = saved
+
+
+@contextmanager
+def _cwd(path):
+    saved = os.getcwd()
+    os.chdir(path)
+    try:
+        yield
+    finally:
+        os.chdir(saved)
+
+
+@contextmanager
+def _no_pools():
+    yield None
+
+
+def _counts():
+    # benchlib.counters is only loaded by benchmarks that count their work
+    counters = sys.modules.get('benchlib.counters')
+    return counters.counts() if counters else {}
+
+
+def _reset_counts(count=False):
+    counters = sys.modules.get('benchlib.counters')
+    if counters:
+        counters.reset()
+        counters.enable(count)
+
+
+def run(bench, iterations=5, arg=None, meter=None, reuse_pools=None, sink=None, count=False):
+    """Run ``bench`` ``iterations`` times in this interpreter.
+
+    Returns one ``Iteration`` per call; the first one is the cold run.
+    ``sink`` (a hashing one by default) receives the output; its
+    ``Output`` for all iterations is left in ``sink.output()``.  With
+    ``count`` the benchmarks also take the counts that cost time, such as
+    mandelbrot's iterations, through ``benchlib.counters.enable()``.
+    """
+    if iterations < 1:
+        raise ValueError('iterations must be at least 1')
+    meter = meter or get_meter()
+    if reuse_pools is None:
+        reuse_pools = bench.pool_reuse
+    stdin = benchmarks.stdin_path(bench)
+    sink = sink or get_sink('hash')
+
+    samples = []
+    original, keeper = multiprocessing.Pool, PoolKeeper()
+    with _cwd(benchmarks.directory(bench)):
+        module = benchmarks.load(bench)
+        pools = _kept_pools(keeper) if reuse_pools else _no_pools()
+        with pools, sink, redirect_stdout(sink):
+            written = 0
+            for index in range(iterations):
+                if index:
+                    # fresh module globals; later imports already see the keeper
+                    module = benchmarks.load(bench)
+                elif reuse_pools and getattr(module, 'Pool', None) is original:
+                    module.Pool = keeper
+                entry = getattr(module, bench.entry)
+                _reset_counts(count)
+                with _stdin_from(module, stdin):
+                    before = meter.read()
+                    t0 = time.perf_counter()
+                    benchmarks.invoke(bench, entry, arg)
+                    sys.stdout.flush()
+                    seconds = time.perf_counter() - t0
+                    after = meter.read()
+                total = sink.sync()
+                checkpoint = getattr(sink, 'checkpoint', None)
+                samples.append(Iteration(index, seconds, meter.delta(before, after),
+                                         None if total is None else total - written,
+                                         checkpoint() if checkpoint else None, _counts()))
+                written = total
+    _reset_counts()
+    if getattr(module, 'Pool', None) is keeper:
+        module.Pool = original
+    return samples
+
+
+def summarize(bench, samples, output=None):
+    cold = samples[0]
+    warm = samples[1:]
+    warm_seconds = warm_joules = None
+    if warm:
+        warm_seconds = statistics.median(s.seconds for s in warm)
+        joules = [package_joules(s.energy) for s in warm]
+        if None not in joules:
+            warm_joules = statistics.median(joules)
+    sizes = set(s.output_bytes for s in samples)
+    consistent = len(sizes) == 1 and len(set(s.output_sha256 for s in samples)) == 1
+    return Summary(bench.name, cold, warm_seconds, warm_joules,
+                   sizes.pop() if len(sizes) == 1 else None, samples[-1].units, output,
+                   consistent)
+
+
+def _fmt_joules(joules):
+    return '-' if joules is None else '%.3f J' % joules
+
+
+def report(summary, out=sys.stderr):
+    cold = summary.cold
+    out.write('%s\tcold\t%.6f s\t%s\n' % (
+        summary.benchmark, cold.seconds, format_joules(cold.energy)))
+    if summary.warm_seconds is not None:
+        out.write('%s\twarm\t%.6f s\t%s\t(median per iteration)\n' % (
+            summary.benchmark, summary.warm_seconds, _fmt_joules(summary.warm_joules)))
+    sink = summary.output.sink if summary.output else 'count'
+    if summary.output and summary.output.bytes is None:
+        out.write('%s\toutput\tnot counted (%s sink)\n' % (summary.benchmark, sink))
+    elif not summary.consistent:
+        out.write('%s\toutput differs between iterations\n' % summary.benchmark)
+    else:
+        out.write('%s\toutput\t%d bytes per iteration (%s sink)\n' % (
+            summary.benchmark, summary.output_bytes, sink))
+    if summary.consistent and summary.cold.output_sha256:
+        out.write('%s\toutput\tsha256 %s per iteration\n' % (
+            summary.benchmark, summary.cold.output_sha256))
+    if summary.warm_seconds is not None:
+        for rate in rates(summary.units, summary.warm_seconds, summary.warm_joules):
+            out.write('%s\twarm\t%s\n' % (summary.benchmark, format_rate(rate)))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('benchmark', nargs='+',
+                        help='benchmark names, or "all"')
+    parser.add_argument('-n', '--iterations', type=int, default=5)
+    parser.add_argument('--arg', help='override the Makefile argument (problem size)')
+    parser.add_argument('--energy', help='energy backend (default: $HARNESS_ENERGY or auto)')
+    parser.add_argument('--fresh-pools', action='store_true',
+                        help='let benchmarks create and destroy their pools every iteration')
+    parser.add_argument('--executor',
+                        help='benchlib executor backend (serial, threads, processes, fork); '
+                             'spawn-based backends need the benchmark run as a script')
+    parser.add_argument('--count', action='store_true',
+                        help='also take the work-unit counts that slow a benchmark down '
+                             '(mandelbrot\'s iterations)')
+    parser.add_argument('--sink', choices=sorted(SINKS), default='hash',
+                        help='where benchmark output goes (default: hash)')
+    args = parser.parse_args(argv)
+
+    names = args.benchmark
+    if names == ['all']:
+        names = [b.name for b in benchmarks.BENCHMARKS]
+    if args.executor:
+        os.environ['BENCH_EXECUTOR'] = args.executor
+    meter = get_meter(args.energy)
+    for name in names:
+        bench = benchmarks.get(name)
+        sink = get_sink(args.sink)
+        samples = run(bench, args.iterations, args.arg, meter,
+                      reuse_pools=False if args.fresh_pools else None, sink=sink,
+                      count=args.count)
+        report(summarize(bench, samples, sink.output()))
+
+
+if __name__ == '__main__':
+    main()
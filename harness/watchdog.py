@@ -0,0 +1,261 @@
+"""Run Makefile rules across the tree without letting one job stall the campaign.
+
+``compile_all.py`` waits on every ``make`` with no time limit, so a hung
+benchmark, or one swapping after blowing past memory, blocks everything
+after it.  This runner walks the same tree but gives every job:
+
+* a timeout derived from the job's history: earlier successful runs in the
+  watchdog log, else the times already recorded in ``<Language>.csv``;
+  jobs without history get ``--timeout`` (``DEFAULT_TIMEOUT`` seconds);
+* optional address-space and CPU-time limits (``setrlimit``);
+* a process group of its own, killed as a whole, ``Pool`` workers included;
+* optionally a cgroup v2 leaf of its own (``--cgroup``), for complete CPU
+  and memory accounting and an optional CPU quota;
+* a retry policy;
+* a selectable stdout sink (``--sink``, ``/dev/null`` by default), see
+  ``harness.sinks``;
+* a structured result, one JSON object per line in the log, with its status
+  (``ok``, ``failed``, ``timeout``, ``memory-limit``, ``cpu-limit``) and the
+  ID of the invocation (``--run-id``, a timestamp by default), so runs can be
+  compared with ``harness.compare``.
+
+    python3 -m harness.watchdog C/binary-trees Python --rule run --policy transient
+"""
+
+import argparse
+import json
+import os
+import resource
+import signal
+import sys
+import tempfile
+import time
+from collections import namedtuple
+from contextlib import contextmanager
+
+from harness import cgroup
+from harness.benchmarks import ROOT
+from harness.energy import get_meter
+from harness.runner import measure
+from harness.sinks import SINKS, get_sink
+
+Target = namedtuple('Target', 'language benchmark directory')
+Limits = namedtuple('Limits', 'memory_mb cpu_seconds')
+Policy = namedtuple('Policy', 'retries retry_on timeout_growth')
+Outcome = namedtuple('Outcome', 'language benchmark rule status attempts timeout result stderr '
+                                 'usage')
+
+POLICIES = {
+    'none': Policy(0, frozenset(), 1.0),
+    # a crashed or hung job gets another chance, with more time
+    'transient': Policy(2, frozenset(['failed', 'timeout']), 1.5),
+    # only jobs that ran out of time are retried
+    'patient': Policy(1, frozenset(['timeout']), 2.0),
+}
+
+# RAPL/main runs the command this many times per ``make measure``.
+RAPL_REPETITIONS = 10
+
+LOG = os.path.join(ROOT, 'watchdog.jsonl')
+
+# Messages runtimes print when an allocation fails under RLIMIT_AS.
+OUT_OF_MEMORY = (b'MemoryError', b'bad_alloc', b'out of memory', b'Cannot allocate memory',
+                 b'OutOfMemoryError', b'heap exhausted')
+
+# Timeout of a job with no earlier runs to go by: above the slowest ``make
+# measure`` in the recorded results (mandelbrot, 10 runs of 785 s).
+DEFAULT_TIMEOUT = 10800.0
+STDERR_TAIL = 4096
+
+
+def find(paths=None, root=ROOT):
+    """Benchmark folders with a Makefile below ``paths`` (default: all)."""
+    if not paths:
+        paths = sorted(d for d in os.listdir(root)
+                       if not d.startswith('.') and os.path.isdir(os.path.join(root, d)))
+    targets = []
+    for path in paths:
+        for directory, dirs, files in os.walk(os.path.join(root, path)):
+            dirs.sort()
+            parts = os.path.relpath(directory, root).split(os.sep)
+            if 'Makefile' in files and len(parts) == 2:
+                targets.append(Target(parts[0], parts[1], directory))
+    return targets
+
+
+def read_log(path=LOG):
+    if not os.path.exists(path):
+        return []
+    with open(path) as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def csv_seconds(target, root=ROOT):
+    """Per-run times recorded by ``RAPL/main`` in ``<Language>.csv``."""
+    path = os.path.join(root, target.language, target.language + '.csv')
+    seconds = []
+    if os.path.exists(path):
+        with open(path) as f:
+            for line in f:
+                fields = [field.strip() for field in line.split(';')]
+                if fields[0] == target.benchmark:
+                    try:
+                        seconds.append(float(fields[-1]) / 1000)
+                    except ValueError:
+                        pass
+    return seconds
+
+
+def history(target, rule, log=(), root=ROOT):
+    """Durations of earlier successful ``make rule`` jobs for ``target``."""
+    seconds = [entry['seconds'] for entry in log
+               if (entry['language'], entry['benchmark'], entry['rule'], entry['status'])
+               == (target.language, target.benchmark, rule, 'ok')]
+    if seconds:
+        return seconds
+    runs = csv_seconds(target, root)
+    if rule == 'measure':
+        return [s * RAPL_REPETITIONS for s in runs]
+    if rule in ('run', 'mem'):
+        return runs
+    return []
+
+
+def timeout_for(seconds, factor=3.0, minimum=60.0, default=None):
+    """``factor`` times the slowest earlier run, but at least ``minimum``."""
+    if not seconds:
+        return default
+    return max(minimum, factor * max(seconds))
+
+
+def rlimits(limits):
+    """A ``preexec_fn`` applying ``limits`` in the child, or None."""
+    if limits is None or (limits.memory_mb is None and limits.cpu_seconds is None):
+        return None
+
+    def apply():
+        if limits.memory_mb is not None:
+            size = limits.memory_mb * 1024 * 1024
+            resource.setrlimit(resource.RLIMIT_AS, (size, size))
+        if limits.cpu_seconds is not None:
+            # SIGXCPU at the soft limit, SIGKILL one second later
+            cpu = int(limits.cpu_seconds)
+            resource.setrlimit(resource.RLIMIT_CPU, (cpu, cpu + 1))
+    return apply
+
+
+def classify(result, stderr, limits=None):
+    if result.timed_out:
+        return 'timeout'
+    if result.returncode == 0:
+        return 'ok'
+    if limits is not None:
+        if limits.cpu_seconds is not None and (
+                result.returncode == -signal.SIGXCPU
+                or result.user + result.system >= limits.cpu_seconds):
+            return 'cpu-limit'
+        if limits.memory_mb is not None and any(m in stderr for m in OUT_OF_MEMORY):
+            return 'memory-limit'
+    return 'failed'
+
+
+def _tail(f):
+    f.seek(0, os.SEEK_END)
+    f.seek(max(0, f.tell() - STDERR_TAIL))
+    return f.read()
+
+
+@contextmanager
+def sandbox(target, rule, enabled=False, cpu_quota=None):
+    """A ``cgroup.Sandbox`` for one job, or None when cgroups are not used."""
+    if not enabled:
+        yield None
+        return
+    with cgroup.Sandbox('%s-%s' % (target.language, target.benchmark), cgroup.group_for(rule),
+                        cpu_quota=cpu_quota) as box:
+        yield box
+
+
+def run(target, rule='run', timeout=None, limits=None, policy=POLICIES['none'],
+        meter=None, use_cgroup=False, cpu_quota=None, sink=None):
+    """Run ``make rule`` for ``target`` under the watchdog; returns an ``Outcome``."""
+    meter = meter or get_meter()
+    attempts = 0
+    while True:
+        attempts += 1
+        with tempfile.TemporaryFile() as stderr, \
+                sandbox(target, rule, use_cgroup, cpu_quota) as box:
+            result = measure(['make', rule], cwd=target.directory, stderr=stderr,
+                             meter=meter, timeout=timeout, preexec_fn=rlimits(limits),
+                             probes=[box] if box else [], sink=sink)
+            tail = _tail(stderr)
+        usage = box.usage if box else None
+        result = cgroup.account(result, usage)
+        status = classify(result, tail, limits)
+        if status == 'ok' or status not in policy.retry_on or attempts > policy.retries:
+            return Outcome(target.language, target.benchmark, rule, status, attempts,
+                           timeout, result, tail.decode('utf-8', 'replace'), usage)
+        if status == 'timeout' and timeout is not None:
+            timeout *= policy.timeout_growth
+
+
+def log_entry(outcome, run_id=None):
+    result = outcome.result
+    return {
+        'run': run_id,
+        'language': outcome.language, 'benchmark': outcome.benchmark,
+        'rule': outcome.rule, 'status': outcome.status, 'attempts': outcome.attempts,
+        'timeout': outcome.timeout, 'returncode': result.returncode,
+        'seconds': result.seconds, 'user': result.user, 'system': result.system,
+        'maxrss': result.maxrss, 'energy': result.energy,
+        'stderr': outcome.stderr if outcome.status != 'ok' else '',
+        'cgroup': outcome.usage._asdict() if outcome.usage else None,
+        'output': result.output._asdict() if result.output else None,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('path', nargs='*', help='language or language/benchmark folders')
+    parser.add_argument('--rule', default='run', help='Makefile rule (default: run)')
+    parser.add_argument('--policy', choices=sorted(POLICIES), default='none')
+    parser.add_argument('--timeout', type=float, default=DEFAULT_TIMEOUT,
+                        help='timeout in seconds for jobs without history '
+                             '(default: %(default)s)')
+    parser.add_argument('--timeout-factor', type=float, default=3.0,
+                        help='timeout as a multiple of the slowest earlier run')
+    parser.add_argument('--min-timeout', type=float, default=60.0)
+    parser.add_argument('--memory', type=int, metavar='MB', help='address-space limit')
+    parser.add_argument('--cpu', type=int, metavar='SECONDS', help='CPU-time limit')
+    parser.add_argument('--cgroup', action='store_true',
+                        help='run every job in its own cgroup v2 leaf ($HARNESS_CGROUP)')
+    parser.add_argument('--cpu-quota', type=float, metavar='CPUS',
+                        help='with --cgroup, CPU time allowed per period, in CPUs')
+    parser.add_argument('--sink', choices=sorted(SINKS), default='null',
+                        help='where the jobs\' stdout goes (default: null)')
+    parser.add_argument('--run-id', default=time.strftime('%Y%m%d-%H%M%S'),
+                        help='recorded with every log entry (default: the start time)')
+    parser.add_argument('--log', default=LOG, help='JSON-lines result log (default: %(default)s)')
+    parser.add_argument('--energy', help='energy backend (default: $HARNESS_ENERGY or auto)')
+    args = parser.parse_args(argv)
+
+    meter = get_meter(args.energy)
+    limits = Limits(args.memory, args.cpu)
+    past = read_log(args.log)
+    failed = 0
+    for target in find(args.path):
+        timeout = timeout_for(history(target, args.rule, past), args.timeout_factor,
+                              args.min_timeout, default=args.timeout)
+        outcome = run(target, args.rule, timeout, limits, POLICIES[args.policy], meter,
+                      args.cgroup, args.cpu_quota, get_sink(args.sink))
+        with open(args.log, 'a') as f:
+            f.write(json.dumps(log_entry(outcome, args.run_id)) + '\n')
+        print('%s/%s\t%s\t%.3f s\t(%d attempt%s)' % (
+            target.language, target.benchmark, outcome.status, outcome.result.seconds,
+            outcome.attempts, '' if outcome.attempts == 1 else 's'))
+        failed += outcome.status != 'ok'
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())